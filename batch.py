@@ -0,0 +1,185 @@
+import os
+import random
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from config import *
+from simulation import SimulationEngine
+
+class BatchResult:
+    """
+    Aggregated outcome of many headless matches between the same two teams.
+    Player stats are tracked by roster index so duplicate names don't collide.
+    """
+    def __init__(self, home_team, away_team):
+        self.home_name = home_team.name
+        self.away_name = away_team.name
+        self.home_roster = [(p.name, p.position.name) for p in home_team.players]
+        self.away_roster = [(p.name, p.position.name) for p in away_team.players]
+
+        self.matches = 0
+        self.home_wins = 0
+        self.draws = 0
+        self.away_wins = 0
+        self.home_goals = 0
+        self.away_goals = 0
+        self.scorelines = Counter()
+
+        self.home_player_goals = [0] * len(self.home_roster)
+        self.home_player_assists = [0] * len(self.home_roster)
+        self.away_player_goals = [0] * len(self.away_roster)
+        self.away_player_assists = [0] * len(self.away_roster)
+
+    def record(self, match):
+        home_score = match.home_team.score
+        away_score = match.away_team.score
+
+        self.matches += 1
+        self.home_goals += home_score
+        self.away_goals += away_score
+        self.scorelines[(home_score, away_score)] += 1
+
+        if home_score > away_score:
+            self.home_wins += 1
+        elif home_score < away_score:
+            self.away_wins += 1
+        else:
+            self.draws += 1
+
+        for i, p in enumerate(match.home_team.players):
+            self.home_player_goals[i] += p.goals
+            self.home_player_assists[i] += p.assists
+        for i, p in enumerate(match.away_team.players):
+            self.away_player_goals[i] += p.goals
+            self.away_player_assists[i] += p.assists
+
+    def merge(self, other):
+        # Folds another chunk's result into this one (same fixture, same rosters)
+        self.matches += other.matches
+        self.home_wins += other.home_wins
+        self.draws += other.draws
+        self.away_wins += other.away_wins
+        self.home_goals += other.home_goals
+        self.away_goals += other.away_goals
+        self.scorelines.update(other.scorelines)
+
+        for mine, theirs in [
+            (self.home_player_goals, other.home_player_goals),
+            (self.home_player_assists, other.home_player_assists),
+            (self.away_player_goals, other.away_player_goals),
+            (self.away_player_assists, other.away_player_assists),
+        ]:
+            for i, value in enumerate(theirs):
+                mine[i] += value
+        return self
+
+    def _rate(self, count):
+        return count / self.matches if self.matches else 0.0
+
+    @property
+    def home_win_rate(self):
+        return self._rate(self.home_wins)
+
+    @property
+    def draw_rate(self):
+        return self._rate(self.draws)
+
+    @property
+    def away_win_rate(self):
+        return self._rate(self.away_wins)
+
+    def scoreline_distribution(self, top=None):
+        # [((home, away), probability), ...] most common first
+        return [(score, self._rate(count)) for score, count in self.scorelines.most_common(top)]
+
+    def player_averages(self):
+        rows = []
+        sides = [
+            (self.home_name, self.home_roster, self.home_player_goals, self.home_player_assists),
+            (self.away_name, self.away_roster, self.away_player_goals, self.away_player_assists),
+        ]
+        for team_name, roster, goals, assists in sides:
+            for (name, position), g, a in zip(roster, goals, assists):
+                rows.append({
+                    'team': team_name,
+                    'name': name,
+                    'position': position,
+                    'goals': self._rate(g),
+                    'assists': self._rate(a),
+                })
+        return rows
+
+    def to_dict(self):
+        return {
+            'home': self.home_name,
+            'away': self.away_name,
+            'matches': self.matches,
+            'home_win': self.home_win_rate,
+            'draw': self.draw_rate,
+            'away_win': self.away_win_rate,
+            'avg_home_goals': self._rate(self.home_goals),
+            'avg_away_goals': self._rate(self.away_goals),
+            'scorelines': [[h, a, p] for (h, a), p in self.scoreline_distribution()],
+            'players': self.player_averages(),
+        }
+
+def run_batch(home_team, away_team, n_matches, engine=None, seed=None):
+    """
+    Simulates n_matches full matches without commentary or logs and
+    returns a BatchResult with W/D/L rates, scorelines and player averages.
+    """
+    engine = engine or SimulationEngine(rng=random.Random(seed))
+    result = BatchResult(home_team, away_team)
+
+    for _ in range(n_matches):
+        match = engine.create_match(home_team, away_team, mode='headless')
+        engine.simulate_match(match)
+        result.record(match)
+
+    return result
+
+def _chunk_seed(seed, index):
+    # String seeds are hashed with SHA-512 by random.Random, so this is stable across runs/platforms
+    return f"{seed}:{index}"
+
+def _run_chunk(home_team, away_team, n_matches, chunk_seed):
+    # Worker entry point: teams arrive as pickled snapshots, so mutating them here is safe
+    engine = SimulationEngine(rng=random.Random(chunk_seed))
+    return run_batch(home_team, away_team, n_matches, engine=engine)
+
+def run_batch_parallel(home_team, away_team, n_matches, workers=None, seed=None, chunk_size=BATCH_CHUNK_SIZE):
+    """
+    Same as run_batch but spreads the matches over a ProcessPoolExecutor.
+    Work is split into fixed-size chunks, each with its own seed derived from
+    `seed`, and merged in chunk order - so for a given seed the result does not
+    depend on the number of workers.
+    """
+    if seed is None:
+        seed = random.getrandbits(64)
+
+    chunks = []
+    remaining = n_matches
+    while remaining > 0:
+        size = min(chunk_size, remaining)
+        chunks.append(size)
+        remaining -= size
+
+    result = BatchResult(home_team, away_team)
+    if not chunks:
+        return result
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        for i, size in enumerate(chunks):
+            result.merge(_run_chunk(home_team, away_team, size, _chunk_seed(seed, i)))
+        return result
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(chunks))) as pool:
+        futures = [
+            pool.submit(_run_chunk, home_team, away_team, size, _chunk_seed(seed, i))
+            for i, size in enumerate(chunks)
+        ]
+        # Merge in submission order, not completion order, to stay deterministic
+        for future in futures:
+            result.merge(future.result())
+
+    return result
@@ -0,0 +1,100 @@
+"""
+Commentary template selection and rendering. Compares the old per-call
+selection (filter the option list against the history, list.pop(0)) with
+the compiled TemplateBank + RecentPicks on the real pack and on a pack
+with every list 50x longer, checking both make the same picks, then
+times full rendering of seeded matches.
+
+    python bench/bench_commentary.py
+"""
+import json
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)  # commentary packs are looked up relative to the repo
+
+from commentary import PACKS, TemplateBank, RecentPicks, pick_from
+from config import COMMENTARY_PACK, EVENT_NOTHING
+from models import Match, Team, Player
+from simulation import SimulationEngine
+
+HISTORY = 15
+SHORT_HISTORY = 5
+PICKS = 20000
+
+def legacy_pick(rng, options, last_templates):
+    # Selection as CommentaryEngine.get_commentary did it before the bank
+    valid = [t for t in options if t not in last_templates]
+    if not valid:
+        valid = [t for t in options if t not in last_templates[-SHORT_HISTORY:]] or options
+    template = rng.choice(valid)
+    last_templates.append(template)
+    if len(last_templates) > HISTORY:
+        last_templates.pop(0)
+    return template
+
+def bank_pick(rng, pool, recent):
+    blocked = recent.blocked(pool)
+    if len(blocked) == len(pool):
+        blocked = recent.blocked(pool, last=SHORT_HISTORY)
+        if len(blocked) == len(pool):
+            blocked = ()
+    tid = pick_from(rng, pool, blocked)
+    recent.push(tid)
+    return tid
+
+def grow(pack, factor):
+    def scale(options):
+        return [f"{text} #{i}" for i in range(factor) for text in options] if factor > 1 else options
+    templates = {key: ({sub: scale(opts) for sub, opts in value.items()} if isinstance(value, dict) else scale(value))
+                 for key, value in pack['templates'].items()}
+    return dict(pack, templates=templates)
+
+def bench_selection(pack, label):
+    bank = TemplateBank(pack)
+    lists = pack['templates'][EVENT_NOTHING]  # the neutral pools, picked from most often
+    cues = sorted(bank.neutral)
+    order = [random.Random(i).choice(cues) for i in range(PICKS)]
+
+    rng, history = random.Random(1), []
+    start = time.perf_counter()
+    legacy = [legacy_pick(rng, lists[cue], history) for cue in order]
+    legacy_time = time.perf_counter() - start
+
+    rng, recent = random.Random(1), RecentPicks(bank, HISTORY)
+    start = time.perf_counter()
+    picks = [bank_pick(rng, bank.neutral[cue], recent) for cue in order]
+    bank_time = time.perf_counter() - start
+
+    assert [bank.texts[t] for t in picks] == legacy, "selection policy changed"
+    print(f"{label:<22} legacy {legacy_time / PICKS * 1e6:7.2f} us/pick   bank {bank_time / PICKS * 1e6:6.2f} us/pick")
+
+def bench_rendering(n_matches=300):
+    positions = ["GK", "LB", "CB", "CB", "RB", "CDM", "CM", "CAM", "LW", "RW", "ST"]
+    teams = [Team(f"Drużyna {t}", [Player(f"Zawodnik {t}-{i}", 65 + (t + i) % 20, pos) for i, pos in enumerate(positions)]) for t in range(8)]
+    engine = SimulationEngine()
+    matches = []
+    for i in range(n_matches):
+        match = Match(teams[i % 8], teams[(i * 3 + 1) % 8], mode='live', seed=i)
+        engine.simulate_match(match)
+        matches.append(match)
+    start = time.perf_counter()
+    for match in matches:
+        match.logs
+    elapsed = time.perf_counter() - start
+    events = sum(len(m.events) for m in matches)
+    print(f"rendering {n_matches} matches: {elapsed:.3f} s, {elapsed / events * 1e6:.2f} us/event")
+
+def main():
+    with open(PACKS.path(COMMENTARY_PACK), encoding='utf-8') as f:
+        pack = json.load(f)
+    bench_selection(pack, f"pack '{COMMENTARY_PACK}'")
+    bench_selection(grow(pack, 50), "every list x50")
+    bench_rendering()
+
+if __name__ == "__main__":
+    main()
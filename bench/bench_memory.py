@@ -0,0 +1,65 @@
+"""
+Memory footprint of the models: 10k rosters loaded from dicts (as
+teams.json is), then 1k matches running at the same time, stepped one
+minute each in turn like the live scheduler does. Sizes are traced with
+tracemalloc, so they cover every object the models allocate.
+
+    python bench/bench_memory.py [teams] [matches]
+"""
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import STYLE_BALANCED
+from models import Team
+from simulation import SimulationEngine
+
+POSITIONS = ["GK", "LB", "CB", "CB", "RB", "CDM", "CM", "CAM", "LW", "RW", "ST"]
+
+def team_dicts(n, rng):
+    return [
+        {
+            'name': f"Drużyna {i}",
+            'style': STYLE_BALANCED,
+            'players': [{'name': f"Zawodnik {i}-{j}", 'ovr': rng.randint(60, 90), 'position': pos} for j, pos in enumerate(POSITIONS)],
+        }
+        for i in range(n)
+    ]
+
+def mb(size):
+    return f"{size / 1e6:8.1f} MB"
+
+def main():
+    n_teams = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    n_matches = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    data = team_dicts(n_teams, random.Random(1))
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    teams = [Team.from_dict(d) for d in data]
+    rosters = tracemalloc.get_traced_memory()[0]
+    print(f"{n_teams} rosters:            {mb(rosters)}  ({rosters / n_teams:.0f} B/team, {time.perf_counter() - start:.2f} s)")
+
+    engine = SimulationEngine(seed=1)
+    matches = [engine.create_match(teams[(2 * i) % n_teams], teams[(2 * i + 1) % n_teams], 'live') for i in range(n_matches)]
+    tracemalloc.reset_peak()
+    start = time.perf_counter()
+    while not all(m.is_finished() for m in matches):
+        for match in matches:
+            if not match.is_finished():
+                engine.simulate_minute(match)
+    current, peak = tracemalloc.get_traced_memory()
+    events = sum(len(m.events) for m in matches)
+    in_matches = current - rosters
+    print(f"{n_matches} concurrent matches:  {mb(in_matches)}  ({in_matches / n_matches:.0f} B/match, {events / n_matches:.0f} events each, {time.perf_counter() - start:.2f} s)")
+    print(f"peak:                      {mb(peak)}")
+
+    # Identical round trip, so the compact models stay drop-in for teams.json
+    assert [t.to_dict() for t in teams] == data
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+Squad parser throughput: parse_squad_text on single pastes of growing size
+(including the long no-OVR pastes that made the old lazy regex backtrack)
+and parse_squads on one file with hundreds of squads.
+
+    python bench/bench_parser.py
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import parse_squad_text, parse_squads
+
+POSITIONS = ["BR", "LO", "ŚO", "ŚO", "PO", "ŚPD", "ŚP", "ŚPO", "LS", "PS", "N"]
+NAMES = ["Stanek", "Mauro Junior", "Copete", "Łukasz Żyro", "Kowalski", "Nowak", "da Silva", "Van Dijk"]
+
+def squad_paste(rng, inline=False):
+    units = [f"{pos} - {rng.choice(NAMES)} {rng.randint(60, 90)}" for pos in POSITIONS]
+    return " ".join(units) if inline else "\n".join(units)
+
+def timed(label, fn, *args, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - start)
+    print(f"{label:<48} {best * 1000:9.2f} ms")
+    return result
+
+def main():
+    rng = random.Random(1)
+    for n in (1, 10, 100):
+        text = "\n".join(squad_paste(rng, inline=n % 2 == 0) for _ in range(n))
+        timed(f"parse_squad_text: {n} squads ({len(text)} chars)", parse_squad_text, text)
+
+    for n in (1000, 10000, 100000):
+        # A position with no OVR after it, then a long name - worst case for the old regex
+        text = "GK " + "Stanek " * n + "\nST Nowak 80"
+        timed(f"parse_squad_text: no-OVR run of {n} words", parse_squad_text, text)
+
+    for n in (100, 500, 2000):
+        text = "\n\n".join(f"[Drużyna {i}]\n{squad_paste(rng)}" for i in range(n))
+        squads, errors = timed(f"parse_squads: {n} squads ({len(text) // 1000} kB)", parse_squads, text)
+        assert len(squads) == n and not errors
+
+if __name__ == "__main__":
+    main()
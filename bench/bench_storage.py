@@ -0,0 +1,83 @@
+"""
+teams.json persistence with thousands of teams: the old full rewrite
+(json.dump indent=4 after every edit) against the journal store and the
+SQLite store, for single edits, a burst of edits flushed together, and
+loading.
+
+    python bench/bench_storage.py [teams]
+"""
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import Team, Player
+from storage import JsonTeamStore, SqliteTeamStore
+
+POSITIONS = ["GK", "LB", "CB", "CB", "RB", "CDM", "CM", "CAM", "LW", "RW", "ST"]
+EDITS = 200
+LEGACY_EDITS = 10  # the full rewrite is slow enough that a few edits tell the story
+
+def make_team(rng, key):
+    return Team(key, [Player(f"{key} {i}", rng.randint(60, 90), pos) for i, pos in enumerate(POSITIONS)])
+
+def timed(label, fn, count=1):
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    per = f"{elapsed / count * 1000:8.3f} ms each" if count > 1 else ""
+    print(f"{label:<44} {elapsed * 1000:9.1f} ms {per}")
+
+def main():
+    n_teams = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    rng = random.Random(1)
+    teams = {f"Drużyna {i}": make_team(rng, f"Drużyna {i}") for i in range(n_teams)}
+    keys = list(teams)
+    print(f"{n_teams} teams, {EDITS} edits\n")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Old behaviour: the whole registry rewritten after every edit
+        legacy_path = os.path.join(tmp, "legacy.json")
+        def legacy_edits():
+            for i in range(LEGACY_EDITS):
+                teams[keys[i]] = make_team(rng, keys[i])
+                with open(legacy_path, "w", encoding="utf-8") as f:
+                    json.dump({k: t.to_dict() for k, t in teams.items()}, f, ensure_ascii=False, indent=4)
+        timed("full rewrite per edit", legacy_edits, LEGACY_EDITS)
+
+        for label, store in [
+            ("journal", JsonTeamStore(os.path.join(tmp, "teams.json"), compact_after=10 ** 9)),
+            ("sqlite", SqliteTeamStore(os.path.join(tmp, "teams.db"))),
+        ]:
+            store.load()
+            def fill():
+                with store.batch():
+                    for key, team in teams.items():
+                        store[key] = team
+            timed(f"{label}: initial import (one batch)", fill)
+
+            def single_edits():
+                for i in range(EDITS):
+                    store[keys[i]] = make_team(rng, keys[i])  # no event loop: written right away
+            timed(f"{label}: write per edit", single_edits, EDITS)
+
+            def burst():
+                with store.batch():
+                    for i in range(EDITS):
+                        store[keys[i]] = make_team(rng, keys[i])
+            timed(f"{label}: {EDITS} edits in one flush", burst)
+
+            if isinstance(store, JsonTeamStore):
+                timed(f"{label}: compaction (full snapshot)", store.compact)
+                reopened = JsonTeamStore(store.path)
+            else:
+                reopened = SqliteTeamStore(store.path)
+            timed(f"{label}: load", reopened.load)
+            print()
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,86 @@
+import os
+
 MATCH_LENGTH_MINUTES = 90
+EXTRA_TIME_MINUTES = 30  # knockout matches level after 90'
 LIVE_MATCH_UPDATE_INTERVAL = 1.5  # seconds
 FAST_MATCH_UPDATE_INTERVAL = 0.0  # instant
+MAX_LIVE_MATCHES = 25  # concurrent live matches driven by the scheduler
+SCOREBOARD_EVENTS = 6  # key events shown on the rolling scoreboard
+
+# Match modes that are played out in real time (ticked by the scheduler)
+# 'live'  - every event posted as a message
+# 'board' - one scoreboard embed edited in place
+LIVE_MODES = ('live', 'board')
+
+# Outbound message dispatcher (Discord allows ~5 msgs / 5s per channel, ~50 req/s per bot)
+MAX_MESSAGE_LENGTH = 2000
+DISPATCH_CHANNEL_RATE = 1.0  # sends per second per channel
+DISPATCH_CHANNEL_BURST = 5
+DISPATCH_GLOBAL_RATE = 40.0  # sends per second for the whole bot
+DISPATCH_GLOBAL_BURST = 40
+DISPATCH_LATENCY_WINDOW = 500  # latency samples kept for stats
 STARTING_RATING = 6.0
 STARTING_MOMENTUM = 50
 MAX_MOMENTUM_CHANGE = 5
 MAX_CHAOS_LEVEL = 1.0
 
+# Determinism / replays
+# Bump ENGINE_VERSION whenever the order or number of RNG draws changes,
+# otherwise old seeds would silently replay into different matches.
+ENGINE_VERSION = 3
+MATCH_SEED_BITS = 48
+
+# Team persistence (storage.py)
+TEAMS_BACKEND = os.getenv("TEAMS_BACKEND", "json")  # "json" or "sqlite"
+TEAMS_DB = 'teams.json'
+TEAMS_SQLITE_DB = os.getenv("TEAMS_SQLITE_DB", "teams.db")
+STORE_CACHE_SIZE = 256  # teams kept in memory by the SQLite backend
+STORE_FLUSH_DELAY = 1.0  # seconds; edits within this window are written together
+STORE_COMPACT_AFTER = 500  # journal entries before the snapshot is rewritten
+
+IMPORT_MAX_BYTES = 2_000_000  # /import_league attachment limit
+IMPORT_ERRORS_SHOWN = 10  # error lines listed in the /import_league reply
+
+# Team name resolver (resolver.py)
+RESOLVER_MIN_SCORE = 0.35  # best fuzzy match must beat this to count as found
+RESOLVER_AUTOCOMPLETE_MIN_SCORE = 0.2
+
+# Commentary packs (commentary.py)
+COMMENTARY_PACK_DIR = os.getenv("COMMENTARY_PACK_DIR", "commentary_packs")
+COMMENTARY_PACK = os.getenv("COMMENTARY_PACK", "pl")  # commentary_packs/<name>.json
+
+# League / season (league.py)
+LEAGUE_DB = 'league.json'
+LEAGUE_SCHEDULE_VERSION = 2  # fixture order of double_round_robin; bump when it changes so saved seasons keep theirs
+LEAGUE_POINTS_WIN = 3
+LEAGUE_POINTS_DRAW = 1
+LEAGUE_WALKOVER_GOALS = 3  # score awarded against a team that no longer exists
+LEAGUE_FORM_LENGTH = 5  # last results shown as form
+LEAGUE_TOP_PLAYERS = 5  # rows in the scorer / assist tables
+
+# Penalty shootouts (knockout matches level after extra time)
+PENALTY_ROUND_KICKS = 5  # kicks per side before sudden death
+PENALTY_BASE_CHANCE = 0.75  # taker and keeper of equal effective OVR
+PENALTY_OVR_FACTOR = 0.01  # chance per point of effective OVR difference
+PENALTY_MIN_CHANCE = 0.5
+PENALTY_MAX_CHANCE = 0.95
+
+# Cup / knockout tournament (tournament.py)
+CUP_DB = 'cup.json'
+CUP_ODDS_SIMULATIONS = 1000  # default /cup_odds sample size
+CUP_ODDS_MAX_SIMULATIONS = 20000
+CUP_ODDS_CHUNK_SIZE = 50  # cups per worker task
+
+# /predict outcome cache (predictions.py)
+PREDICT_DB = 'predictions.json'
+PREDICT_CACHE_SIZE = 200  # fixtures kept, least recently used evicted first
+PREDICT_SIMULATIONS = 2000  # default /predict sample size
+PREDICT_MAX_SIMULATIONS = 20000
+
+# Batch / Monte Carlo
+BATCH_CHUNK_SIZE = 500  # matches per worker task
+VECTOR_BLOCK_SIZE = 10000  # matches per lockstep block (vector_engine)
+
 # Styles
 STYLE_BALANCED = "Balanced"
 STYLE_AGGRESSIVE = "Aggressive"
@@ -23,3 +98,7 @@ EVENT_FOUL = "foul"
 EVENT_YELLOW_CARD = "yellow_card"
 EVENT_RED_CARD = "red_card"
 EVENT_INJURY = "injury"
+EVENT_EXTRA_TIME = "extra_time"
+EVENT_SHOOTOUT = "shootout"
+EVENT_PENALTY_SCORED = "penalty_scored"
+EVENT_PENALTY_MISSED = "penalty_missed"
@@ -0,0 +1,232 @@
+import asyncio
+import time
+from collections import deque
+from config import *
+
+class TokenBucket:
+    # Classic token bucket: `capacity` sends in a burst, refilled at `rate` per second
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self):
+        # Seconds until one token is available (0 if ready now)
+        self._refill()
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def take(self):
+        self._refill()
+        self.tokens -= 1
+
+class ChannelQueue:
+    def __init__(self, channel):
+        self.channel = channel
+        self.pending = deque()  # (enqueued_at, text)
+        self.bucket = TokenBucket(DISPATCH_CHANNEL_RATE, DISPATCH_CHANNEL_BURST)
+        self.worker = None
+        self.idle = asyncio.Event()
+        self.idle.set()
+
+class RollingMessage:
+    # One message that is posted once and then edited in place
+    def __init__(self, channel):
+        self.channel = channel
+        self.message = None
+        self.pending = None  # newest payload not yet on Discord
+        self.pending_since = None
+        self.worker = None
+        self.idle = asyncio.Event()
+        self.idle.set()
+
+class DispatchStats:
+    def __init__(self, window=DISPATCH_LATENCY_WINDOW):
+        self.sent = 0
+        self.edited = 0
+        self.coalesced = 0  # rolling updates overwritten before they were sent
+        self.merged = 0  # queued items folded into someone else's message
+        self.errors = 0
+        self.throttled = 0  # sends that had to wait for a token
+        self.max_depth = 0
+        self.latencies = deque(maxlen=window)  # enqueue -> send completed, seconds
+
+    def latency_summary(self):
+        if not self.latencies:
+            return 0.0, 0.0, 0.0
+        ordered = sorted(self.latencies)
+        avg = sum(ordered) / len(ordered)
+        p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+        return avg, p95, ordered[-1]
+
+class MessageDispatcher:
+    """
+    Outbound queue for live commentary. Every channel has its own FIFO and
+    token bucket (plus one global bucket for the whole bot), and whatever is
+    waiting in a channel's queue when it gets a token is merged into a single
+    message of up to MAX_MESSAGE_LENGTH characters. Under load this turns a
+    backlog of small sends into a few large ones instead of tripping
+    Discord's rate limits.
+    """
+    def __init__(self, max_length=MAX_MESSAGE_LENGTH):
+        self.max_length = max_length
+        self.queues = {}  # channel id -> ChannelQueue
+        self.rolling = {}  # key -> RollingMessage
+        self.global_bucket = TokenBucket(DISPATCH_GLOBAL_RATE, DISPATCH_GLOBAL_BURST)
+        self.stats = DispatchStats()
+
+    def _queue(self, channel):
+        key = getattr(channel, 'id', id(channel))
+        queue = self.queues.get(key)
+        if queue is None:
+            queue = ChannelQueue(channel)
+            self.queues[key] = queue
+        return queue
+
+    def send(self, channel, text):
+        # Non-blocking: queue text for the channel and make sure its worker runs
+        if not text:
+            return
+        queue = self._queue(channel)
+        now = time.monotonic()
+        for chunk in self._split(text):
+            queue.pending.append((now, chunk))
+
+        depth = len(queue.pending)
+        if depth > self.stats.max_depth:
+            self.stats.max_depth = depth
+
+        if queue.worker is None or queue.worker.done():
+            queue.idle.clear()
+            queue.worker = asyncio.get_running_loop().create_task(self._work(queue))
+
+    def send_lines(self, channel, lines):
+        # One message per batch of lines (e.g. all events of a minute)
+        self.send(channel, "\n".join(lines))
+
+    def update(self, key, channel, **payload):
+        """
+        Sets the latest content of the rolling message `key` (send/edit kwargs,
+        e.g. embed=...). At most one send/edit per key is in flight; updates
+        arriving meanwhile replace each other and only the newest is applied.
+        """
+        rolling = self.rolling.get(key)
+        if rolling is None:
+            rolling = RollingMessage(channel)
+            self.rolling[key] = rolling
+
+        if rolling.pending is not None:
+            self.stats.coalesced += 1
+        else:
+            rolling.pending_since = time.monotonic()
+        rolling.pending = payload
+
+        if rolling.worker is None or rolling.worker.done():
+            rolling.idle.clear()
+            rolling.worker = asyncio.get_running_loop().create_task(self._roll(rolling))
+
+    async def close_rolling(self, key):
+        # Waits for the last update of `key` to land and forgets the message
+        rolling = self.rolling.get(key)
+        if rolling is None:
+            return None
+        await rolling.idle.wait()
+        self.rolling.pop(key, None)
+        return rolling.message
+
+    async def drain(self, channel):
+        # Waits until everything queued for this channel has been sent
+        await self._queue(channel).idle.wait()
+
+    def queue_depth(self, channel=None):
+        if channel is not None:
+            return len(self._queue(channel).pending)
+        return sum(len(q.pending) for q in self.queues.values())
+
+    def _split(self, text):
+        # Discord rejects messages over the length limit; cut on line breaks where possible
+        chunks = []
+        while len(text) > self.max_length:
+            cut = text.rfind("\n", 0, self.max_length)
+            if cut <= 0:
+                cut = self.max_length
+            chunks.append(text[:cut])
+            text = text[cut:].lstrip("\n")
+        if text:
+            chunks.append(text)
+        return chunks
+
+    def _take_batch(self, queue):
+        enqueued_at, text = queue.pending.popleft()
+        stamps = [enqueued_at]
+        while queue.pending:
+            stamp, nxt = queue.pending[0]
+            if len(text) + 1 + len(nxt) > self.max_length:
+                break
+            queue.pending.popleft()
+            text += "\n" + nxt
+            stamps.append(stamp)
+        self.stats.merged += len(stamps) - 1
+        return text, stamps
+
+    async def _wait_for_token(self, queue, wanted):
+        # Waits for a token from both buckets. Returns False without taking one if `wanted()`
+        # says the work went away meanwhile, so an emptied queue doesn't burn a send
+        while True:
+            if not wanted():
+                return False
+            delay = max(queue.bucket.delay(), self.global_bucket.delay())
+            if delay <= 0:
+                queue.bucket.take()
+                self.global_bucket.take()
+                return True
+            self.stats.throttled += 1
+            await asyncio.sleep(delay)
+
+    async def _roll(self, rolling):
+        # Edits share the channel's token bucket with normal sends
+        queue = self._queue(rolling.channel)
+        try:
+            while rolling.pending is not None:
+                if not await self._wait_for_token(queue, lambda: rolling.pending is not None):
+                    break
+                payload, since = rolling.pending, rolling.pending_since
+                rolling.pending = None
+                try:
+                    if rolling.message is None:
+                        rolling.message = await rolling.channel.send(**payload)
+                        self.stats.sent += 1
+                    else:
+                        await rolling.message.edit(**payload)
+                        self.stats.edited += 1
+                except Exception as e:
+                    self.stats.errors += 1
+                    print(f"Error updating message: {e}")
+                self.stats.latencies.append(time.monotonic() - since)
+        finally:
+            rolling.idle.set()
+
+    async def _work(self, queue):
+        try:
+            while queue.pending:
+                if not await self._wait_for_token(queue, lambda: queue.pending):
+                    break
+                text, stamps = self._take_batch(queue)
+                try:
+                    await queue.channel.send(text)
+                    self.stats.sent += 1
+                except Exception as e:
+                    self.stats.errors += 1
+                    print(f"Error sending message: {e}")
+                done = time.monotonic()
+                for stamp in stamps:
+                    self.stats.latencies.append(done - stamp)
+        finally:
+            queue.idle.set()
@@ -0,0 +1,247 @@
+import random
+from collections import Counter, deque
+from config import *
+from models import Match
+
+def round_robin(keys):
+    """
+    Single round-robin by the circle method: the first key stays put and the
+    rest rotate, so every pair meets exactly once. An odd field gets a bye
+    (None) and whoever draws it sits the round out. Home/away alternates per
+    pair slot, which keeps every team at most two home or away games in
+    consecutive rounds (a bye ends the run).
+    """
+    keys = list(keys)
+    if len(keys) % 2:
+        keys.append(None)
+    n = len(keys)
+
+    rounds = []
+    for r in range(n - 1):
+        pairs = []
+        for i in range(n // 2):
+            home, away = keys[i], keys[n - 1 - i]
+            if (i == 0 and r % 2) or (i > 0 and i % 2):
+                home, away = away, home
+            if home is not None and away is not None:
+                pairs.append((home, away))
+        rounds.append(pairs)
+        keys = [keys[0], keys[-1]] + keys[1:-1]
+    return rounds
+
+def double_round_robin(keys, schedule=LEAGUE_SCHEDULE_VERSION):
+    """
+    Second half of the season is the first half with home and away swapped.
+    Schedule 2 starts it from the first half's second round and ends with
+    the swapped opening round, so the two-in-a-row limit also holds across
+    the halfway mark (a plain mirror gives some teams three). Schedule 1 is
+    the plain mirror, kept for seasons saved before the change.
+    """
+    first = round_robin(keys)
+    second = first if schedule == 1 else first[1:] + first[:1]
+    return first + [[(away, home) for home, away in pairs] for pairs in second]
+
+class TableRow:
+    __slots__ = ('key', 'played', 'won', 'drawn', 'lost', 'goals_for', 'goals_against', 'points', 'form')
+
+    def __init__(self, key):
+        self.key = key
+        self.played = 0
+        self.won = 0
+        self.drawn = 0
+        self.lost = 0
+        self.goals_for = 0
+        self.goals_against = 0
+        self.points = 0
+        self.form = deque(maxlen=LEAGUE_FORM_LENGTH)  # 'W' / 'R' / 'P', oldest first
+
+    @property
+    def goal_diff(self):
+        return self.goals_for - self.goals_against
+
+    def add(self, scored, conceded):
+        self.played += 1
+        self.goals_for += scored
+        self.goals_against += conceded
+        if scored > conceded:
+            self.won += 1
+            self.points += LEAGUE_POINTS_WIN
+            self.form.append('W')
+        elif scored == conceded:
+            self.drawn += 1
+            self.points += LEAGUE_POINTS_DRAW
+            self.form.append('R')
+        else:
+            self.lost += 1
+            self.form.append('P')
+
+    def sort_key(self):
+        # Points, goal difference, goals scored, then name so ties are stable
+        return (-self.points, -self.goal_diff, -self.goals_for, self.key)
+
+class League:
+    """
+    One season between a fixed set of team keys: double round-robin fixtures,
+    results, and standings / scorer tables that are updated as each result
+    comes in (nothing is recomputed from scratch). Rosters are looked up in the
+    team registry when a round is played, so squad edits mid-season count.
+
+    Every fixture has its own seed derived from the season seed, so a season
+    replays exactly - and a live match that never finished (e.g. the bot
+    restarted) is simply played again headless with the same seed.
+    """
+    def __init__(self, name, keys, seed=None, shuffle=True, schedule=LEAGUE_SCHEDULE_VERSION):
+        if seed is None:
+            seed = random.getrandbits(MATCH_SEED_BITS)
+        self.name = name
+        self.seed = seed
+        self.keys = list(keys)
+        if shuffle:
+            random.Random(f"{seed}:draw").shuffle(self.keys)
+        self.schedule = schedule
+        self.fixtures = double_round_robin(self.keys, schedule)  # [round][index] -> (home, away)
+        self.results = {}  # (round, index) -> (home_goals, away_goals)
+        self.pending = set()  # (round, index) being played live right now, not saved
+        self.round = 0  # first round with fixtures still to play
+
+        self.table = {key: TableRow(key) for key in self.keys}
+        self.scorers = Counter()  # (team key, player name) -> goals
+        self.assists = Counter()
+
+    def __len__(self):
+        return len(self.fixtures)
+
+    def is_finished(self):
+        return self.round >= len(self.fixtures)
+
+    def fixture_seed(self, round_index, index):
+        return random.Random(f"{self.seed}:{round_index}:{index}").getrandbits(MATCH_SEED_BITS)
+
+    def remaining(self, round_index=None):
+        # Fixture indexes of a round (default: the current one) with no result yet
+        if round_index is None:
+            round_index = self.round
+        if round_index >= len(self.fixtures):
+            return []
+        return [i for i in range(len(self.fixtures[round_index])) if (round_index, i) not in self.results]
+
+    def standings(self):
+        return sorted(self.table.values(), key=TableRow.sort_key)
+
+    def top_scorers(self, n=LEAGUE_TOP_PLAYERS):
+        return self.scorers.most_common(n)
+
+    def top_assists(self, n=LEAGUE_TOP_PLAYERS):
+        return self.assists.most_common(n)
+
+    def record(self, round_index, index, home_goals, away_goals, match=None):
+        """
+        Adds one result to the standings. `match` (if given) is the finished
+        Match, whose per-player goals/assists go into the scorer tables.
+        Recording a fixture twice is a no-op.
+        """
+        key = (round_index, index)
+        self.pending.discard(key)
+        if key in self.results:
+            return False
+        home, away = self.fixtures[round_index][index]
+        self.results[key] = (home_goals, away_goals)
+        self.table[home].add(home_goals, away_goals)
+        self.table[away].add(away_goals, home_goals)
+
+        if match is not None:
+            for team_key, side in ((home, match.home_team), (away, match.away_team)):
+                for p in side.players:
+                    if p.goals:
+                        self.scorers[(team_key, p.name)] += p.goals
+                    if p.assists:
+                        self.assists[(team_key, p.name)] += p.assists
+
+        while not self.is_finished() and not self.remaining():
+            self.round += 1
+        return True
+
+    def _walkover(self, home_team, away_team):
+        # A side that was deleted (or has no players) loses 0:3; both missing is 0:0
+        home_ok = bool(home_team and home_team.players)
+        away_ok = bool(away_team and away_team.players)
+        if home_ok and away_ok:
+            return None
+        if home_ok:
+            return LEAGUE_WALKOVER_GOALS, 0
+        if away_ok:
+            return 0, LEAGUE_WALKOVER_GOALS
+        return 0, 0
+
+    def play_round(self, engine, teams, featured=False):
+        """
+        Plays every unplayed fixture of the current round headless and records
+        it. With featured=True the biggest fixture (highest combined OVR) is
+        not played but returned as ((round, index), Match) in 'live' mode, for
+        the caller to drive and record() when it ends.
+
+        Returns (results, featured) where results is a list of
+        (home, away, home_goals, away_goals, walkover) in fixture order.
+        """
+        round_index = self.round
+        todo = [i for i in self.remaining(round_index) if (round_index, i) not in self.pending]
+
+        live = None
+        if featured:
+            candidates = []
+            for i in todo:
+                home, away = self.fixtures[round_index][i]
+                home_team, away_team = teams.get(home), teams.get(away)
+                if self._walkover(home_team, away_team) is None:
+                    candidates.append((home_team.get_avg_ovr() + away_team.get_avg_ovr(), -i))
+            if candidates:
+                index = -max(candidates)[1]
+                home, away = self.fixtures[round_index][index]
+                match = Match(teams[home], teams[away], mode='live', seed=self.fixture_seed(round_index, index))
+                self.pending.add((round_index, index))
+                live = ((round_index, index), match)
+                todo.remove(index)
+
+        results = [self.play_fixture(engine, teams, round_index, i) for i in todo]
+        return results, live
+
+    def play_fixture(self, engine, teams, round_index, index):
+        """
+        Plays one fixture headless with its own seed and records it, returning
+        (home, away, home_goals, away_goals, walkover). Also settles a live
+        fixture that was cancelled or crashed: same seed, so it ends exactly
+        as the live match would have.
+        """
+        home, away = self.fixtures[round_index][index]
+        home_team, away_team = teams.get(home), teams.get(away)
+        walkover = self._walkover(home_team, away_team)
+        if walkover:
+            self.record(round_index, index, *walkover)
+            return (home, away, *walkover, True)
+        match = Match(home_team, away_team, mode='headless', seed=self.fixture_seed(round_index, index))
+        engine.simulate_match(match)
+        self.record(round_index, index, match.home_team.score, match.away_team.score, match)
+        return (home, away, match.home_team.score, match.away_team.score, False)
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'seed': self.seed,
+            'keys': self.keys,
+            'results': [[r, i, h, a] for (r, i), (h, a) in sorted(self.results.items())],
+            'scorers': [[team, name, n] for (team, name), n in self.scorers.items()],
+            'assists': [[team, name, n] for (team, name), n in self.assists.items()],
+            'schedule': self.schedule,
+            'engine_version': ENGINE_VERSION,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        # Keys are stored already drawn; the table is rebuilt from results in round order.
+        # Seasons saved before schedules were versioned used the plain mirror (1)
+        league = cls(data['name'], data['keys'], seed=data['seed'], shuffle=False, schedule=data.get('schedule', 1))
+        for r, i, h, a in data['results']:
+            league.record(r, i, h, a)
+        league.scorers.update({(team, name): n for team, name, n in data.get('scorers', [])})
+        league.assists.update({(team, name): n for team, name, n in data.get('assists', [])})
+        return league
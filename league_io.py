@@ -0,0 +1,223 @@
+import csv
+import io
+import json
+from config import *
+from models import Team, Player, Position, POSITION_ALIASES
+from utils import parse_squad_text, parse_squads
+
+# Accepted CSV column names (normalized to lowercase)
+CSV_TEAM_COLUMNS = ("team", "druzyna", "drużyna", "klub")
+CSV_SQUAD_COLUMNS = ("squad", "sklad", "skład", "squad_text")
+CSV_POSITION_COLUMNS = ("position", "pozycja", "pos")
+CSV_NAME_COLUMNS = ("name", "player", "zawodnik", "nazwisko")
+CSV_OVR_COLUMNS = ("ovr", "overall")
+CSV_STYLE_COLUMNS = ("style", "styl")
+
+EXPORT_FORMATS = ("json", "csv", "txt")
+
+def detect_format(filename, text):
+    # Extension first, then a look at the content
+    ext = filename.rsplit(".", 1)[-1].lower() if "." in filename else ""
+    if ext in ("json", "csv"):
+        return ext
+    if ext in ("txt", "text", "md"):
+        return "txt"
+    head = text.lstrip()[:1]
+    if head in ("{", "["):
+        return "json"
+    first_line = text.lstrip().split("\n", 1)[0].lower()
+    if "," in first_line and any(col in first_line for col in CSV_TEAM_COLUMNS):
+        return "csv"
+    return "txt"
+
+def _column(header, names):
+    for i, col in enumerate(header):
+        if col in names:
+            return i
+    return None
+
+def _valid_player(name, ovr, position=Position.MD):
+    # Problem with a player record, or None if it's fine. Player() quietly turns an
+    # unknown position into MD, so a typo like "QQ" is caught here instead
+    if not name:
+        return "brak nazwy zawodnika"
+    if not 0 <= ovr <= 99:
+        return f"OVR {ovr} poza zakresem 0-99"
+    if not isinstance(position, Position) and str(position).strip().upper() not in POSITION_ALIASES:
+        return f"nieznana pozycja '{position}'"
+    return None
+
+def _iter_csv(text):
+    """
+    One row per player (team, position, name, ovr[, style]) or one row per
+    team with a squad_text column that goes through parse_squad_text.
+    Yields (line, key, Team) and (line, None, message) for rejected rows.
+    """
+    reader = csv.reader(io.StringIO(text))
+    header = [col.strip().lower() for col in next(reader, [])]
+    team_col = _column(header, CSV_TEAM_COLUMNS)
+    squad_col = _column(header, CSV_SQUAD_COLUMNS)
+    pos_col = _column(header, CSV_POSITION_COLUMNS)
+    name_col = _column(header, CSV_NAME_COLUMNS)
+    ovr_col = _column(header, CSV_OVR_COLUMNS)
+    style_col = _column(header, CSV_STYLE_COLUMNS)
+
+    if team_col is None or (squad_col is None and None in (pos_col, name_col, ovr_col)):
+        yield 1, None, "Nagłówek CSV musi mieć kolumnę team oraz squad albo position, name, ovr"
+        return
+
+    def cell(row, col):
+        return row[col].strip() if col is not None and col < len(row) else ""
+
+    # Player rows of one team are consecutive or not - collect per team, keep file order
+    pending = {}  # key -> (first line, style, [Player])
+    for row in reader:
+        line = reader.line_num
+        if not any(c.strip() for c in row):
+            continue
+        key = cell(row, team_col)
+        if not key:
+            yield line, None, "Brak nazwy drużyny"
+            continue
+        style = cell(row, style_col) or STYLE_BALANCED
+
+        if squad_col is not None:
+            players = parse_squad_text(cell(row, squad_col))
+            if players:
+                yield line, key, Team(key, players, style)
+            else:
+                yield line, None, f"Nie wykryto zawodników dla '{key}'"
+            continue
+
+        try:
+            ovr = int(cell(row, ovr_col))
+        except ValueError:
+            yield line, None, f"Niepoprawny OVR '{cell(row, ovr_col)}'"
+            continue
+        name = cell(row, name_col)
+        position = cell(row, pos_col) or Position.MD
+        problem = _valid_player(name, ovr, position)
+        if problem:
+            yield line, None, problem
+            continue
+        entry = pending.setdefault(key, (line, style, []))
+        entry[2].append(Player(name, ovr, position))
+
+    for key, (line, style, players) in pending.items():
+        yield line, key, Team(key, players, style)
+
+def _iter_json(text):
+    """
+    Either a teams.json-style object {key: {name, style, players}} (what
+    /export_league writes) or a list of {name, style?, squad | players}.
+    """
+    try:
+        data = json.loads(text)
+    except ValueError as e:
+        yield 1, None, f"Niepoprawny JSON: {e}"
+        return
+
+    if isinstance(data, dict):
+        entries = [(key, value) for key, value in data.items()]
+    elif isinstance(data, list):
+        entries = [(value.get('name') if isinstance(value, dict) else None, value) for value in data]
+    else:
+        yield 1, None, "JSON musi być obiektem lub listą drużyn"
+        return
+
+    for index, (key, value) in enumerate(entries, 1):
+        if not isinstance(value, dict) or not key:
+            yield index, None, f"Drużyna #{index}: brak nazwy lub niepoprawny format"
+            continue
+        style = value.get('style') or STYLE_BALANCED
+        if 'players' in value:
+            if not isinstance(value['players'] or [], list):
+                yield index, None, f"Drużyna #{index}: 'players' musi być listą zawodników"
+                continue
+            players = []
+            for p in value['players'] or []:
+                try:
+                    position = p.get('position', Position.MD)
+                    player = Player(str(p['name']).strip(), p['ovr'], position)
+                except (AttributeError, KeyError, TypeError, ValueError):
+                    player = None
+                problem = "niepoprawny zawodnik" if player is None else _valid_player(player.name, player.ovr, position)
+                if problem:
+                    yield index, None, f"{key}: {problem}"
+                    continue
+                players.append(player)
+        else:
+            squad = value.get('squad', '')
+            if not isinstance(squad, str):
+                yield index, None, f"Drużyna #{index}: 'squad' musi być tekstem składu"
+                continue
+            players = parse_squad_text(squad)
+        if players:
+            yield index, key, Team(value.get('name') or key, players, style)
+        else:
+            yield index, None, f"Nie wykryto zawodników dla '{key}'"
+
+def _iter_text(text):
+    squads, errors = parse_squads(text)
+    for line, message in errors:
+        yield line, None, message
+    for name, players, line in squads:
+        yield line, name, Team(name, players)
+
+def parse_league_file(filename, text):
+    """
+    Parses an uploaded league file (CSV, JSON or plain-text squads, see
+    detect_format). Returns (teams, errors): teams is a list of (key, Team)
+    in file order (a key repeated later in the file wins), errors a list of
+    (line or entry number, message). Nothing is saved here.
+    """
+    fmt = detect_format(filename, text)
+    records = {"csv": _iter_csv, "json": _iter_json}.get(fmt, _iter_text)(text)
+
+    teams = {}
+    errors = []
+    for line, key, result in records:
+        if key is None:
+            errors.append((line, result))
+        else:
+            teams[key] = result
+    errors.sort(key=lambda e: e[0])
+    return list(teams.items()), errors
+
+def _txt_line(player):
+    return f"{player.position.name} {player.name} {player.ovr:02d}"
+
+def lossy_txt_players(items):
+    """
+    Players whose txt export line does not parse back to the same player,
+    as [(key, name)] - e.g. "Kowalski_12" (read back as "Kowalski_" with
+    OVR 12). The txt format has no escaping, so export_league writes them
+    as they are and /export_league warns about them.
+    """
+    lossy = []
+    for key, team in items:
+        for p in team.players:
+            parsed = parse_squad_text(_txt_line(p))
+            if len(parsed) != 1 or (parsed[0].name, parsed[0].ovr, parsed[0].position) != (p.name, p.ovr, p.position):
+                lossy.append((key, p.name))
+    return lossy
+
+def export_league(items, fmt="json"):
+    # items: [(key, Team)] -> file contents as str, readable again by parse_league_file.
+    # json/csv are lossless; txt is the human-friendly squad format (no styles, and
+    # lossy for some player names - see lossy_txt_players)
+    if fmt == "csv":
+        out = io.StringIO()
+        writer = csv.writer(out)
+        writer.writerow(["team", "position", "name", "ovr", "style"])
+        for key, team in items:
+            for p in team.players:
+                writer.writerow([key, p.position.name, p.name, p.ovr, team.style])
+        return out.getvalue()
+    if fmt == "txt":
+        blocks = []
+        for key, team in items:
+            lines = [f"[{key}]"] + [_txt_line(p) for p in team.players]
+            blocks.append("\n".join(lines))
+        return "\n\n".join(blocks) + "\n"
+    return json.dumps({key: team.to_dict() for key, team in items}, ensure_ascii=False, indent=4)
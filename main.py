@@ -1,50 +1,172 @@
 import discord
 from discord.ext import commands
+from discord import app_commands
 import os
+import io
+import json
 import asyncio
-from models import Team, Match
+import traceback
+from models import Team, Match, get_star_rating, LINE_GK, LINE_DEF, LINE_MID, LINE_FWD
 from simulation import SimulationEngine
+from scheduler import MatchScheduler
+from dispatch import MessageDispatcher
+from storage import open_team_store, atomic_write_json
+from resolver import TeamResolver, ROLE_MENTION_RE
 from utils import parse_squad_text, generate_random_squad
+import league_io
+from league import League
+from tournament import Cup, cup_odds
+from predictions import PredictionCache
+from batch import run_batch_parallel
 from config import *
-import json
 import tickets
 import re
 
-# Database file
-TEAMS_DB = 'teams.json'
-
 # Bot setup
 intents = discord.Intents.default()
 intents.message_content = True
 bot = commands.Bot(command_prefix='!', intents=intents)
 
-# In-memory storage
-teams = {}
+# Team registry (JSON file + journal, or SQLite - see TEAMS_BACKEND)
+teams = open_team_store(TEAMS_BACKEND)
 sim_engine = SimulationEngine()
+dispatcher = MessageDispatcher()
+live_scheduler = MatchScheduler(sim_engine, dispatcher)
+team_resolver = TeamResolver()
 
-def save_teams():
-    with open(TEAMS_DB, 'w', encoding='utf-8') as f:
-        data = {name: team.to_dict() for name, team in teams.items()}
-        json.dump(data, f, ensure_ascii=False, indent=4)
+# Current season (league.json), None until /new_season
+league = None
+league_lock = asyncio.Lock()  # one /simulate_round at a time
+
+def load_league():
+    global league
+    if not os.path.exists(LEAGUE_DB):
+        return
+    try:
+        with open(LEAGUE_DB, 'r', encoding='utf-8') as f:
+            league = League.from_dict(json.load(f))
+        print(f"Loaded league '{league.name}' (round {league.round + 1}/{len(league)})")
+    except Exception as e:
+        print(f"Error loading league: {e}")
+
+league_save_lock = asyncio.Lock()  # keeps league.json writes in order
+
+async def save_league():
+    # Snapshot on the loop, disk I/O in a worker thread; writes queue up in order so an
+    # older snapshot can't land after a newer one
+    if league is None:
+        return
+    data = league.to_dict()
+    async with league_save_lock:
+        await asyncio.to_thread(atomic_write_json, LEAGUE_DB, data, None)
+
+# Current cup (cup.json), None until /new_cup
+cup = None
+cup_lock = asyncio.Lock()
+
+def load_cup():
+    global cup
+    if not os.path.exists(CUP_DB):
+        return
+    try:
+        with open(CUP_DB, 'r', encoding='utf-8') as f:
+            cup = Cup.from_dict(json.load(f))
+        print(f"Loaded cup '{cup.name}' ({cup.round_name()})")
+    except Exception as e:
+        print(f"Error loading cup: {e}")
+
+cup_save_lock = asyncio.Lock()
+
+async def save_cup():
+    # Same as save_league
+    if cup is None:
+        return
+    data = cup.to_dict()
+    async with cup_save_lock:
+        await asyncio.to_thread(atomic_write_json, CUP_DB, data, None)
+
+# Cached /predict distributions (predictions.json)
+prediction_cache = PredictionCache()
 
 def load_teams():
-    global teams
-    if os.path.exists(TEAMS_DB):
-        try:
-            with open(TEAMS_DB, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                teams = {name: Team.from_dict(team_data) for name, team_data in data.items()}
-            print(f"Loaded {len(teams)} teams from {TEAMS_DB}")
-        except Exception as e:
-            print(f"Error loading teams: {e}")
-            teams = {}
+    try:
+        count = teams.load()
+        print(f"Loaded {count} teams ({TEAMS_BACKEND})")
+    except Exception as e:
+        print(f"Error loading teams: {e}")
+
+def register_team(key, team):
+    # Every create goes through here so the name index (and /predict cache) stays in sync with the store
+    if key in teams:
+        forget_predictions(teams[key])
+    teams[key] = team
+    team_resolver.add(key)
+
+def remove_team(key):
+    forget_predictions(teams[key])
+    del teams[key]
+    team_resolver.remove(key)
+
+def forget_predictions(team):
+    # Call before a roster changes: its cached /predict results no longer apply.
+    # Saved debounced, so an /import_league touching every team writes the cache once
+    if prediction_cache.invalidate(team):
+        prediction_cache.schedule_save()
+
+def resolve_team(role, name):
+    # (key, Team) for a role option or free-text name, (None, None) if nothing matches
+    key = role.mention if role else name
+    if not key: return None, None
+
+    found_key = team_resolver.resolve(key)
+    if found_key and found_key in teams:
+        return found_key, teams[found_key]
+    return None, None
+
+def team_not_found(query):
+    # Reply for a name that resolve()/exact() gave up on, listing the close matches if there are any
+    candidates = team_resolver.candidates(query)
+    if not candidates:
+        return f"Nie znaleziono drużyny: `{query}`"
+    return f"Nie znaleziono jednoznacznie drużyny `{query}`. Pasujące: " + ", ".join(f"`{key}`" for key in candidates)
+
+def index_role_names(guild):
+    # Role-keyed teams ("<@&id>") become searchable by the role's display name
+    for key in list(team_resolver.role_keys()):
+        role = guild.get_role(int(ROLE_MENTION_RE.fullmatch(key).group(1)))
+        if role:
+            team_resolver.add_alias(key, role.name)
+
+def team_label(key, guild):
+    # Human readable autocomplete label for a team key
+    match = ROLE_MENTION_RE.fullmatch(key)
+    if match and guild:
+        role = guild.get_role(int(match.group(1)))
+        if role:
+            return f"@{role.name}"
+    return key
+
+async def team_autocomplete(interaction: discord.Interaction, current: str):
+    return [
+        app_commands.Choice(name=team_label(key, interaction.guild)[:100], value=key[:100])
+        for key in team_resolver.autocomplete(current)
+    ]
 
 # Load teams on startup
 load_teams()
+team_resolver.rebuild(teams.keys())
+load_league()
+load_cup()
+try:
+    print(f"Loaded {prediction_cache.load()} cached predictions")
+except Exception as e:
+    print(f"Error loading predictions: {e}")
 
 @bot.event
 async def on_ready():
     print(f'Logged in as {bot.user}')
+    for guild in bot.guilds:
+        index_role_names(guild)
     try:
         bot.add_view(tickets.TicketLauncher())
         bot.add_view(tickets.TicketControl())
@@ -53,6 +175,19 @@ async def on_ready():
     except Exception as e:
         print(e)
 
+@bot.tree.error
+async def on_app_command_error(interaction: discord.Interaction, error: app_commands.AppCommandError):
+    # Failed permission checks get a reply instead of "the application did not respond"
+    if isinstance(error, app_commands.MissingPermissions):
+        msg = "Ta komenda jest tylko dla administratorów."
+        if interaction.response.is_done():
+            await interaction.followup.send(msg, ephemeral=True)
+        else:
+            await interaction.response.send_message(msg, ephemeral=True)
+        return
+    print(f"Error in /{interaction.command.name if interaction.command else '?'}:")
+    traceback.print_exception(type(error), error, error.__traceback__)
+
 @bot.tree.command(name="create_team", description="Stwórz nową drużynę ze składem")
 async def create_team(interaction: discord.Interaction, role: discord.Role = None, nazwa: str = None, squad_text: str = ""):
     team_name = None
@@ -70,11 +205,10 @@ async def create_team(interaction: discord.Interaction, role: discord.Role = Non
         return
 
     new_team = Team(team_name, players)
-    teams[team_name] = new_team
-    save_teams()
+    register_team(team_name, new_team)
     
     avg_ovr = new_team.get_avg_ovr()
-    stars = get_star_rating(avg_ovr)
+    stars = new_team.get_star_rating()
     
     summary = f"Drużyna {team_name} stworzona pomyślnie z {len(players)} zawodnikami.\n"
     summary += f"Średni OVR: {avg_ovr:.1f} | Klasa: {stars}"
@@ -93,14 +227,14 @@ async def create_random_team(interaction: discord.Interaction, role: discord.Rol
 
     players = generate_random_squad()
     new_team = Team(team_name, players)
-    teams[team_name] = new_team
-    save_teams()
+    register_team(team_name, new_team)
     
     avg_ovr = new_team.get_avg_ovr()
-    stars = get_star_rating(avg_ovr)
+    stars = new_team.get_star_rating()
     await interaction.response.send_message(f"Losowa drużyna {team_name} stworzona (OVR: {avg_ovr:.1f} | Klasa: {stars}).")
 
 @bot.tree.command(name="delete_team", description="Usuń istniejącą drużynę")
+@app_commands.autocomplete(nazwa=team_autocomplete)
 async def delete_team(interaction: discord.Interaction, role: discord.Role = None, nazwa: str = None):
     team_key = None
     if role:
@@ -111,26 +245,16 @@ async def delete_team(interaction: discord.Interaction, role: discord.Role = Non
         await interaction.response.send_message("Musisz podać rolę lub nazwę drużyny!", ephemeral=True)
         return
 
-    if team_key in teams:
-        del teams[team_key]
-        save_teams()
-        await interaction.response.send_message(f"Drużyna {team_key} została usunięta.")
+    # Deleting needs an exact (or unique normalized) name - a fuzzy guess could remove the wrong team
+    found_key = team_resolver.exact(team_key)
+    if found_key and found_key in teams:
+        remove_team(found_key)
+        await interaction.response.send_message(f"Drużyna {found_key} została usunięta.")
     else:
-        # Fuzzy search for deletion too
-        found_key = None
-        for k in teams.keys():
-            if team_key.lower() in k.lower() or k.lower() in team_key.lower():
-                found_key = k
-                break
-        
-        if found_key:
-            del teams[found_key]
-            save_teams()
-            await interaction.response.send_message(f"Drużyna {found_key} została usunięta (dopasowanie przybliżone).")
-        else:
-            await interaction.response.send_message(f"Nie znaleziono drużyny: {team_key}", ephemeral=True)
+        await interaction.response.send_message(team_not_found(team_key), ephemeral=True)
 
 @bot.tree.command(name="edit_team", description="Edytuj skład istniejącej drużyny")
+@app_commands.autocomplete(nazwa=team_autocomplete)
 async def edit_team(interaction: discord.Interaction, role: discord.Role = None, nazwa: str = None, squad_text: str = ""):
     team_key = None
     if role:
@@ -143,42 +267,90 @@ async def edit_team(interaction: discord.Interaction, role: discord.Role = None,
 
     if team_key not in teams:
         # Fuzzy search
-        found = False
-        for k in teams.keys():
-            if team_key.lower() in k.lower() or k.lower() in team_key.lower():
-                team_key = k
-                found = True
-                break
-        if not found:
-            await interaction.response.send_message(f"Nie znaleziono drużyny: {team_key}", ephemeral=True)
+        found_key = team_resolver.resolve(team_key)
+        if not found_key:
+            await interaction.response.send_message(team_not_found(team_key), ephemeral=True)
             return
+        team_key = found_key
 
     players = parse_squad_text(squad_text)
     if not players:
         await interaction.response.send_message("Nie udało się wykryć żadnych zawodników! Skład nie został zmieniony.", ephemeral=True)
         return
 
+    forget_predictions(teams[team_key])
     teams[team_key].players = players
-    save_teams()
+    teams.save(team_key)
     
     avg_ovr = teams[team_key].get_avg_ovr()
-    stars = get_star_rating(avg_ovr)
+    stars = teams[team_key].get_star_rating()
     
     summary = f"Skład drużyny {team_key} zaktualizowany ({len(players)} zawodników).\n"
     summary += f"Nowy średni OVR: {avg_ovr:.1f} | Klasa: {stars}"
     await interaction.response.send_message(summary)
 
-def get_star_rating(ovr):
-    if ovr < 60: return "0.5 ★"
-    if ovr <= 62: return "1.0 ★"
-    if ovr <= 64: return "1.5 ★"
-    if ovr <= 66: return "2.0 ★"
-    if ovr <= 68: return "2.5 ★"
-    if ovr <= 70: return "3.0 ★"
-    if ovr <= 74: return "3.5 ★"
-    if ovr <= 78: return "4.0 ★"
-    if ovr <= 82: return "4.5 ★"
-    return "5.0 ★"
+@bot.tree.command(name="import_league", description="Zaimportuj drużyny z pliku CSV/JSON/TXT (Admin)")
+@app_commands.default_permissions(administrator=True)
+@app_commands.checks.has_permissions(administrator=True)
+async def import_league(interaction: discord.Interaction, plik: discord.Attachment, nadpisz: bool = False):
+    if plik.size > IMPORT_MAX_BYTES:
+        await interaction.response.send_message(f"Plik jest za duży (limit {IMPORT_MAX_BYTES // 1000} kB).", ephemeral=True)
+        return
+
+    await interaction.response.defer()
+    try:
+        text = (await plik.read()).decode('utf-8-sig')
+    except UnicodeDecodeError:
+        await interaction.followup.send("Plik musi być zapisany w UTF-8.")
+        return
+
+    # Parsing a whole season can take a moment - keep it off the event loop
+    parsed, errors = await asyncio.to_thread(league_io.parse_league_file, plik.filename, text)
+
+    added, replaced, skipped = [], [], []
+    with teams.batch():
+        for key, team in parsed:
+            if key in teams:
+                if not nadpisz:
+                    skipped.append(key)
+                    continue
+                replaced.append(key)
+            else:
+                added.append(key)
+            register_team(key, team)
+    # Everything above is written as one transaction
+    await teams.aflush()
+
+    msg = f"📥 **Import ligi** (`{plik.filename}`)\n"
+    msg += f"Dodano: **{len(added)}** | Zastąpiono: **{len(replaced)}** | Pominięto (już istnieją): **{len(skipped)}**\n"
+    if skipped:
+        msg += f"Pominięte: {', '.join(skipped[:20])}{' ...' if len(skipped) > 20 else ''} (użyj `nadpisz: True`)\n"
+    if errors:
+        msg += f"\n⚠️ Błędy ({len(errors)}):\n"
+        msg += "\n".join(f"`{line}`: {message}" for line, message in errors[:IMPORT_ERRORS_SHOWN])
+        if len(errors) > IMPORT_ERRORS_SHOWN:
+            msg += f"\n... i {len(errors) - IMPORT_ERRORS_SHOWN} więcej"
+    await interaction.followup.send(msg[:2000])
+
+@bot.tree.command(name="export_league", description="Eksportuj wszystkie drużyny do pliku")
+@app_commands.choices(format=[app_commands.Choice(name=fmt, value=fmt) for fmt in league_io.EXPORT_FORMATS])
+async def export_league(interaction: discord.Interaction, format: str = "json"):
+    if not len(teams):
+        await interaction.response.send_message("Brak drużyn do eksportu.", ephemeral=True)
+        return
+    await interaction.response.defer()
+    items = [(key, teams[key]) for key in sorted(teams.keys())]
+    data = await asyncio.to_thread(league_io.export_league, items, format)
+    msg = f"📤 Eksport {len(items)} drużyn ({format})."
+    if format == "txt":
+        lossy = await asyncio.to_thread(league_io.lossy_txt_players, items)
+        if lossy:
+            names = ", ".join(f"{name} ({key})" for key, name in lossy[:IMPORT_ERRORS_SHOWN])
+            msg += f"\n⚠️ Format txt nie zachowa {len(lossy)} zawodników po ponownym imporcie: {names}"
+            if len(lossy) > IMPORT_ERRORS_SHOWN:
+                msg += " ..."
+            msg += "\nUżyj formatu json lub csv, aby nic nie stracić."
+    await interaction.followup.send(msg[:2000], file=discord.File(io.BytesIO(data.encode('utf-8')), filename=f"liga.{format}"))
 
 @bot.tree.command(name="list_teams", description="Pokaż listę wszystkich drużyn")
 async def list_teams(interaction: discord.Interaction):
@@ -187,11 +359,10 @@ async def list_teams(interaction: discord.Interaction):
         return
     
     # Sort teams by OVR descending
-    sorted_teams = sorted(teams.items(), key=lambda x: x[1].get_avg_ovr(), reverse=True)
+    sorted_teams = teams.ranked_by_ovr()
     
     msg = "🏆 **Ranking drużyn (wg OVR):**\n"
-    for i, (name, team) in enumerate(sorted_teams, 1):
-        avg_ovr = team.get_avg_ovr()
+    for i, (name, avg_ovr) in enumerate(sorted_teams, 1):
         stars = get_star_rating(avg_ovr)
         
         # Use 'name' directly if it's a mention, so it "pings" (renders as a mention)
@@ -200,21 +371,9 @@ async def list_teams(interaction: discord.Interaction):
     await interaction.response.send_message(msg)
 
 @bot.tree.command(name="play_match", description="Rozpocznij mecz między dwiema drużynami")
-async def play_match(interaction: discord.Interaction, home_role: discord.Role = None, home_name: str = None, away_role: discord.Role = None, away_name: str = None, mode: str = "live"):
+@app_commands.autocomplete(home_name=team_autocomplete, away_name=team_autocomplete)
+async def play_match(interaction: discord.Interaction, home_role: discord.Role = None, home_name: str = None, away_role: discord.Role = None, away_name: str = None, mode: str = "live", seed: int = None):
     # Resolve teams
-    def resolve_team(role, name):
-        key = role.mention if role else name
-        if not key: return None, None
-        
-        if key in teams:
-            return key, teams[key]
-        
-        # Fuzzy search
-        for k in teams.keys():
-            if key.lower() in k.lower() or k.lower() in key.lower():
-                return k, teams[k]
-        return None, None
-
     home_key, home = resolve_team(home_role, home_name)
     away_key, away = resolve_team(away_role, away_name)
 
@@ -223,84 +382,464 @@ async def play_match(interaction: discord.Interaction, home_role: discord.Role =
         return
 
     # Create match instance
-    match = Match(home, away, mode=mode.lower())
+    match = Match(home, away, mode=mode.lower(), seed=seed)
     
     # Check for empty teams
     if not home.players or not away.players:
         await interaction.response.send_message("Jedna z drużyn nie ma zawodników!", ephemeral=True)
         return
 
+    # Live matches are capped so a busy matchday can't flood the tick loop
+    is_live = match.mode in LIVE_MODES
+    if is_live and live_scheduler.is_full():
+        await interaction.response.send_message(f"Osiągnięto limit {live_scheduler.max_matches} meczów na żywo. Spróbuj za chwilę!", ephemeral=True)
+        return
+
     # Defer response
     await interaction.response.defer()
     
-    await interaction.followup.send(f"⚽ **MECZ ROZPOCZĘTY!** ⚽\n{home_key} vs {away_key}\nTryb: {mode}")
-    
     # Simulation Loop
     channel = interaction.channel
     if not channel:
         channel = interaction.user # Fallback
 
+    if is_live:
+        # The shared scheduler drives the match from here on, independent of this interaction
+        live = live_scheduler.start(match, channel, f"{home_key} vs {away_key}", on_finish=on_live_match_finished)
+        if live:
+            await interaction.followup.send(f"⚽ **MECZ ROZPOCZĘTY!** ⚽\n{home_key} vs {away_key}\nTryb: {mode} | Seed: `{match.seed}` | ID: `{live.id}`")
+            return
+        # The scheduler filled up while we were deferring - play it headless, same seed, same result
+        mode += " (brak miejsca na mecz na żywo)"
+
+    await interaction.followup.send(f"⚽ **MECZ ROZPOCZĘTY!** ⚽\n{home_key} vs {away_key}\nTryb: {mode} | Seed: `{match.seed}`")
+
     try:
-        while not match.is_finished():
-            sim_engine.simulate_minute(match)
-            
-            # Wait for "live" feeling
-            if mode.lower() == 'live':
-                 # Find events for this minute
-                 events_this_minute = [log for log in match.logs if log.startswith(f"{match.current_minute}'")]
-                 for event in events_this_minute:
-                     try:
-                         await channel.send(event)
-                     except Exception as e:
-                         print(f"Error sending message: {e}")
-
-                 await asyncio.sleep(LIVE_MATCH_UPDATE_INTERVAL)
-            
-        
-        # Match Ended
-        summary = f"🏁 **KONIEC MECZU** 🏁\n{home.name} {match.home_team.score} - {match.away_team.score} {away.name}\n"
-        
-        # Player Ratings Report
-        ratings_msg = "⭐ **Oceny Zawodników** ⭐\n\n"
-        
-        for team in [home, away]:
-            ratings_msg += f"🔹 {team.name}:\n"
-            # Sort players by rating descending
-            sorted_players = sorted(team.players, key=lambda p: p.rating, reverse=True)
-            for p in sorted_players:
-                stats = []
-                if p.goals > 0: stats.append(f"⚽x{p.goals}")
-                if p.assists > 0: stats.append(f"🅰️x{p.assists}")
-                if p.cards == 1: stats.append("🟨")
-                if p.is_sent_off: stats.append("🟥")
-                
-                stats_str = f" ({', '.join(stats)})" if stats else ""
-                ratings_msg += f"`{p.rating:.1f}` | **{p.name}** ({p.position}){stats_str}\n"
-            ratings_msg += "\n"
-
-        # Match Stats Summary
-        stats_msg = "📊 **Statystyki Zespołowe**\n"
-        stats_msg += f"Strzały: {match.stats['home_shots']} - {match.stats['away_shots']}\n"
-        stats_msg += f"Celne: {match.stats['home_on_target']} - {match.stats['away_on_target']}\n"
-        
-        # Send full summary
-        # Divide potentially long message if needed, but for Discord embed limits it should be fine for 11 vs 11
-        await channel.send(summary + "\n" + stats_msg + "\n" + ratings_msg)
-        
-        # Man of the Match
-        motm_player = calculate_motm(home, away)
-        if motm_player:
-            await channel.send(f"🌟 **ZAWODNIK MECZU (MOTM)** 🌟\n**{motm_player.name}** ({motm_player.position})\nOcena: **{motm_player.rating:.1f}**")
+        sim_engine.simulate_match(match)
+        await send_match_summary(channel, match)
     except Exception as e:
         print(f"CRASH IN MATCH LOOP: {e}")
         await channel.send(f"🆘 **BŁĄD KRYTYCZNY:** Mecz został przerwany z powodu błędu silnika: `{e}`")
 
+async def on_live_match_finished(live):
+    await send_match_summary(live.channel, live.match)
+
+async def send_match_summary(channel, match):
+    # Match Ended
+    summary = f"🏁 **KONIEC MECZU** 🏁\n{match.home_team.name} {match.home_team.score} - {match.away_team.score} {match.away_team.name}\n"
+    if match.length > MATCH_LENGTH_MINUTES:
+        summary += f"Po dogrywce{f' | Rzuty karne: {match.penalties[0]} - {match.penalties[1]}' if match.penalties else ''}\n"
+    summary += f"Seed meczu: `{match.seed}` (tryb: {match.mode})\n"
+    
+    # Player Ratings Report
+    ratings_msg = "⭐ **Oceny Zawodników** ⭐\n\n"
+    
+    for team in [match.home_team, match.away_team]:
+        ratings_msg += f"🔹 {team.name}:\n"
+        # Sort players by rating descending
+        sorted_players = sorted(team.players, key=lambda p: p.rating, reverse=True)
+        for p in sorted_players:
+            stats = []
+            if p.goals > 0: stats.append(f"⚽x{p.goals}")
+            if p.assists > 0: stats.append(f"🅰️x{p.assists}")
+            if p.cards == 1: stats.append("🟨")
+            if p.is_sent_off: stats.append("🟥")
+            
+            stats_str = f" ({', '.join(stats)})" if stats else ""
+            ratings_msg += f"`{p.rating:.1f}` | **{p.name}** ({p.position}){stats_str}\n"
+        ratings_msg += "\n"
+
+    # Match Stats Summary
+    stats_msg = "📊 **Statystyki Zespołowe**\n"
+    stats_msg += f"Strzały: {match.stats['home_shots']} - {match.stats['away_shots']}\n"
+    stats_msg += f"Celne: {match.stats['home_on_target']} - {match.stats['away_on_target']}\n"
+    
+    # Send full summary
+    # Divide potentially long message if needed, but for Discord embed limits it should be fine for 11 vs 11
+    await channel.send(summary + "\n" + stats_msg + "\n" + ratings_msg)
+    
+    # Man of the Match
+    motm_player = calculate_motm(match.home_team, match.away_team)
+    if motm_player:
+        await channel.send(f"🌟 **ZAWODNIK MECZU (MOTM)** 🌟\n**{motm_player.name}** ({motm_player.position})\nOcena: **{motm_player.rating:.1f}**")
+
+@bot.tree.command(name="predict", description="Przewidywany wynik meczu (symulacja Monte Carlo)")
+@app_commands.autocomplete(home_name=team_autocomplete, away_name=team_autocomplete)
+async def predict(interaction: discord.Interaction, home_role: discord.Role = None, home_name: str = None, away_role: discord.Role = None, away_name: str = None, symulacje: int = PREDICT_SIMULATIONS):
+    home_key, home = resolve_team(home_role, home_name)
+    away_key, away = resolve_team(away_role, away_name)
+    if not home or not away:
+        await interaction.response.send_message("Nie znaleziono jednej lub obu drużyn!", ephemeral=True)
+        return
+    if not home.players or not away.players:
+        await interaction.response.send_message("Jedna z drużyn nie ma zawodników!", ephemeral=True)
+        return
+    symulacje = max(1, min(symulacje, PREDICT_MAX_SIMULATIONS))
+
+    # Same rosters + engine version = same distribution, so repeats are answered from the cache
+    key = prediction_cache.key(home, away)
+    result = prediction_cache.get(key, symulacje)
+    cached = result is not None
+    if not cached:
+        await interaction.response.defer()
+        # Simulate frozen copies of the rosters the key was taken from, so an /edit_team
+        # during the run can't mix two rosters into one distribution
+        home, away = Team(home.name, list(home.players), home.style), Team(away.name, list(away.players), away.style)
+        result = (await asyncio.to_thread(run_batch_parallel, home, away, symulacje)).to_dict()
+        prediction_cache.put(key, result)
+        prediction_cache.schedule_save()
+
+    msg = f"🔮 **Prognoza: {home_key} vs {away_key}** ({result['matches']} symulacji{', z pamięci' if cached else ''})\n"
+    msg += f"Wygrana gospodarzy: **{result['home_win'] * 100:.1f}%** | Remis: **{result['draw'] * 100:.1f}%** | Wygrana gości: **{result['away_win'] * 100:.1f}%**\n"
+    msg += f"Średnio bramek: {result['avg_home_goals']:.2f} - {result['avg_away_goals']:.2f}\n"
+    scorelines = ", ".join(f"{h}-{a} ({p * 100:.1f}%)" for h, a, p in result['scorelines'][:5])
+    msg += f"Najczęstsze wyniki: {scorelines}\n"
+    scorers = sorted(result['players'], key=lambda p: p['goals'], reverse=True)[:3]
+    msg += "Najgroźniejsi: " + ", ".join(f"{p['name']} ({p['goals']:.2f} gola/mecz)" for p in scorers)
+
+    if cached:
+        await interaction.response.send_message(msg[:2000])
+    else:
+        await interaction.followup.send(msg[:2000])
+
+@bot.tree.command(name="matches_active", description="Pokaż mecze rozgrywane na żywo")
+async def matches_active(interaction: discord.Interaction):
+    if not live_scheduler.matches:
+        await interaction.response.send_message("Brak meczów na żywo.", ephemeral=True)
+        return
+
+    msg = f"📡 **Mecze na żywo ({len(live_scheduler.matches)}/{live_scheduler.max_matches}):**\n"
+    for live in live_scheduler.matches.values():
+        m = live.match
+        msg += f"`#{live.id}` {m.home_team.name} {m.home_team.score} - {m.away_team.score} {m.away_team.name} | {live.status()}\n"
+
+    avg, p95, worst = dispatcher.stats.latency_summary()
+    msg += f"\n📨 Kolejka: {dispatcher.queue_depth()} | Opóźnienie avg/p95/max: {avg:.2f}s / {p95:.2f}s / {worst:.2f}s"
+    await interaction.response.send_message(msg, ephemeral=True)
+
+@bot.tree.command(name="pause_match", description="Wstrzymaj mecz na żywo")
+async def pause_match(interaction: discord.Interaction, match_id: int):
+    if live_scheduler.pause(match_id):
+        await interaction.response.send_message(f"⏸️ Mecz `#{match_id}` wstrzymany.")
+    else:
+        await interaction.response.send_message(f"Nie można wstrzymać meczu `#{match_id}` (brak meczu lub już wstrzymany).", ephemeral=True)
+
+@bot.tree.command(name="resume_match", description="Wznów wstrzymany mecz")
+async def resume_match(interaction: discord.Interaction, match_id: int):
+    if live_scheduler.resume(match_id):
+        await interaction.response.send_message(f"▶️ Mecz `#{match_id}` wznowiony.")
+    else:
+        await interaction.response.send_message(f"Nie można wznowić meczu `#{match_id}` (brak meczu lub nie jest wstrzymany).", ephemeral=True)
+
+@bot.tree.command(name="cancel_match", description="Przerwij mecz na żywo")
+async def cancel_match(interaction: discord.Interaction, match_id: int):
+    live = live_scheduler.cancel(match_id)
+    if not live:
+        await interaction.response.send_message(f"Nie znaleziono meczu `#{match_id}`.", ephemeral=True)
+        return
+
+    m = live.match
+    await interaction.response.send_message(f"🛑 Mecz `#{match_id}` przerwany w {m.current_minute}' przy wyniku {m.home_team.name} {m.home_team.score} - {m.away_team.score} {m.away_team.name}.")
+
+@bot.tree.command(name="new_season", description="Rozpocznij nowy sezon ligi ze wszystkimi drużynami (Admin)")
+@app_commands.default_permissions(administrator=True)
+@app_commands.checks.has_permissions(administrator=True)
+async def new_season(interaction: discord.Interaction, nazwa: str = "Liga", nadpisz: bool = False, seed: int = None):
+    global league
+    if len(teams) < 2:
+        await interaction.response.send_message("Do ligi potrzeba co najmniej 2 drużyn.", ephemeral=True)
+        return
+    if league is not None and not league.is_finished() and not nadpisz:
+        await interaction.response.send_message(f"Sezon `{league.name}` jeszcze trwa (kolejka {league.round + 1}/{len(league)}). Użyj `nadpisz: True`, aby zacząć od nowa.", ephemeral=True)
+        return
+    if league_lock.locked() or (league is not None and league.pending):
+        await interaction.response.send_message("Trwa rozgrywanie kolejki - spróbuj za chwilę.", ephemeral=True)
+        return
+
+    league = League(nazwa, sorted(teams.keys()), seed=seed)
+    await save_league()
+    await interaction.response.send_message(f"🏆 **Nowy sezon: {nazwa}**\nDrużyn: {len(league.keys)} | Kolejek: {len(league)} | Seed: `{league.seed}`")
+
+@bot.tree.command(name="simulate_round", description="Rozegraj kolejną kolejkę ligi (Admin)")
+@app_commands.default_permissions(administrator=True)
+@app_commands.checks.has_permissions(administrator=True)
+async def simulate_round(interaction: discord.Interaction, kolejki: int = 1, na_zywo: bool = True):
+    if league is None:
+        await interaction.response.send_message("Brak sezonu. Użyj `/new_season`.", ephemeral=True)
+        return
+    if league.is_finished():
+        await interaction.response.send_message(f"Sezon `{league.name}` zakończony. Użyj `/table` lub `/new_season`.", ephemeral=True)
+        return
+    if league_lock.locked() or league.pending:
+        await interaction.response.send_message("Poprzednia kolejka jeszcze trwa (mecz na żywo) - poczekaj na jej koniec.", ephemeral=True)
+        return
+
+    await interaction.response.defer()
+    channel = interaction.channel or interaction.user
+    season = league
+    async with league_lock:
+        # Rosters are read here, on the event loop; the matches themselves run in a worker thread
+        rosters = {key: teams[key] for key in season.keys if key in teams}
+        # Only a single round gets a live match, and only if the scheduler has room
+        featured = na_zywo and kolejki == 1 and not live_scheduler.is_full()
+
+        played = []
+        live = None
+        for _ in range(max(1, kolejki)):
+            if season.is_finished():
+                break
+            round_number = season.round + 1
+            results, live = await asyncio.to_thread(season.play_round, sim_engine, rosters, featured)
+            played.append((round_number, results))
+        await save_league()
+
+    round_number, results = played[-1]
+    msg = f"📅 **{season.name} - kolejka {round_number}/{len(season)}**"
+    if len(played) > 1:
+        msg = f"📅 **{season.name} - kolejki {played[0][0]}-{round_number}/{len(season)}** (wyniki ostatniej)"
+    msg += "\n"
+    for home, away, home_goals, away_goals, walkover in results:
+        msg += f"{home} **{home_goals} - {away_goals}** {away}{' (walkower)' if walkover else ''}\n"
+
+    if live:
+        (r, i), match = live
+        home, away = season.fixtures[r][i]
+
+        async def on_finish(live_match):
+            if season.record(r, i, match.home_team.score, match.away_team.score, match) and season is league:
+                await save_league()
+            await send_match_summary(live_match.channel, match)
+
+        async def on_abort(live_match):
+            result = await settle_league_fixture(season, rosters, r, i)
+            if result:
+                await live_match.channel.send(f"📋 Mecz {home} vs {away} przerwany - wynik uzupełniony symulacją: **{result[2]} - {result[3]}**")
+
+        if live_scheduler.start(match, channel, f"{home} vs {away}", on_finish=on_finish, on_abort=on_abort):
+            msg += f"\n⚽ Mecz kolejki na żywo: {home} vs {away} | Seed: `{match.seed}`"
+        else:
+            # The scheduler filled up while the round was being played
+            result = await settle_league_fixture(season, rosters, r, i)
+            if result:
+                msg += f"{home} **{result[2]} - {result[3]}** {away} (brak miejsca na mecz na żywo)\n"
+    await interaction.followup.send(msg[:2000])
+
+async def settle_league_fixture(season, rosters, round_index, index):
+    # A featured match that can't be (or stopped being) played live is played headless with
+    # its own seed - same result the live match would have had - so the round can finish
+    try:
+        async with league_lock:
+            result = await asyncio.to_thread(season.play_fixture, sim_engine, rosters, round_index, index)
+    except Exception as e:
+        print(f"Error settling league fixture {round_index}:{index}: {e}")
+        season.pending.discard((round_index, index))  # retried by the next /simulate_round
+        return None
+    if season is league:
+        await save_league()
+    return result
+
+@bot.tree.command(name="table", description="Tabela ligowa i klasyfikacja strzelców")
+async def table(interaction: discord.Interaction):
+    if league is None:
+        await interaction.response.send_message("Brak sezonu. Użyj `/new_season`.", ephemeral=True)
+        return
+
+    # /simulate_round updates the table and scorer Counters in a worker thread under league_lock,
+    # so read them only once the round is in (iterating a Counter mid-update can raise)
+    await interaction.response.defer()
+    guild = interaction.guild
+    async with league_lock:
+        season = league
+        rows = ["  # Drużyna               M  W  R  P  Bramki  Pkt  Forma"]
+        for pos, row in enumerate(season.standings(), 1):
+            name = team_label(row.key, guild)[:20]
+            goals = f"{row.goals_for}:{row.goals_against}"
+            rows.append(f"{pos:>3} {name:<20} {row.played:>2} {row.won:>2} {row.drawn:>2} {row.lost:>2} {goals:>7} {row.points:>4}  {''.join(row.form)}")
+        rankings = (("⚽ Strzelcy", season.top_scorers()), ("🅰️ Asysty", season.top_assists()))
+        status = "zakończony" if season.is_finished() else f"kolejka {season.round + 1}/{len(season)}"
+
+    embed = discord.Embed(
+        title=f"🏆 {season.name} ({status})",
+        description="```\n" + "\n".join(rows)[:4000] + "\n```",
+        color=discord.Color.gold()
+    )
+    for title, ranking in rankings:
+        if ranking:
+            embed.add_field(name=title, value="\n".join(f"**{n}** - {name} ({team_label(key, guild)})" for (key, name), n in ranking)[:1024], inline=True)
+    embed.set_footer(text=f"Seed sezonu: {season.seed}")
+    await interaction.followup.send(embed=embed)
+
+@bot.tree.command(name="new_cup", description="Losowanie nowego pucharu ze wszystkimi drużynami (Admin)")
+@app_commands.default_permissions(administrator=True)
+@app_commands.checks.has_permissions(administrator=True)
+async def new_cup(interaction: discord.Interaction, nazwa: str = "Puchar", rozstawienie: bool = True, nadpisz: bool = False, seed: int = None):
+    global cup
+    if len(teams) < 2:
+        await interaction.response.send_message("Do pucharu potrzeba co najmniej 2 drużyn.", ephemeral=True)
+        return
+    if cup is not None and not cup.is_finished() and not nadpisz:
+        await interaction.response.send_message(f"Puchar `{cup.name}` jeszcze trwa ({cup.round_name()}). Użyj `nadpisz: True`, aby zacząć od nowa.", ephemeral=True)
+        return
+    if cup_lock.locked() or (cup is not None and cup.pending):
+        await interaction.response.send_message("Trwa rozgrywanie rundy - spróbuj za chwilę.", ephemeral=True)
+        return
+
+    # Seeded by OVR (favourites meet as late as possible) or an open draw
+    keys = [key for key, _ in teams.ranked_by_ovr()]
+    cup = Cup.draw(nazwa, keys, seed=seed, shuffle=not rozstawienie)
+    await save_cup()
+    await interaction.response.send_message(f"🏆 **Nowy puchar: {nazwa}**\nDrużyn: {len(keys)} | Rund: {cup.total_rounds} | Seed: `{cup.seed}`\nUżyj `/bracket`, aby zobaczyć drabinkę.")
+
+@bot.tree.command(name="cup_round", description="Rozegraj kolejną rundę pucharu (Admin)")
+@app_commands.default_permissions(administrator=True)
+@app_commands.checks.has_permissions(administrator=True)
+async def cup_round(interaction: discord.Interaction, na_zywo: bool = False):
+    if cup is None:
+        await interaction.response.send_message("Brak pucharu. Użyj `/new_cup`.", ephemeral=True)
+        return
+    if cup.is_finished():
+        await interaction.response.send_message(f"Puchar `{cup.name}` zakończony - zwycięzca: {cup.champion}.", ephemeral=True)
+        return
+    if cup_lock.locked() or cup.pending:
+        await interaction.response.send_message("Mecze tej rundy jeszcze trwają - poczekaj na ich koniec.", ephemeral=True)
+        return
+
+    await interaction.response.defer()
+    channel = interaction.channel or interaction.user
+    current = cup
+    round_index, round_name = current.round, current.round_name()
+    rosters = {key: teams[key] for key in current.remaining_slots() if key is not None and key in teams}
+
+    # Live: every tie of the round at once on the shared scheduler, one scoreboard each
+    free = live_scheduler.max_matches - len(live_scheduler.matches)
+    live = na_zywo and len([t for t in current.current if t.winner is None]) <= free
+    if not live:
+        async with cup_lock:
+            ties = await asyncio.to_thread(current.play_round, sim_engine, rosters)
+            await save_cup()
+        msg = f"🏆 **{current.name} - {round_name}**\n" + "\n".join(tie.label() for tie in ties)
+        if na_zywo:
+            msg += "\n\n(Za mało wolnych miejsc na mecze na żywo - runda rozegrana od razu.)"
+        if current.is_finished():
+            msg += f"\n\n🥇 **Zwycięzca pucharu: {current.champion}!**"
+        else:
+            msg += f"\n\nNastępna runda: {current.round_name()}"
+        await interaction.followup.send(msg[:2000])
+        return
+
+    async def announce_progress(channel):
+        # Posted by whichever tie completes the round
+        if current.round != round_index and current is cup:
+            if current.is_finished():
+                await channel.send(f"🥇 **{current.name}: zwycięzca pucharu - {current.champion}!**")
+            else:
+                await channel.send(f"✅ **{current.name}: {round_name} zakończony.** Następna runda: {current.round_name()} (`/bracket`).")
+
+    def on_finish_for(index):
+        async def on_finish(live_match):
+            match = live_match.match
+            if current.record(round_index, index, match) and current is cup:
+                await save_cup()
+            await send_match_summary(live_match.channel, match)
+            await announce_progress(live_match.channel)
+        return on_finish
+
+    def on_abort_for(index):
+        async def on_abort(live_match):
+            tie = await settle_cup_tie(current, rosters, round_index, index)
+            if tie:
+                await live_match.channel.send(f"📋 Mecz przerwany - wynik uzupełniony symulacją: {tie.label()}")
+                await announce_progress(live_match.channel)
+        return on_abort
+
+    started = []
+    settled = []
+    for index, match in current.matches(rosters, mode='board'):
+        tie = current.current[index]
+        title = f"{current.name} - {round_name}: {tie.home} vs {tie.away}"
+        if live_scheduler.start(match, channel, title, on_finish=on_finish_for(index), on_abort=on_abort_for(index)):
+            started.append(tie.label())
+        else:
+            settled.append(index)
+    await save_cup()
+
+    msg = f"⚽ **{current.name} - {round_name}** - {len(started)} meczów na żywo:\n" + "\n".join(started)[:1500]
+    for index in settled:
+        # No room left on the scheduler for this one
+        tie = await settle_cup_tie(current, rosters, round_index, index)
+        if tie:
+            msg += f"\n{tie.label()} (brak miejsca na mecz na żywo)"
+    await interaction.followup.send(msg[:2000])
+    if settled:
+        await announce_progress(channel)
+
+async def settle_cup_tie(current, rosters, round_index, index):
+    # A live tie that was cancelled, crashed or never started is played headless with its
+    # own seed - same result the live match would have had - so the round can finish
+    try:
+        async with cup_lock:
+            tie = await asyncio.to_thread(current.play_tie, sim_engine, rosters, round_index, index)
+    except Exception as e:
+        print(f"Error settling cup tie {round_index}:{index}: {e}")
+        current.pending.discard(index)  # retried by the next /cup_round
+        return None
+    if current is cup:
+        await save_cup()
+    return tie
+
+@bot.tree.command(name="bracket", description="Drabinka pucharu")
+async def bracket(interaction: discord.Interaction):
+    if cup is None:
+        await interaction.response.send_message("Brak pucharu. Użyj `/new_cup`.", ephemeral=True)
+        return
+
+    embed = discord.Embed(title=f"🏆 {cup.name}", color=discord.Color.gold())
+    for index, ties in enumerate(cup.rounds):
+        lines = [tie.label() for tie in ties]
+        embed.add_field(name=cup.round_name(index), value="\n".join(lines)[:1024] or "-", inline=False)
+    if cup.is_finished():
+        embed.description = f"🥇 Zwycięzca: {cup.champion}"
+    embed.set_footer(text=f"Seed pucharu: {cup.seed}")
+    await interaction.response.send_message(embed=embed)
+
+@bot.tree.command(name="cup_odds", description="Szanse na zdobycie pucharu (symulacja Monte Carlo)")
+async def cup_odds_command(interaction: discord.Interaction, symulacje: int = CUP_ODDS_SIMULATIONS):
+    if cup is None or cup.is_finished():
+        await interaction.response.send_message("Brak trwającego pucharu. Użyj `/new_cup`.", ephemeral=True)
+        return
+    symulacje = max(1, min(symulacje, CUP_ODDS_MAX_SIMULATIONS))
+
+    await interaction.response.defer()
+    # From the current round on; ties already decided count as byes for their winner
+    slots = cup.remaining_slots()
+    rosters = {key: teams[key] for key in slots if key is not None and key in teams}
+    result = await asyncio.to_thread(cup_odds, slots, rosters, symulacje)
+
+    msg = f"🎲 **{cup.name} - szanse od rundy: {cup.round_name()}** ({result.cups} symulacji)\n"
+    for key, final, win in result.ranking():
+        msg += f"{key} | finał: {final * 100:.1f}% | puchar: **{win * 100:.1f}%**\n"
+    await interaction.followup.send(msg[:2000])
+
 @bot.tree.command(name="setup_tickets", description="Ustaw panel ticketów na kanale (Admin)")
 @commands.has_permissions(administrator=True)
 async def setup_tickets(interaction: discord.Interaction, channel: discord.TextChannel):
     await tickets.setup_tickets(interaction, channel)
 
+@bot.tree.command(name="reload_commentary", description="Przeładuj pakiet komentarzy z pliku (Admin)")
+@app_commands.default_permissions(administrator=True)
+@app_commands.checks.has_permissions(administrator=True)
+async def reload_commentary(interaction: discord.Interaction):
+    # Matches already running keep their pack; new ones use the reloaded one
+    pack = sim_engine.commentator.pack
+    try:
+        bank = sim_engine.commentator.packs.reload(pack)
+    except ValueError as e:
+        await interaction.response.send_message(f"❌ Nie udało się przeładować: {e}"[:2000], ephemeral=True)
+        return
+    await interaction.response.send_message(f"✅ Przeładowano pakiet komentarzy `{pack}` ({len(bank)} szablonów).", ephemeral=True)
+
 @bot.tree.command(name="sklad", description="Sprawdź aktualny skład drużyny")
+@app_commands.autocomplete(nazwa=team_autocomplete)
 async def sklad(interaction: discord.Interaction, role: discord.Role = None, nazwa: str = None):
     # Determine the team key
     team_key = None
@@ -314,15 +853,11 @@ async def sklad(interaction: discord.Interaction, role: discord.Role = None, naz
 
     if team_key not in teams:
         # Try finding by plain name if it was a role mention but stored as plain text or vice-versa
-        found = False
-        for k in teams.keys():
-            if team_key.lower() in k.lower() or k.lower() in team_key.lower():
-                team_key = k
-                found = True
-                break
-        if not found:
-            await interaction.response.send_message(f"Nie znaleziono drużyny: `{team_key}`", ephemeral=True)
+        found_key = team_resolver.resolve(team_key)
+        if not found_key:
+            await interaction.response.send_message(team_not_found(team_key), ephemeral=True)
             return
+        team_key = found_key
 
     team = teams[team_key]
     
@@ -331,30 +866,23 @@ async def sklad(interaction: discord.Interaction, role: discord.Role = None, naz
         color=discord.Color.green()
     )
     
-    # Group players by line (GK, DEF, MID, ATT)
-    gk = []
-    df = []
-    md = []
-    fw = []
-    
-    for p in team.players:
-        pos = p.position.upper()
-        line_str = f"`{pos}` **{p.name}** ({p.ovr})"
-        if pos == "GK": gk.append(line_str)
-        elif pos in ["LB", "RB", "CB", "LO", "PO", "SO", "ŚO"]: df.append(line_str)
-        elif pos in ["CM", "LM", "RM", "CDM", "CAM", "ŚP", "ŚPD", "ŚPO", "SP", "DP", "SPO", "LP", "PP"]: md.append(line_str)
-        else: fw.append(line_str)
-
-    if gk: embed.add_field(name="🧤 Bramkarze", value="\n".join(gk), inline=False)
-    if df: embed.add_field(name="🛡️ Obrońcy", value="\n".join(df), inline=False)
-    if md: embed.add_field(name="⚙️ Pomocnicy", value="\n".join(md), inline=False)
-    if fw: embed.add_field(name="🎯 Napastnicy", value="\n".join(fw), inline=False)
+    # Group players by line (GK, DEF, MID, ATT) - precomputed on the Team
+    line_fields = [
+        (LINE_GK, "🧤 Bramkarze"),
+        (LINE_DEF, "🛡️ Obrońcy"),
+        (LINE_MID, "⚙️ Pomocnicy"),
+        (LINE_FWD, "🎯 Napastnicy"),
+    ]
+    for line, title in line_fields:
+        players = team.lines[line]
+        if players:
+            embed.add_field(name=title, value="\n".join(f"`{p.position}` **{p.name}** ({p.ovr})" for p in players), inline=False)
     
     if not team.players:
         embed.description = "Brak zawodników w kadrze."
     
     avg_ovr = team.get_avg_ovr()
-    stars = get_star_rating(avg_ovr)
+    stars = team.get_star_rating()
     embed.set_footer(text=f"Klasa: {stars} | Styl: {team.style} | Graczy: {len(team.players)}")
     
     await interaction.response.send_message(embed=embed)
@@ -372,5 +900,8 @@ if __name__ == "__main__":
     token = os.getenv("DISCORD_TOKEN")
     if token:
         bot.run(token)
+        # Write anything still waiting for the debounce timer
+        teams.flush()
+        prediction_cache.flush()
     else:
         print("\n❌ BŁĄD: Brak zmiennej DISCORD_TOKEN w Railway Variables!")
\ No newline at end of file
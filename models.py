@@ -1,39 +1,146 @@
 import random
+from bisect import bisect
+from enum import IntEnum
+from itertools import accumulate
 from config import *
 
+# Line groups used by /sklad
+LINE_GK = "GK"
+LINE_DEF = "DEF"
+LINE_MID = "MID"
+LINE_FWD = "FWD"
+
+# Commentary groups (attack_ST / shot_DF ... templates)
+GROUP_DF = "DF"
+GROUP_MF = "MF"
+GROUP_ST = "ST"
+
+class Position(IntEnum):
+    """
+    Canonical position. Resolved once when a Player is parsed or loaded, so
+    the engine, commentary and /sklad read line/group/weights off the member
+    instead of re-checking raw (often Polish) strings. Formats as its code.
+    """
+    def __new__(cls, value, line, group, attack_weight, assist_weight):
+        obj = int.__new__(cls, value)
+        obj._value_ = value
+        obj.line = line
+        obj.group = group
+        obj.attack_weight = attack_weight  # chance to be the attacker
+        obj.assist_weight = assist_weight  # chance to assist a goal
+        return obj
+
+    #     value  line      group     att  ast
+    GK  = 0,     LINE_GK,  GROUP_DF, 1,   2
+    CB  = 1,     LINE_DEF, GROUP_DF, 1,   2
+    LB  = 2,     LINE_DEF, GROUP_DF, 1,   2
+    RB  = 3,     LINE_DEF, GROUP_DF, 1,   2
+    CDM = 4,     LINE_MID, GROUP_MF, 4,   5
+    CM  = 5,     LINE_MID, GROUP_MF, 4,   8
+    CAM = 6,     LINE_MID, GROUP_MF, 7,   10
+    LM  = 7,     LINE_MID, GROUP_MF, 7,   10
+    RM  = 8,     LINE_MID, GROUP_MF, 7,   10
+    MD  = 9,     LINE_MID, GROUP_MF, 1,   2   # generic / unknown (the old default)
+    LW  = 10,    LINE_FWD, GROUP_MF, 7,   10
+    RW  = 11,    LINE_FWD, GROUP_MF, 7,   10
+    LF  = 12,    LINE_FWD, GROUP_ST, 10,  2
+    RF  = 13,    LINE_FWD, GROUP_ST, 10,  2
+    CF  = 14,    LINE_FWD, GROUP_ST, 10,  4
+    ST  = 15,    LINE_FWD, GROUP_ST, 10,  4
+
+    @property
+    def is_gk(self):
+        return self is Position.GK
+
+    def __str__(self):
+        return self.name
+
+    def __format__(self, spec):
+        return format(self.name, spec)
+
+    @classmethod
+    def parse(cls, code):
+        # Position, English/Polish code or full word -> Position (unknown -> MD)
+        if isinstance(code, cls):
+            return code
+        return POSITION_ALIASES.get(str(code).strip().upper(), cls.MD)
+
+# Every spelling we accept, upper-case -> Position
+POSITION_ALIASES = {pos.name: pos for pos in Position}
+POSITION_ALIASES.update({
+    'BR': Position.GK, 'BRAMKARZ': Position.GK, 'GOALKEEPER': Position.GK,
+    'LO': Position.LB,
+    'PO': Position.RB,
+    'SO': Position.CB, 'ŚO': Position.CB, 'LSO': Position.CB, 'LŚO': Position.CB, 'PSO': Position.CB, 'PŚO': Position.CB,
+    'OBROŃCA': Position.CB,
+    'SP': Position.CM, 'ŚP': Position.CM, 'LSP': Position.CM, 'LŚP': Position.CM, 'PSP': Position.CM, 'PŚP': Position.CM,
+    'POMOCNIK': Position.CM,
+    'LP': Position.LM,
+    'PP': Position.RM,
+    'DP': Position.CDM, 'SPD': Position.CDM, 'ŚPD': Position.CDM,
+    'SPO': Position.CAM, 'ŚPO': Position.CAM,
+    'LS': Position.LW,
+    'PS': Position.RW,
+    'N': Position.ST, 'NA': Position.ST, 'NAPASTNIK': Position.ST,
+})
+
 class Player:
-    def __init__(self, name, ovr, position="MD"):
+    # Roster entry. Shared by every match the team plays, so it holds no match state
+    # (see MatchPlayer for condition/rating/goals etc.)
+    __slots__ = ('name', 'ovr', 'position')
+
+    def __init__(self, name, ovr, position=Position.MD):
         self.name = name
-        self.base_ovr = int(ovr)
         self.ovr = int(ovr)
-        self.position = position
-        
-        # Dynamic stats
-        self.condition = 100.0  # Fatigue (0-100)
-        self.rating = STARTING_RATING
-        self.confidence = 0  # -3 to +3
-        self.goals = 0
-        self.assists = 0
-        self.cards = 0
-        self.is_sent_off = False
+        self.position = Position.parse(position)
         
     def to_dict(self):
         return {
             'name': self.name,
             'ovr': self.ovr,
-            'position': self.position
+            'position': self.position.name
         }
     
     @classmethod
     def from_dict(cls, data):
         return cls(data['name'], data['ovr'], data['position'])
 
+class MatchPlayer:
+    # Per-match participant record pointing at the immutable roster Player
+    __slots__ = ('player', 'ovr', 'condition', 'rating', 'confidence',
+                 'goals', 'assists', 'cards', 'is_sent_off')
+
+    def __init__(self, player):
+        self.player = player
+        self.ovr = player.ovr
+        
+        # Dynamic stats
+        self.condition = 100.0  # Fatigue (0-100)
+        self.rating = STARTING_RATING
+        self.confidence = 0  # -3 to +3
+        self.goals = 0
+        self.assists = 0
+        self.cards = 0
+        self.is_sent_off = False
+
+    @property
+    def name(self):
+        return self.player.name
+
+    @property
+    def position(self):
+        return self.player.position
+
+    @property
+    def base_ovr(self):
+        return self.player.ovr
+
     def update_rating(self, amount):
         self.rating = max(1.0, min(10.0, self.rating + amount))
         
     def update_confidence(self, amount):
         # GK doesn't use confidence logic normally, but we can track it mostly for outfield
-        if self.position == "GK":
+        if self.position is Position.GK:
             return
         self.confidence = max(-3, min(3, self.confidence + amount))
 
@@ -43,13 +150,93 @@ class Player:
         confidence_bonus = self.confidence * 1.5
         return self.ovr + confidence_bonus - fatigue_penalty
 
+def get_star_rating(ovr):
+    if ovr < 60: return "0.5 ★"
+    if ovr <= 62: return "1.0 ★"
+    if ovr <= 64: return "1.5 ★"
+    if ovr <= 66: return "2.0 ★"
+    if ovr <= 68: return "2.5 ★"
+    if ovr <= 70: return "3.0 ★"
+    if ovr <= 74: return "3.5 ★"
+    if ovr <= 78: return "4.0 ★"
+    if ovr <= 82: return "4.5 ★"
+    return "5.0 ★"
+
+class WeightedTable:
+    # Cumulative-weight table; pick() makes exactly the same draw as rng.choices(population, weights)
+    __slots__ = ('population', 'weights', 'cum', 'total')
+
+    def __init__(self, population, weights):
+        self.population = population
+        self.weights = weights
+        self.cum = list(accumulate(weights))
+        self.total = self.cum[-1] + 0.0 if self.cum else 0.0
+
+    def __bool__(self):
+        return bool(self.population)
+
+    def index(self, item):
+        return self.population.index(item)
+
+    def update(self, index, weight):
+        # Change one weight; only the cumulative sums from `index` on are redone
+        weights = self.weights
+        cum = self.cum
+        weights[index] = weight
+        running = cum[index - 1] + weight if index else weight
+        cum[index] = running
+        for i in range(index + 1, len(cum)):
+            running = running + weights[i]
+            cum[i] = running
+        self.total = cum[-1] + 0.0
+
+    def pick(self, rng):
+        return self.population[bisect(self.cum, rng.random() * self.total, 0, len(self.population) - 1)]
+
 class Team:
+    __slots__ = ('name', 'style', '_players', '_aggregates')
+
     def __init__(self, name, players, style=STYLE_BALANCED):
         self.name = name
         self.players = players
         self.style = style
-        self.momentum = STARTING_MOMENTUM
-        self.score = 0
+
+    @property
+    def players(self):
+        return self._players
+
+    @players.setter
+    def players(self, players):
+        # Assigning a new roster drops the cached aggregates
+        self._players = players
+        self._aggregates = None
+
+    def invalidate(self):
+        # Call after mutating self.players in place
+        self._aggregates = None
+
+    def _get_aggregates(self):
+        if self._aggregates is None:
+            players = self._players
+            avg_ovr = sum(p.ovr for p in players) / len(players) if players else 0
+
+            lines = {LINE_GK: [], LINE_DEF: [], LINE_MID: [], LINE_FWD: []}
+            for p in players:
+                lines[p.position.line].append(p)
+
+            # Designated keeper: first GK on the sheet, else whoever is listed first
+            gk_index = next((i for i, p in enumerate(players) if p.position.is_gk), 0)
+
+            self._aggregates = {
+                'avg_ovr': avg_ovr,
+                'stars': get_star_rating(avg_ovr),
+                'lines': lines,
+                'gk_index': gk_index,
+                'is_gk': [p.position.is_gk for p in players],
+                'attack_weights': [p.position.attack_weight for p in players],
+                'assist_weights': [p.position.assist_weight for p in players],
+            }
+        return self._aggregates
         
     def to_dict(self):
         return {
@@ -64,38 +251,214 @@ class Team:
         return cls(data['name'], players, data.get('style', STYLE_BALANCED))
 
     def get_avg_ovr(self):
-        if not self.players:
-            return 0
-        return sum(p.ovr for p in self.players) / len(self.players)
+        return self._get_aggregates()['avg_ovr']
+
+    def get_star_rating(self):
+        return self._get_aggregates()['stars']
+
+    @property
+    def lines(self):
+        # {LINE_GK: [...], LINE_DEF: [...], LINE_MID: [...], LINE_FWD: [...]}
+        return self._get_aggregates()['lines']
+
+    @property
+    def goalkeeper_index(self):
+        return self._get_aggregates()['gk_index']
+
+    @property
+    def goalkeeper(self):
+        return self._players[self.goalkeeper_index] if self._players else None
+
+    def selection_profile(self):
+        # (is_gk, attack_weights, assist_weights), aligned with self.players
+        agg = self._get_aggregates()
+        return agg['is_gk'], agg['attack_weights'], agg['assist_weights']
+
+class MatchTeam:
+    # One side of a single match: score, momentum and MatchPlayer records.
+    # The roster Team is only read, so any number of matches can share it.
+    __slots__ = ('team', 'players', 'score', 'momentum', 'goalkeeper', '_avg_ovr', '_name', '_style',
+                 '_is_gk', '_attack_weights', '_assist_weights', '_attack_table', '_assist_tables')
+
+    def __init__(self, team):
+        self.team = team
+        self.players = [MatchPlayer(p) for p in team.players]
+        # Name and style as of kick-off, for to_dict (the roster may be edited mid-match)
+        self._name = team.name
+        self._style = team.style
+        self.score = 0
+        self.momentum = STARTING_MOMENTUM
+        self.goalkeeper = self.players[team.goalkeeper_index] if self.players else None
+        # Nobody is sent off yet, so the roster's cached average is still valid
+        self._avg_ovr = team.get_avg_ovr()
+
+        # Selection tables (built lazily, patched on goals, rebuilt after a red card)
+        self._is_gk, self._attack_weights, self._assist_weights = team.selection_profile()
+        self._attack_table = None
+        self._assist_tables = {}  # scorer -> WeightedTable of possible assisters
+
+    @property
+    def name(self):
+        return self.team.name
+
+    @property
+    def style(self):
+        return self.team.style
+
+    def to_dict(self):
+        # The roster this match was played with, not the Team as it is now: an /edit_team
+        # after kick-off must not change what replay_match rebuilds. Players are immutable.
+        return {
+            'name': self._name,
+            'style': self._style,
+            'players': [p.player.to_dict() for p in self.players]
+        }
+
+    def get_avg_ovr(self):
+        # Uses match OVR, so sent-off players count as 0. Cached until the next send-off.
+        if self._avg_ovr is None:
+            self._avg_ovr = sum(p.ovr for p in self.players) / len(self.players) if self.players else 0
+        return self._avg_ovr
+
+    def send_off(self, player):
+        player.is_sent_off = True
+        player.ovr = 0 # Keep for legacy check but now we have the flag
+        self._avg_ovr = None
+        self._attack_table = None
+        self._assist_tables = {}
+
+    def _attack_weight(self, i, player):
+        # SCORER COOLDOWN / DIMINISHING RETURNS
+        # If player has scored, reduce their weight to prevent one person dominating (e.g. Lewandowski 7 goals)
+        w = self._attack_weights[i]
+        if player.goals > 0:
+            w = w / (1 + player.goals * 3) # Even harsher cooldown
+        return w
+
+    def attack_table(self):
+        # Outfield players still on the pitch (STRICTLY excluding GKs), weighted by position and cooldown
+        if self._attack_table is None:
+            chosen = [i for i, p in enumerate(self.players) if not self._is_gk[i] and not p.is_sent_off]
+            if not chosen:
+                # Fallback: just pick anyone who isn't sent off
+                chosen = [i for i, p in enumerate(self.players) if not p.is_sent_off]
+            population = [self.players[i] for i in chosen]
+            weights = [self._attack_weight(i, self.players[i]) for i in chosen]
+            self._attack_table = WeightedTable(population, weights)
+        return self._attack_table
+
+    def on_goal(self, scorer):
+        # Scorer's cooldown changed - patch their weight in place
+        table = self._attack_table
+        if table is not None and scorer in table.population:
+            idx = table.index(scorer)
+            table.update(idx, self._attack_weight(self.players.index(scorer), scorer))
+
+    def assist_table(self, scorer):
+        # Teammates who can assist `scorer` (excluding scorer, GKs and sent-off players)
+        table = self._assist_tables.get(scorer)
+        if table is None:
+            chosen = [i for i, p in enumerate(self.players) if p is not scorer and not self._is_gk[i] and not p.is_sent_off]
+            table = WeightedTable([self.players[i] for i in chosen], [self._assist_weights[i] for i in chosen])
+            self._assist_tables[scorer] = table
+        return table
     
     def update_momentum(self, amount):
         # Cap change per update to avoid swinging too wildly
         change = max(-MAX_MOMENTUM_CHANGE, min(MAX_MOMENTUM_CHANGE, amount))
         self.momentum = max(0, min(100, self.momentum + change))
 
+class MatchEvent:
+    """
+    One entry of the match log, stored as a compact record: who (side 0/1 +
+    MatchPlayer), what (event type + neutral cue) and the state commentary
+    needs (score, dominating side). The Polish text is only rendered when
+    something reads .text / str(event); fast and batch runs never do.
+    """
+    __slots__ = ('match', 'index', 'minute', 'type', 'side', 'player', 'cue',
+                 'dominator', 'home_score', 'away_score', 'important', '_text')
+
+    def __init__(self, match, index, minute, event_type, side, player, cue, dominator, home_score, away_score, important):
+        self.match = match
+        self.index = index
+        self.minute = minute
+        self.type = event_type
+        self.side = side  # 0 = home, 1 = away, None = nobody in particular
+        self.player = player
+        self.cue = cue  # neutral pool picked from the match state (see CommentaryEngine.neutral_cue)
+        self.dominator = dominator  # side with more momentum at the time
+        self.home_score = home_score
+        self.away_score = away_score
+        self.important = important
+        self._text = None
+
+    @property
+    def score(self):
+        return f"{self.home_score}-{self.away_score}"
+
+    @property
+    def text(self):
+        if self._text is None:
+            self.match.render(self)
+        return self._text
+
+    def __str__(self):
+        return f"{self.minute}' {self.text}"
+
+class EventCursor:
+    # Remembers how far a consumer has read Match.events; read() only returns what's new
+    __slots__ = ('match', 'position')
+
+    def __init__(self, match, position=0):
+        self.match = match
+        self.position = position
+
+    def read(self):
+        events = self.match.events
+        if self.position >= len(events):
+            return []
+        new = events[self.position:]
+        self.position = len(events)
+        return new
+
+    def __iter__(self):
+        # Drains whatever is new, one event at a time
+        events = self.match.events
+        while self.position < len(events):
+            event = events[self.position]
+            self.position += 1
+            yield event
+
 class Match:
-    def __init__(self, home_team, away_team, mode='live'):
-        self.home_team = home_team
-        self.away_team = away_team
+    __slots__ = ('home_team', 'away_team', 'mode', 'seed', 'rng', 'current_minute', 'stats',
+                 'critical_state', 'chaos_level', 'history', 'events',
+                 'possession_team', 'possession_streak', 'commentary', '_rendered',
+                 'knockout', 'length', 'penalties')
+
+    def __init__(self, home_team, away_team, mode='live', seed=None, rng=None, knockout=False):
+        # Per-match sides; the Team objects passed in are never modified
+        self.home_team = MatchTeam(home_team)
+        self.away_team = MatchTeam(away_team)
         self.mode = mode
-        
-        # Reset team match stats
-        self.home_team.score = 0
-        self.away_team.score = 0
-        self.home_team.momentum = STARTING_MOMENTUM
-        self.away_team.momentum = STARTING_MOMENTUM
-        
-        # Reset player match stats
-        for p in self.home_team.players + self.away_team.players:
-            p.condition = 100.0
-            p.rating = STARTING_RATING
-            p.confidence = 0
-            p.goals = 0
-            p.assists = 0
-            p.cards = 0
-            p.is_sent_off = False
-            p.ovr = p.base_ovr
-            
+
+        # Knockout matches can't end level: the engine adds extra time (length grows
+        # by EXTRA_TIME_MINUTES) and then settles it on penalties
+        self.knockout = knockout
+        self.length = MATCH_LENGTH_MINUTES
+        self.penalties = None  # (home, away) shootout score, if there was one
+
+        # Every simulation draw uses self.rng, so (rosters, seed) replays the match in any mode.
+        # Commentary has its own stream derived from the seed (see CommentarySession), so rendering
+        # text (or not) never changes the result.
+        if rng is None:
+            if seed is None:
+                seed = random.getrandbits(MATCH_SEED_BITS)
+            rng = random.Random(seed)
+        self.seed = seed
+        self.rng = rng
+        self.commentary = None  # CommentarySession that renders self.events, set by the SimulationEngine
+        self._rendered = 0  # events[:_rendered] already have their text
+
         self.current_minute = 0
         self.stats = {
             'home_possession': 50,
@@ -108,25 +471,69 @@ class Match:
         
         self.critical_state = None  # e.g., "last_10_min"
         self.chaos_level = 0.0
-        self.history = []  # List of critical events for narrative
-        self.logs = [] # Full detailed log for debug or fine print
+        self.history = []  # Important MatchEvents (shared with self.events, not copied)
+        self.events = []  # Full detailed log (MatchEvent), read incrementally via cursor()
         
         # Possession tracking
         self.possession_team = None
         self.possession_streak = 0
-        self.last_commentary = ""
+
+    def snapshot(self):
+        # Everything replay_match() needs to rebuild this match
+        return {
+            'home': self.home_team.to_dict(),
+            'away': self.away_team.to_dict(),
+            'seed': self.seed,
+            'mode': self.mode,
+            'knockout': self.knockout,
+            'engine_version': ENGINE_VERSION,
+        }
         
-    def add_event(self, minute, text, event_type=EVENT_NOTHING, important=False):
-        log_entry = f"{minute}' {text}"
-        self.logs.append(log_entry)
+    @property
+    def logs(self):
+        # Text log (old format), rendered on demand
+        return [str(e) for e in self.events]
+
+    def cursor(self, from_start=False):
+        # New cursor positioned at the end of the log (or at the start if from_start)
+        return EventCursor(self, 0 if from_start else len(self.events))
+
+    def add_event(self, minute, event_type=EVENT_NOTHING, team=None, player=None, cue=None):
+        # Records what happened; no text is produced here (see render())
+        side = None if team is None else (0 if team is self.home_team else 1)
+        dominator = 0 if self.home_team.momentum > self.away_team.momentum else 1
+        important = event_type in (EVENT_GOAL, EVENT_RED_CARD, EVENT_SAVE, EVENT_PENALTY_SCORED, EVENT_PENALTY_MISSED)
+        event = MatchEvent(self, len(self.events), minute, event_type, side, player, cue, dominator,
+                           self.home_team.score, self.away_team.score, important)
+        self.events.append(event)
         
         if important:
-            self.history.append({
-                'minute': minute,
-                'text': text,
-                'type': event_type,
-                'score': f"{self.home_team.score}-{self.away_team.score}"
-            })
+            self.history.append(event)
+
+    def render(self, event):
+        # Commentary avoids repeating recent lines, so events are rendered strictly in order
+        while self._rendered <= event.index:
+            pending = self.events[self._rendered]
+            pending._text = self.commentary.render(self, pending) if self.commentary else ""
+            self._rendered += 1
+        return event._text
 
     def is_finished(self):
-        return self.current_minute >= MATCH_LENGTH_MINUTES 
+        return self.current_minute >= self.length
+
+    @property
+    def winner(self):
+        # MatchTeam that won (after penalties, if any), None for a draw
+        home, away = self.home_team, self.away_team
+        if home.score != away.score:
+            return home if home.score > away.score else away
+        if self.penalties:
+            return home if self.penalties[0] > self.penalties[1] else away
+        return None
+
+    def score_line(self):
+        # "2-2 (pen. 4-3)"
+        line = f"{self.home_team.score}-{self.away_team.score}"
+        if self.penalties:
+            line += f" (k. {self.penalties[0]}-{self.penalties[1]})"
+        return line
@@ -0,0 +1,123 @@
+import asyncio
+import hashlib
+import json
+import os
+from collections import OrderedDict, defaultdict
+from config import *
+from storage import atomic_write_json
+
+def roster_fingerprint(team):
+    # Hash of everything the simulation reads from a roster: player names, OVRs, positions and style
+    data = [team.style, [[p.name, p.ovr, p.position.name] for p in team.players]]
+    return hashlib.sha256(json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')).hexdigest()[:32]
+
+class PredictionCache:
+    """
+    Monte Carlo outcome distributions (BatchResult.to_dict()) per fixture,
+    keyed by ENGINE_VERSION plus the fingerprints of both rosters, so an
+    unchanged matchup is answered from memory and any roster or engine change
+    is a miss. Least recently used entries are evicted past max_entries.
+    Persisted to a JSON file; entries from another engine version are
+    dropped on load. Like the team store, changes inside a running event
+    loop are written once per flush_delay from a worker thread (see
+    schedule_save), so a burst of invalidations costs one write.
+    """
+    def __init__(self, path=PREDICT_DB, max_entries=PREDICT_CACHE_SIZE, flush_delay=STORE_FLUSH_DELAY):
+        self.path = path
+        self.max_entries = max_entries
+        self.flush_delay = flush_delay
+        self._dirty = False
+        self._save_task = None
+        self._entries = OrderedDict()  # (version, home fp, away fp) -> result dict, oldest first
+        self._by_fingerprint = defaultdict(set)  # fingerprint -> keys that use it
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def key(self, home_team, away_team):
+        # Take the key before simulating: a roster edited meanwhile must not be stored under its new fingerprint
+        return (ENGINE_VERSION, roster_fingerprint(home_team), roster_fingerprint(away_team))
+
+    def get(self, key, n_matches=0):
+        # Cached result with at least n_matches simulations, or None
+        result = self._entries.get(key)
+        if result is None or result['matches'] < n_matches:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return result
+
+    def put(self, key, result):
+        self._store(key, result)
+
+    def _store(self, key, result):
+        self._entries[key] = result
+        self._entries.move_to_end(key)
+        self._by_fingerprint[key[1]].add(key)
+        self._by_fingerprint[key[2]].add(key)
+        while len(self._entries) > self.max_entries:
+            self._forget(next(iter(self._entries)))
+
+    def _forget(self, key):
+        del self._entries[key]
+        for fingerprint in key[1:]:
+            keys = self._by_fingerprint.get(fingerprint)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_fingerprint[fingerprint]
+
+    def invalidate(self, team):
+        # Drops every entry involving this roster (call before it changes); returns how many
+        keys = list(self._by_fingerprint.get(roster_fingerprint(team), ()))
+        for key in keys:
+            self._forget(key)
+        return len(keys)
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return 0
+        with open(self.path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        for version, home_fp, away_fp, result in data.get('entries', []):
+            if version == ENGINE_VERSION:
+                self._store((version, home_fp, away_fp), result)
+        return len(self._entries)
+
+    def to_dict(self):
+        # LRU order (oldest first) is kept on disk
+        return {'entries': [[*key, result] for key, result in self._entries.items()]}
+
+    def save(self):
+        self._dirty = False
+        atomic_write_json(self.path, self.to_dict(), indent=None)
+
+    def schedule_save(self):
+        # Debounced save; written immediately when there's no running loop (scripts, startup)
+        self._dirty = True
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.save()
+            return
+        if self._save_task is None or self._save_task.done():
+            self._save_task = loop.create_task(self._delayed_save())
+
+    async def _delayed_save(self):
+        # The snapshot is taken on the loop thread; only the disk I/O moves to a worker.
+        # Changes made during the write set _dirty again and get another round.
+        while self._dirty:
+            await asyncio.sleep(self.flush_delay)
+            self._dirty = False
+            try:
+                await asyncio.to_thread(atomic_write_json, self.path, self.to_dict(), None)
+            except Exception as e:
+                print(f"Error saving predictions: {e}")
+
+    def flush(self):
+        # Synchronous write of a pending save (shutdown)
+        if self._dirty:
+            self.save()
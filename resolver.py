@@ -0,0 +1,164 @@
+import re
+import unicodedata
+from collections import defaultdict
+from config import *
+
+ROLE_MENTION_RE = re.compile(r'<@&(\d+)>')
+
+# Letters that NFKD doesn't decompose
+_FOLD = str.maketrans({'ł': 'l', 'ø': 'o', 'đ': 'd', 'ß': 'ss', 'æ': 'ae', 'œ': 'oe'})
+
+def normalize_name(text):
+    # "Śląsk  Wrocław!" -> "slask wroclaw"
+    text = unicodedata.normalize('NFKD', text.lower().translate(_FOLD))
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    text = re.sub(r'[^\w]+', ' ', text)
+    return " ".join(text.split())
+
+def trigrams(norm):
+    padded = f"  {norm} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+class TeamResolver:
+    """
+    Search index over team keys, shared by every command that takes a team
+    name. Each key (plus optional aliases such as the role's display name)
+    is indexed by normalized text (lowercase, diacritics folded), role ID
+    and trigrams, so lookups only score the keys that share trigrams with
+    the query instead of scanning the whole registry. add()/remove() keep
+    it in sync as teams change.
+    """
+    def __init__(self):
+        self._names = defaultdict(set)  # key -> normalized names (key + aliases)
+        self._by_name = defaultdict(set)  # normalized name -> keys
+        self._by_role = {}  # role id -> key
+        self._by_trigram = defaultdict(set)  # trigram -> keys
+
+    def rebuild(self, keys):
+        self._names.clear()
+        self._by_name.clear()
+        self._by_role.clear()
+        self._by_trigram.clear()
+        for key in keys:
+            self.add(key)
+
+    def __contains__(self, key):
+        return key in self._names
+
+    def __len__(self):
+        return len(self._names)
+
+    def role_keys(self):
+        return self._by_role.values()
+
+    def add(self, key, *aliases):
+        role = ROLE_MENTION_RE.fullmatch(key.strip())
+        if role:
+            self._by_role[role.group(1)] = key
+        self._index(key, key)
+        for alias in aliases:
+            self._index(key, alias)
+
+    def add_alias(self, key, alias):
+        if key in self._names:
+            self._index(key, alias)
+
+    def _index(self, key, text):
+        names = self._names[key]  # registers the key even if the text normalizes to nothing
+        norm = normalize_name(text)
+        if not norm or norm in names:
+            return
+        names.add(norm)
+        self._by_name[norm].add(key)
+        for tri in trigrams(norm):
+            self._by_trigram[tri].add(key)
+
+    def remove(self, key):
+        for norm in self._names.pop(key, ()):
+            self._by_name[norm].discard(key)
+            if not self._by_name[norm]:
+                del self._by_name[norm]
+            for tri in trigrams(norm):
+                keys = self._by_trigram.get(tri)
+                if keys is not None:
+                    keys.discard(key)
+                    if not keys:
+                        del self._by_trigram[tri]
+        role = ROLE_MENTION_RE.fullmatch(key.strip())
+        if role and self._by_role.get(role.group(1)) == key:
+            del self._by_role[role.group(1)]
+
+    def _score(self, query, query_tris, name):
+        if name == query:
+            return 1.0
+        if name.startswith(query):
+            return 0.9
+        if query in name or name in query:
+            return 0.8
+        name_tris = trigrams(name)
+        # Dice coefficient on trigrams, capped below the substring tiers
+        return 0.7 * 2 * len(query_tris & name_tris) / (len(query_tris) + len(name_tris))
+
+    def search(self, query, limit=10, min_score=0.0):
+        """Ranked [(key, score)] for a free-text query, best first."""
+        if not query:
+            return []
+
+        role = ROLE_MENTION_RE.search(query)
+        if role and role.group(1) in self._by_role:
+            return [(self._by_role[role.group(1)], 1.0)]
+
+        norm = normalize_name(query)
+        if not norm:
+            return []
+
+        query_tris = trigrams(norm)
+        if len(norm) < 3:
+            # Too short for trigrams to narrow anything down
+            candidates = self._names.keys()
+        else:
+            candidates = set()
+            for tri in query_tris:
+                candidates |= self._by_trigram.get(tri, set())
+
+        ranked = []
+        for key in candidates:
+            best = max((self._score(norm, query_tris, name) for name in self._names[key]), default=0.0)
+            if best > min_score:
+                ranked.append((key, best))
+
+        # Best score first; on ties prefer the shorter (more specific) key
+        ranked.sort(key=lambda x: (-x[1], len(x[0]), x[0]))
+        return ranked[:limit]
+
+    def exact(self, query):
+        # The key itself or the only key with this normalized name; None otherwise (no fuzzy matching)
+        if not query:
+            return None
+        if query in self._names:
+            return query
+        exact = self._by_name.get(normalize_name(query))
+        if exact and len(exact) == 1:
+            return next(iter(exact))
+        return None
+
+    def resolve(self, query, min_score=RESOLVER_MIN_SCORE):
+        # Exact match first, then the best fuzzy match. None if nothing matches or if the best
+        # score is shared ("wisla" with Wisła Kraków and Wisła Płock) - see candidates()
+        found = self.exact(query)
+        if found is not None:
+            return found
+        ranked = self.search(query, limit=2, min_score=min_score)
+        if not ranked or (len(ranked) > 1 and ranked[1][1] == ranked[0][1]):
+            return None
+        return ranked[0][0]
+
+    def candidates(self, query, limit=5, min_score=RESOLVER_MIN_SCORE):
+        # Keys worth suggesting when resolve() gives up
+        return [key for key, _ in self.search(query, limit=limit, min_score=min_score)]
+
+    def autocomplete(self, query, limit=25):
+        # Keys for a slash-command autocomplete; empty query lists teams alphabetically
+        if not query:
+            return sorted(self._names)[:limit]
+        return [key for key, _ in self.search(query, limit=limit, min_score=RESOLVER_AUTOCOMPLETE_MIN_SCORE)]
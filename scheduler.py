@@ -0,0 +1,153 @@
+import asyncio
+import itertools
+import time
+from config import *
+from scoreboard import build_scoreboard_embed
+
+class LiveMatch:
+    def __init__(self, match_id, match, channel, title, on_finish=None, on_abort=None):
+        self.id = match_id
+        self.match = match
+        self.channel = channel
+        self.title = title
+        self.on_finish = on_finish  # async callback(live_match), e.g. posting the summary
+        self.on_abort = on_abort  # async callback(live_match) if it's cancelled or crashes instead
+        self.cursor = match.cursor()  # events not yet pushed to the channel
+        self.paused = False
+        self.cancelled = False
+        self.started_at = time.monotonic()
+
+    def status(self):
+        if self.paused:
+            return "⏸️ pauza"
+        return f"{self.match.current_minute}'"
+
+class MatchScheduler:
+    """
+    Drives every live match from one shared tick loop instead of one
+    sleep-loop per command. Each tick advances all running matches by a
+    minute and pushes their new events out together. Matches are tied to a
+    channel, not to the interaction that started them, so they keep going
+    after the interaction token expires.
+    """
+    def __init__(self, engine, dispatcher, tick_interval=LIVE_MATCH_UPDATE_INTERVAL, max_matches=MAX_LIVE_MATCHES):
+        self.engine = engine
+        self.dispatcher = dispatcher
+        self.tick_interval = tick_interval
+        self.max_matches = max_matches
+        self.matches = {}  # id -> LiveMatch
+        self._ids = itertools.count(1)
+        self._task = None
+
+    def is_full(self):
+        return len(self.matches) >= self.max_matches
+
+    def start(self, match, channel, title, on_finish=None, on_abort=None):
+        if self.is_full():
+            return None
+
+        live = LiveMatch(next(self._ids), match, channel, title, on_finish, on_abort)
+        self.matches[live.id] = live
+
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        return live
+
+    def get(self, match_id):
+        return self.matches.get(match_id)
+
+    def pause(self, match_id):
+        live = self.matches.get(match_id)
+        if not live or live.paused:
+            return False
+        live.paused = True
+        return True
+
+    def resume(self, match_id):
+        live = self.matches.get(match_id)
+        if not live or not live.paused:
+            return False
+        live.paused = False
+        return True
+
+    def cancel(self, match_id):
+        live = self.matches.pop(match_id, None)
+        if not live:
+            return None
+        live.cancelled = True
+        self.dispatcher.rolling.pop(self._board_key(live), None)
+        self._aborted(live)
+        return live
+
+    def _board_key(self, live):
+        return ('board', live.id)
+
+    async def _run(self):
+        # Single timer for all matches; stops itself once nothing is running
+        next_tick = time.monotonic()
+        while self.matches:
+            await self._tick()
+            next_tick += self.tick_interval
+            delay = next_tick - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            else:
+                # Running behind (slow sends) - don't try to catch up in a burst
+                next_tick = time.monotonic()
+
+    async def _tick(self):
+        jobs = []
+        for live in list(self.matches.values()):
+            if live.paused or live.cancelled:
+                continue
+            jobs.append(self._advance(live))
+        if jobs:
+            await asyncio.gather(*jobs)
+
+    async def _advance(self, live):
+        match = live.match
+        try:
+            self.engine.simulate_minute(match)
+
+            if match.mode == 'board':
+                # One embed per match, edited in place (dispatcher coalesces the edits)
+                self.dispatcher.update(self._board_key(live), live.channel, embed=build_scoreboard_embed(match, live.title))
+            else:
+                # New events since the last tick; the dispatcher sends them as one message
+                new_events = live.cursor.read()
+                if new_events:
+                    self.dispatcher.send_lines(live.channel, [str(e) for e in new_events])
+
+            if match.is_finished() and not live.cancelled:
+                self.matches.pop(live.id, None)
+                # Finish in the background so one slow channel doesn't stall the shared tick
+                asyncio.get_running_loop().create_task(self._finish(live))
+        except Exception as e:
+            print(f"CRASH IN MATCH LOOP: {e}")
+            self.matches.pop(live.id, None)
+            try:
+                await live.channel.send(f"🆘 **BŁĄD KRYTYCZNY:** Mecz został przerwany z powodu błędu silnika: `{e}`")
+            except Exception:
+                pass
+            self._aborted(live)
+
+    def _aborted(self, live):
+        # on_finish never runs for this match; let the owner (league/cup) settle it
+        if live.on_abort:
+            asyncio.get_running_loop().create_task(self._abort(live))
+
+    async def _abort(self, live):
+        try:
+            await live.on_abort(live)
+        except Exception as e:
+            print(f"Error aborting match #{live.id}: {e}")
+
+    async def _finish(self, live):
+        try:
+            # Let queued commentary / the final scoreboard go out before the summary
+            await self.dispatcher.close_rolling(self._board_key(live))
+            await self.dispatcher.drain(live.channel)
+            if live.on_finish:
+                await live.on_finish(live)
+        except Exception as e:
+            print(f"Error finishing match #{live.id}: {e}")
@@ -0,0 +1,36 @@
+import discord
+from config import *
+
+def build_scoreboard_embed(match, title=None, last_events=SCOREBOARD_EVENTS):
+    # Single embed showing the whole state of a match; re-rendered every minute and edited in place
+    home = match.home_team
+    away = match.away_team
+
+    if match.is_finished():
+        status = "🏁 Koniec meczu"
+        if match.penalties:
+            status += f" (k. {match.penalties[0]}-{match.penalties[1]})"
+        color = discord.Color.dark_grey()
+    else:
+        status = f"⏱️ {match.current_minute}'"
+        color = discord.Color.green()
+
+    embed = discord.Embed(
+        title=f"{home.name} {home.score} - {away.score} {away.name}",
+        description=str(match.events[-1]) if match.events else "Sędzia rozpoczyna spotkanie.",
+        color=color
+    )
+    if title:
+        embed.set_author(name=title)
+
+    embed.add_field(name="Minuta", value=status, inline=True)
+    embed.add_field(name="Strzały", value=f"{match.stats['home_shots']} - {match.stats['away_shots']}", inline=True)
+    embed.add_field(name="Celne", value=f"{match.stats['home_on_target']} - {match.stats['away_on_target']}", inline=True)
+
+    key_events = match.history[-last_events:]
+    if key_events:
+        lines = [f"`{e.minute}'` {e.text} ({e.score})" for e in key_events]
+        embed.add_field(name="Kluczowe momenty", value="\n".join(lines)[:1024], inline=False)
+
+    embed.set_footer(text=f"Seed: {match.seed}")
+    return embed
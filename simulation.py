@@ -4,10 +4,38 @@ from models import Match, Player, Team
 from commentary import CommentaryEngine
 
 class SimulationEngine:
-    def __init__(self):
+    def __init__(self, seed=None, rng=None):
+        # Every in-match draw comes from match.rng. The engine's own rng only hands out
+        # match seeds, so a seeded engine produces a reproducible sequence of matches.
+        if rng is None:
+            rng = random.Random(seed) if seed is not None else random
+        self.rng = rng
         self.commentator = CommentaryEngine()
 
+    def create_match(self, home_team, away_team, mode='live'):
+        return Match(home_team, away_team, mode=mode, seed=self.rng.getrandbits(MATCH_SEED_BITS))
+
+    def simulate_match(self, match: Match):
+        # Runs the whole match in one go (no pacing, used by fast/headless drivers)
+        while not match.is_finished():
+            self.simulate_minute(match)
+        return match
+
     def simulate_minute(self, match: Match):
+        self._simulate_minute(match)
+
+        # Knockout matches can't end level: extra time first, then penalties
+        if match.knockout and match.current_minute == match.length and match.home_team.score == match.away_team.score:
+            if match.length == MATCH_LENGTH_MINUTES:
+                match.length += EXTRA_TIME_MINUTES
+                if match.mode != 'headless':
+                    match.add_event(match.current_minute, EVENT_EXTRA_TIME)
+            else:
+                self._penalty_shootout(match)
+
+    def _simulate_minute(self, match: Match):
+        if match.commentary is None and match.mode != 'headless':
+            match.commentary = self.commentator.session(match.seed)
         match.current_minute += 1
         minute = match.current_minute
         
@@ -40,23 +68,16 @@ class SimulationEngine:
         # Final safety bounds
         neutral_chance = max(0.55, min(0.95, neutral_chance))
             
-        if random.random() < neutral_chance:
+        if match.rng.random() < neutral_chance:
             # If we are NOT in a pressure phase, we do a neutral event
-            event_text = self.commentator.get_commentary(match, EVENT_NOTHING)
-            
-            if hasattr(match, 'last_commentary') and match.last_commentary == event_text:
-                event_text = self.commentator.get_commentary(match, EVENT_NOTHING)
-
-            match.last_commentary = event_text
-            
-            if match.mode == 'live': 
-                match.add_event(minute, event_text)
+            if match.mode != 'headless':
+                match.add_event(minute, EVENT_NOTHING, match.possession_team, cue=self.commentator.neutral_cue(match))
             return
 
         # 3. DETERMINE POSSESSION (Phase Logic)
         # If a team has a streak, they likely keep the ball
         # Reduced stickiness from 0.7 to 0.6 to allow more turnovers
-        if match.possession_team and random.random() < 0.6:
+        if match.possession_team and match.rng.random() < 0.6:
              attacking_team = match.possession_team
              match.possession_streak += 1
         else:
@@ -77,7 +98,7 @@ class SimulationEngine:
              home_prob = 0.5 + (home_adv / 100)
              home_prob = max(0.2, min(0.8, home_prob)) # Caps
              
-             attacking_team = match.home_team if random.random() < home_prob else match.away_team
+             attacking_team = match.home_team if match.rng.random() < home_prob else match.away_team
              match.possession_team = attacking_team
              match.possession_streak = 0
 
@@ -89,17 +110,16 @@ class SimulationEngine:
         # 5. APPLY OUTCOME & LOGGING
         self._apply_outcome(match, event_type, context)
         
-        text = self.commentator.get_commentary(match, event_type, context)
-        if text:
-             # Important events check for history
-            important = event_type in [EVENT_GOAL, EVENT_RED_CARD, EVENT_SAVE]
-            match.add_event(minute, text, event_type, important)
+        # Headless runs (batch/Monte Carlo) never read the log
+        if match.mode != 'headless':
+            cue = self.commentator.neutral_cue(match) if event_type == EVENT_NOTHING else None
+            match.add_event(minute, event_type, context.get('team'), context.get('player'), cue)
 
     def _update_fatigue(self, match):
         for team in [match.home_team, match.away_team]:
             for player in team.players:
                 # Fatigue grows linearly with some random variance
-                drop = random.uniform(0.05, 0.15)
+                drop = match.rng.uniform(0.05, 0.15)
                 player.condition = max(0, player.condition - drop)
 
     def _update_chaos(self, match):
@@ -112,67 +132,21 @@ class SimulationEngine:
              match.chaos_level = min(MAX_CHAOS_LEVEL, match.chaos_level + 0.01)
 
     def _resolve_action(self, match, att_team, def_team):
-        # Pick attacker (STRICTLY Exclude GKs)
-        # We check common names/tags for GKs
-        # Function to check if player is GK
-        def is_gk(p):
-            return p.position.strip().upper() in ["GK", "BR", "BRAMKARZ", "GOALKEEPER"]
-            
-        outfield_players = [p for p in att_team.players if not is_gk(p) and not p.is_sent_off]
-        
-        # Double check: if still finding a GK (e.g. position naming mismatch), skip them
-        if not outfield_players:
-            # Fallback: just pick anyone who isn't sent off
-            outfield_players = [p for p in att_team.players if not p.is_sent_off]
-            
-        if not outfield_players:
-            return EVENT_NOTHING, context # Should not happen if teams are balanced
+        # Pick attacker (STRICTLY Exclude GKs) from the precomputed weighted table
+        attackers = att_team.attack_table()
+        if not attackers:
+            return EVENT_NOTHING, {'team': att_team, 'opponent': def_team} # Should not happen if teams are balanced
 
-        attacker = random.choice(outfield_players)
-        
-        # Paranoia check: If we somehow picked a GK, pick again from others
-        if is_gk(attacker) and len(outfield_players) > 1:
-             others = [p for p in outfield_players if p != attacker]
-             if others:
-                 attacker = random.choice(others)
+        attacker = attackers.pick(match.rng)
 
-        # Apply Weighted Selection
-        # ST/CF/LF/RF -> Weight 10
-        # CAM/LM/RM/LW/RW -> Weight 7
-        # CM/CDM -> Weight 4
-        # CB/LB/RB/WB -> Weight 1
-        weights = []
-        for p in outfield_players:
-            pos = p.position.strip().upper()
-            if pos in ["ST", "CF", "LF", "RF", "NAPASTNIK"]:
-                w = 10
-            elif pos in ["CAM", "LM", "RM", "LW", "RW", "POMOCNIK"]:
-                w = 7
-            elif pos in ["CM", "CDM", "ŚPD", "ŚP"]:
-                w = 4
-            else:
-                w = 1 # Defenders
-            
-            # SCORER COOLDOWN / DIMINISHING RETURNS
-            # If player has scored, reduce their weight to prevent one person dominating (e.g. Lewandowski 7 goals)
-            # Formula: New Weight = Weight / (1 + Goals * 2)
-            if p.goals > 0:
-                w = w / (1 + p.goals * 3) # Even harsher cooldown
-                
-            weights.append(w)
-            
-        attacker = random.choices(outfield_players, weights=weights, k=1)[0]
-
-        # Find goalkeeper
-        gk = next((p for p in def_team.players if p.position.upper() in ["GK", "BR"]), None)
-        if not gk:
-            gk = def_team.players[0]
+        # Designated goalkeeper (precomputed per match)
+        gk = def_team.goalkeeper
 
         # Action Roll
         # Attack roll vs Defense roll
         # Normalized variance
-        att_score = attacker.get_effective_ovr() + random.randint(-15, 15)
-        def_score = gk.get_effective_ovr() + random.randint(-5, 5) + 2
+        att_score = attacker.get_effective_ovr() + match.rng.randint(-15, 15)
+        def_score = gk.get_effective_ovr() + match.rng.randint(-5, 5) + 2
         
         # Momentum impact - Quadratic-ish factor
         mom_diff = (att_team.momentum - def_team.momentum)
@@ -191,8 +165,8 @@ class SimulationEngine:
             att_score += 5 # Desperation push
         
         # Chaos factor - Reduced randomness to prevent wild swings
-        if random.random() < match.chaos_level:
-            att_score += random.randint(-15, 15) # Was -25, 25
+        if match.rng.random() < match.chaos_level:
+            att_score += match.rng.randint(-15, 15) # Was -25, 25
         
         context = {'team': att_team, 'player': attacker, 'opponent': def_team}
 
@@ -214,7 +188,7 @@ class SimulationEngine:
              return EVENT_SHOT, context
         
         # RANDOM FOULS (Chaos dependent)
-        foul_roll = random.random()
+        foul_roll = match.rng.random()
         if foul_roll < (0.05 + (match.chaos_level * 0.1)):
             if foul_roll < 0.005: # High punishment
                 return EVENT_RED_CARD, context
@@ -245,25 +219,13 @@ class SimulationEngine:
                 match.stats['away_shots'] += 1
                 match.stats['away_on_target'] += 1
 
+            att_team.on_goal(player)
+
             # ASSIST LOGIC
             # Pick a potential assister from the same team (excluding scorer and GK)
-            def is_gk(p):
-                return p.position.strip().upper() in ["GK", "BR", "BRAMKARZ", "GOALKEEPER"]
-                
-            teammates = [p for p in att_team.players if p != player and not is_gk(p) and not p.is_sent_off]
-            if teammates and random.random() < 0.8: # 80% chance for an assist
-                # Weight by position (CM/CAM have higher chance)
-                a_weights = []
-                for t in teammates:
-                    pos = t.position.strip().upper()
-                    if pos in ["CAM", "LM", "RM", "LW", "RW"]: w = 10
-                    elif pos in ["CM", "ŚP"]: w = 8
-                    elif pos in ["CDM", "ŚPD"]: w = 5
-                    elif pos in ["ST", "CF"]: w = 4
-                    else: w = 2
-                    a_weights.append(w)
-                
-                assister = random.choices(teammates, weights=a_weights, k=1)[0]
+            teammates = att_team.assist_table(player)
+            if teammates and match.rng.random() < 0.8: # 80% chance for an assist
+                assister = teammates.pick(match.rng)
                 assister.assists += 1
                 assister.update_rating(0.5)
                 context['assister'] = assister
@@ -287,8 +249,7 @@ class SimulationEngine:
             player.update_rating(-2.0)
             player.cards += 1
             match.chaos_level += 0.3
-            player.is_sent_off = True
-            player.ovr = 0 # Keep for legacy check but now we have the flag
+            att_team.send_off(player)
             
         elif event_type == EVENT_SHOT:
             player.update_confidence(1)
@@ -312,4 +273,75 @@ class SimulationEngine:
         elif event_type == EVENT_ATTACK:
             # Slight momentum build
             att_team.update_momentum(3)
-            player.update_rating(0.2)
\ No newline at end of file
+            player.update_rating(0.2)
+
+    def _penalty_takers(self, team):
+        # Best effective OVR first (tired legs count), keeper last; sent-off players can't take one
+        keeper = team.goalkeeper
+        takers = [p for p in team.players if p is not keeper and not p.is_sent_off]
+        takers.sort(key=lambda p: p.get_effective_ovr(), reverse=True)
+        if keeper is not None and not keeper.is_sent_off:
+            takers.append(keeper)
+        return takers or team.players
+
+    def _penalty_kick(self, match, taker, keeper):
+        # Taker's effective OVR against the keeper's shifts the base conversion rate
+        keeper_ovr = keeper.get_effective_ovr() if keeper else 0
+        chance = PENALTY_BASE_CHANCE + (taker.get_effective_ovr() - keeper_ovr) * PENALTY_OVR_FACTOR
+        chance = max(PENALTY_MIN_CHANCE, min(PENALTY_MAX_CHANCE, chance))
+        scored = match.rng.random() < chance
+        if scored:
+            taker.update_rating(0.2)
+        else:
+            taker.update_rating(-0.5)
+            if keeper:
+                keeper.update_rating(0.5)
+        return scored
+
+    def _penalty_shootout(self, match):
+        # Alternating kicks, best of PENALTY_ROUND_KICKS each, then sudden death.
+        # Stops as soon as one side can no longer be caught.
+        sides = (match.home_team, match.away_team)
+        takers = [self._penalty_takers(team) for team in sides]
+        goals = [0, 0]
+        minute = match.current_minute
+        logged = match.mode != 'headless'
+        if logged:
+            match.add_event(minute, EVENT_SHOOTOUT)
+
+        kick = 0
+        decided = False
+        while not decided:
+            for s in (0, 1):
+                taker = takers[s][kick % len(takers[s])]
+                scored = self._penalty_kick(match, taker, sides[1 - s].goalkeeper)
+                goals[s] += scored
+                if logged:
+                    match.add_event(minute, EVENT_PENALTY_SCORED if scored else EVENT_PENALTY_MISSED, sides[s], taker)
+
+                if kick < PENALTY_ROUND_KICKS:
+                    home_left = PENALTY_ROUND_KICKS - kick - 1
+                    away_left = PENALTY_ROUND_KICKS - kick - s
+                    if goals[0] + home_left < goals[1] or goals[1] + away_left < goals[0]:
+                        decided = True
+                        break
+                elif s == 1 and goals[0] != goals[1]:
+                    decided = True
+            kick += 1
+
+        match.penalties = (goals[0], goals[1])
+
+def replay_match(home_snapshot, away_snapshot, seed, mode='live', engine_version=ENGINE_VERSION, knockout=False):
+    """
+    Rebuilds a finished match (score, logs, history) from the team snapshots
+    and seed recorded by Match.snapshot(). Replays are bit-identical as long
+    as ENGINE_VERSION matches the original run; the result doesn't depend on
+    the mode, and any non-headless replay can render the full commentary.
+    """
+    if engine_version != ENGINE_VERSION:
+        raise ValueError(f"Match was played on engine v{engine_version}, current engine is v{ENGINE_VERSION}")
+
+    home = Team.from_dict(home_snapshot)
+    away = Team.from_dict(away_snapshot)
+    match = Match(home, away, mode=mode, seed=seed, knockout=knockout)
+    return SimulationEngine().simulate_match(match)
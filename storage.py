@@ -0,0 +1,478 @@
+import asyncio
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+from collections import OrderedDict
+from collections.abc import MutableMapping
+from contextlib import contextmanager
+from config import *
+from models import Team, Position
+
+def atomic_write_json(path, data, indent=4):
+    # Write to a temp file in the same directory, fsync, then rename over the target.
+    # A crash leaves either the old file or the new one, never a half-written mix.
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", suffix=".json", dir=directory)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=indent)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+class TeamRepository(MutableMapping):
+    """
+    Dict-like registry of Team objects keyed by team key (name or role
+    mention). Backends only implement storage; this base class handles
+    write batching: every change is recorded, and inside a running event
+    loop a burst of changes within STORE_FLUSH_DELAY seconds is written in
+    one go from a worker thread. Without a loop (scripts, startup) changes
+    are written immediately.
+
+    Use store[key] = team / del store[key]; after changing a team in place
+    (e.g. team.players = ...) call store.save(key). Changes made inside
+    `with store.batch():` are written together in one transaction.
+    """
+    def __init__(self, flush_delay=STORE_FLUSH_DELAY):
+        self.flush_delay = flush_delay
+        self._flush_task = None
+        self._lock = None  # asyncio.Lock, created lazily inside the loop
+        self._batch_depth = 0
+
+    # --- Backend hooks ---
+
+    def load(self):
+        # Prepares the backend, returns the number of teams
+        raise NotImplementedError
+
+    def _take_pending(self):
+        # Runs on the loop thread: returns a batch to write (or None if nothing changed)
+        raise NotImplementedError
+
+    def _write(self, batch):
+        # May run in a worker thread: persists a batch from _take_pending
+        raise NotImplementedError
+
+    def _written(self, batch):
+        # Back on the loop thread after a successful _write
+        pass
+
+    def _has_pending(self):
+        # True if there are changes not yet handed to _write
+        raise NotImplementedError
+
+    # --- Queries ---
+
+    def save(self, key):
+        # Re-record a team that was modified in place
+        self[key] = self[key]
+
+    def ranked_by_ovr(self):
+        # [(key, avg_ovr)] best first
+        ranking = [(key, team.get_avg_ovr()) for key, team in self.items()]
+        ranking.sort(key=lambda x: x[1], reverse=True)
+        return ranking
+
+    # --- Writing ---
+
+    @contextmanager
+    def batch(self):
+        # Bulk changes (e.g. /import_league): nothing is flushed until the block ends,
+        # then everything goes out as one write
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if self._batch_depth == 0:
+                self._schedule_flush()
+
+    def _schedule_flush(self):
+        if self._batch_depth:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.flush()
+            return
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = loop.create_task(self._delayed_flush())
+
+    async def _delayed_flush(self):
+        # Debounce: everything recorded during the delay is written in one go. Changes made
+        # while the write was running couldn't schedule their own flush (this task was still
+        # alive), so keep going until nothing is left.
+        while True:
+            await asyncio.sleep(self.flush_delay)
+            await self.aflush()
+            if self._batch_depth or not self._has_pending():
+                return
+
+    def flush(self):
+        # Synchronous write of everything pending (no event loop / shutdown)
+        batch = self._take_pending()
+        if batch is not None:
+            self._write(batch)
+            self._written(batch)
+
+    async def aflush(self):
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            batch = self._take_pending()
+            if batch is not None:
+                # Batch is prepared on the loop thread; only the disk I/O moves to a worker
+                await asyncio.to_thread(self._write, batch)
+                self._written(batch)
+
+class JsonTeamStore(TeamRepository):
+    """
+    Keeps every team in memory; persisted to a JSON snapshot plus an
+    append-only journal (one JSON op per line). Changes are journalled
+    instead of rewriting the whole file; the snapshot is rewritten atomically
+    only when the journal gets long. A flush with several ops is journalled
+    as one "batch" line, so it is applied all-or-nothing after a crash.
+    """
+    def __init__(self, path, flush_delay=STORE_FLUSH_DELAY, compact_after=STORE_COMPACT_AFTER):
+        super().__init__(flush_delay)
+        self.path = path
+        self.journal_path = path + ".journal"
+        self.compact_after = compact_after
+
+        self._teams = {}
+        self._pending = []  # journal ops not yet on disk
+        self._journal_entries = 0
+        self._journal_valid_size = None
+
+    # --- Mapping interface ---
+
+    def __getitem__(self, key):
+        return self._teams[key]
+
+    def __setitem__(self, key, team):
+        self._teams[key] = team
+        self._pending.append({'op': 'put', 'key': key, 'team': team.to_dict()})
+        self._schedule_flush()
+
+    def __delitem__(self, key):
+        del self._teams[key]
+        self._pending.append({'op': 'del', 'key': key})
+        self._schedule_flush()
+
+    def __iter__(self):
+        return iter(self._teams)
+
+    def __len__(self):
+        return len(self._teams)
+
+    def __contains__(self, key):
+        return key in self._teams
+
+    def _has_pending(self):
+        return bool(self._pending)
+
+    # --- Loading ---
+
+    def load(self):
+        raw = self.read_raw()
+        if self._repair_journal():
+            print(f"Journal {self.journal_path} had a torn last entry (crash?) - it was dropped")
+        self._teams = {name: Team.from_dict(team_data) for name, team_data in raw.items()}
+        self._pending = []
+
+        # Migration: rosters saved with raw codes ("BR", "ŚPD", "bramkarz") are re-saved canonical,
+        # all of them in one write
+        with self.batch():
+            for name, team in self._teams.items():
+                if team.to_dict()['players'] != raw[name].get('players'):
+                    self[name] = team
+        return len(self._teams)
+
+    def read_raw(self):
+        # Snapshot + journal as plain dicts, without building Team objects
+        data = {}
+        if os.path.exists(self.path):
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+
+        self._journal_entries = 0
+        self._journal_valid_size = None  # byte length of the intact journal prefix, None if all of it is
+        if os.path.exists(self.journal_path):
+            valid_size = 0
+            with open(self.journal_path, 'rb') as f:
+                for line in f:
+                    try:
+                        if not line.endswith(b"\n"):
+                            raise ValueError("unterminated line")
+                        entry = json.loads(line.decode('utf-8'))
+                    except ValueError:
+                        # Torn last line after a crash - everything before it is valid
+                        self._journal_valid_size = valid_size
+                        break
+                    valid_size += len(line)
+                    for op in entry['ops'] if entry['op'] == 'batch' else [entry]:
+                        if op['op'] == 'put':
+                            data[op['key']] = op['team']
+                        elif op['op'] == 'del':
+                            data.pop(op['key'], None)
+                        self._journal_entries += 1
+        return data
+
+    def _repair_journal(self):
+        # Cut a torn tail off the journal; otherwise the next append would be glued onto the
+        # partial line and every entry after it would be unreadable on the next load
+        if self._journal_valid_size is None:
+            return False
+        with open(self.journal_path, 'r+b') as f:
+            f.truncate(self._journal_valid_size)
+            f.flush()
+            os.fsync(f.fileno())
+        self._journal_valid_size = None
+        return True
+
+    # --- Writing ---
+
+    def _take_pending(self):
+        if not self._pending:
+            return None
+        ops, self._pending = self._pending, []
+        snapshot = None
+        if self._journal_entries + len(ops) >= self.compact_after:
+            snapshot = {name: team.to_dict() for name, team in self._teams.items()}
+        return ops, snapshot
+
+    def _write(self, batch):
+        ops, snapshot = batch
+        if snapshot is not None:
+            # Compaction: new full snapshot, then the journal is no longer needed
+            atomic_write_json(self.path, snapshot)
+            with open(self.journal_path, 'w', encoding='utf-8'):
+                pass
+            self._journal_entries = 0
+            return
+
+        with open(self.journal_path, 'a', encoding='utf-8') as f:
+            line = ops[0] if len(ops) == 1 else {'op': 'batch', 'ops': ops}
+            f.write(json.dumps(line, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self._journal_entries += len(ops)
+
+    def compact(self):
+        # Force a full snapshot rewrite (and clear the journal)
+        self._pending = []
+        self._write(([], {name: team.to_dict() for name, team in self._teams.items()}))
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS teams (
+    key TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    style TEXT NOT NULL,
+    avg_ovr REAL NOT NULL,
+    player_count INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_teams_name ON teams (name COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS idx_teams_avg_ovr ON teams (avg_ovr DESC);
+CREATE TABLE IF NOT EXISTS players (
+    team_key TEXT NOT NULL REFERENCES teams (key) ON DELETE CASCADE,
+    slot INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    ovr INTEGER NOT NULL,
+    position TEXT NOT NULL,
+    PRIMARY KEY (team_key, slot)
+);
+"""
+
+class SqliteTeamStore(TeamRepository):
+    """
+    Teams live in SQLite (teams + players tables, indexed on name and
+    average OVR). Rosters are loaded lazily on first access and the most
+    recently used cache_size teams are kept as Team objects; everything
+    else stays on disk. Changes wait in a dirty map (which reads consult
+    first) until the batched flush writes them in one transaction.
+    """
+    def __init__(self, path, flush_delay=STORE_FLUSH_DELAY, cache_size=STORE_CACHE_SIZE, import_json=None):
+        super().__init__(flush_delay)
+        self.path = path
+        self.cache_size = cache_size
+        self.import_json = import_json  # teams.json to migrate from when the DB is empty
+
+        self._conn = None
+        self._db_lock = threading.Lock()  # one connection shared by loop thread and flush worker
+        self._cache = OrderedDict()  # key -> Team (LRU)
+        self._dirty = {}  # key -> (version, Team or None for deleted)
+        self._version = 0
+
+    def _connect(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute("PRAGMA foreign_keys=ON")
+            self._conn.executescript(SQLITE_SCHEMA)
+        return self._conn
+
+    def _query(self, sql, params=()):
+        with self._db_lock:
+            return self._connect().execute(sql, params).fetchall()
+
+    # --- Loading ---
+
+    def load(self):
+        count = self._query("SELECT COUNT(*) FROM teams")[0][0]
+        if count == 0 and self.import_json and os.path.exists(self.import_json):
+            # One-off migration from the JSON store
+            data = JsonTeamStore(self.import_json).read_raw()
+            self._write([(key, 0, self._row(Team.from_dict(team_data))) for key, team_data in data.items()])
+            count = len(data)
+        self._migrate_positions()
+        return count
+
+    def _migrate_positions(self):
+        # Rewrite non-canonical position codes in place (one UPDATE per distinct spelling)
+        codes = [row[0] for row in self._query("SELECT DISTINCT position FROM players")]
+        fixes = [(Position.parse(code).name, code) for code in codes if Position.parse(code).name != code]
+        if fixes:
+            with self._db_lock:
+                conn = self._connect()
+                with conn:
+                    conn.executemany("UPDATE players SET position = ? WHERE position = ?", fixes)
+
+    def _fetch(self, key):
+        rows = self._query("SELECT name, style FROM teams WHERE key = ?", (key,))
+        if not rows:
+            return None
+        name, style = rows[0]
+        players = self._query("SELECT name, ovr, position FROM players WHERE team_key = ? ORDER BY slot", (key,))
+        return Team.from_dict({
+            'name': name,
+            'style': style,
+            'players': [{'name': n, 'ovr': o, 'position': p} for n, o, p in players],
+        })
+
+    def _remember(self, key, team):
+        self._cache[key] = team
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    # --- Mapping interface ---
+
+    def __getitem__(self, key):
+        if key in self._dirty:
+            team = self._dirty[key][1]
+            if team is None:
+                raise KeyError(key)
+            return team
+
+        team = self._cache.get(key)
+        if team is not None:
+            self._cache.move_to_end(key)
+            return team
+
+        team = self._fetch(key)
+        if team is None:
+            raise KeyError(key)
+        self._remember(key, team)
+        return team
+
+    def __contains__(self, key):
+        if key in self._dirty:
+            return self._dirty[key][1] is not None
+        if key in self._cache:
+            return True
+        return bool(self._query("SELECT 1 FROM teams WHERE key = ?", (key,)))
+
+    def __setitem__(self, key, team):
+        self._version += 1
+        self._dirty[key] = (self._version, team)
+        self._remember(key, team)
+        self._schedule_flush()
+
+    def __delitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        self._version += 1
+        self._dirty[key] = (self._version, None)
+        self._cache.pop(key, None)
+        self._schedule_flush()
+
+    def __iter__(self):
+        keys = [row[0] for row in self._query("SELECT key FROM teams")]
+        stored = set(keys)
+        for key in keys:
+            entry = self._dirty.get(key)
+            if entry is None or entry[1] is not None:
+                yield key
+        for key, (_, team) in list(self._dirty.items()):
+            if team is not None and key not in stored:
+                yield key
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def ranked_by_ovr(self):
+        # Served from the avg_ovr index; only unsaved teams are computed in Python
+        ranking = {key: avg for key, avg in self._query("SELECT key, avg_ovr FROM teams ORDER BY avg_ovr DESC")}
+        for key, (_, team) in list(self._dirty.items()):
+            if team is None:
+                ranking.pop(key, None)
+            else:
+                ranking[key] = team.get_avg_ovr()
+        return sorted(ranking.items(), key=lambda x: x[1], reverse=True)
+
+    # --- Writing ---
+
+    def _row(self, team):
+        data = team.to_dict()
+        return data, team.get_avg_ovr()
+
+    def _take_pending(self):
+        if not self._dirty:
+            return None
+        batch = []
+        for key, (version, team) in self._dirty.items():
+            batch.append((key, version, self._row(team) if team is not None else None))
+        return batch
+
+    def _write(self, batch):
+        with self._db_lock:
+            conn = self._connect()
+            with conn:  # one transaction per batch
+                for key, _, row in batch:
+                    if row is None:
+                        conn.execute("DELETE FROM teams WHERE key = ?", (key,))
+                        continue
+                    data, avg_ovr = row
+                    conn.execute(
+                        "INSERT INTO teams (key, name, style, avg_ovr, player_count) VALUES (?, ?, ?, ?, ?) "
+                        "ON CONFLICT (key) DO UPDATE SET name = excluded.name, style = excluded.style, "
+                        "avg_ovr = excluded.avg_ovr, player_count = excluded.player_count",
+                        (key, data['name'], data['style'], avg_ovr, len(data['players']))
+                    )
+                    conn.execute("DELETE FROM players WHERE team_key = ?", (key,))
+                    conn.executemany(
+                        "INSERT INTO players (team_key, slot, name, ovr, position) VALUES (?, ?, ?, ?, ?)",
+                        [(key, i, p['name'], p['ovr'], p['position']) for i, p in enumerate(data['players'])]
+                    )
+
+    def _has_pending(self):
+        return bool(self._dirty)
+
+    def _written(self, batch):
+        # Drop dirty entries that weren't changed again while we were writing
+        for key, version, _ in batch:
+            entry = self._dirty.get(key)
+            if entry is not None and entry[0] == version:
+                del self._dirty[key]
+
+def open_team_store(backend, json_path=TEAMS_DB, sqlite_path=TEAMS_SQLITE_DB):
+    if backend == 'sqlite':
+        return SqliteTeamStore(sqlite_path, import_json=json_path)
+    return JsonTeamStore(json_path)
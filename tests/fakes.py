@@ -0,0 +1,116 @@
+"""
+Local stand-ins for Discord and the clock, so the dispatcher and the live
+scheduler can be driven without a bot: FakeChannel records what was sent
+(and when, on the FakeClock), FakeClock replaces time.monotonic and
+asyncio.sleep with virtual time that only moves when every task is idle.
+"""
+import asyncio
+import heapq
+import itertools
+import types
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self._timers = []  # (wake time, order, future)
+        self._order = itertools.count()
+        self._yield = asyncio.sleep
+
+    def monotonic(self):
+        return self.now
+
+    async def sleep(self, delay, result=None):
+        if delay <= 0:
+            await self._yield(0)
+            return result
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._timers, (self.now + delay, next(self._order), future))
+        await future
+        return result
+
+    async def idle(self):
+        # Lets every runnable task run until all of them wait on something
+        for _ in range(20):
+            await self._yield(0)
+
+    async def advance(self, seconds=None):
+        """
+        Runs the loop, moving virtual time from timer to timer: up to `seconds`
+        from now, or until no timer is left if None.
+        """
+        until = None if seconds is None else self.now + seconds
+        while True:
+            await self.idle()
+            if not self._timers or (until is not None and self._timers[0][0] > until):
+                break
+            when, _, future = heapq.heappop(self._timers)
+            self.now = max(self.now, when)
+            if not future.done():
+                future.set_result(None)
+        if until is not None:
+            self.now = max(self.now, until)
+        await self.idle()
+
+    def install(self, monkeypatch, *modules):
+        # Point each module's `time` and `asyncio.sleep` at this clock
+        proxy = types.SimpleNamespace(**{name: getattr(asyncio, name) for name in dir(asyncio) if not name.startswith('_')})
+        proxy.sleep = self.sleep
+        for module in modules:
+            if hasattr(module, 'time'):
+                monkeypatch.setattr(module, 'time', types.SimpleNamespace(monotonic=self.monotonic, time=self.monotonic))
+            monkeypatch.setattr(module, 'asyncio', proxy)
+        return self
+
+class FakeMessage:
+    def __init__(self, channel, payload):
+        self.channel = channel
+        self.payload = payload
+        self.edits = []
+
+    async def edit(self, **payload):
+        await self.channel.started()
+        try:
+            self.edits.append((self.channel.clock.now if self.channel.clock else 0.0, payload))
+            self.payload = payload
+        finally:
+            self.channel.finished()
+
+class FakeChannel:
+    _ids = itertools.count(1)
+
+    def __init__(self, clock=None):
+        self.id = next(self._ids)
+        self.clock = clock
+        self.sent = []  # (time, content or payload)
+        self.messages = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.gate = None  # asyncio.Event that holds every request until set
+
+    async def started(self):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        if self.gate is not None:
+            await self.gate.wait()
+
+    def finished(self):
+        self.in_flight -= 1
+
+    async def send(self, content=None, **payload):
+        await self.started()
+        try:
+            body = content if content is not None else payload
+            self.sent.append((self.clock.now if self.clock else 0.0, body))
+            message = FakeMessage(self, body)
+            self.messages.append(message)
+            return message
+        finally:
+            self.finished()
+
+    @property
+    def texts(self):
+        return [body for _, body in self.sent]
+
+    @property
+    def times(self):
+        return [at for at, _ in self.sent]
@@ -0,0 +1,76 @@
+from types import SimpleNamespace
+
+import pytest
+
+from batch import BatchResult, run_batch, run_batch_parallel
+from models import Player, Team
+
+def make_team(name, base):
+    positions = ["GK", "LB", "CB", "CB", "RB", "CDM", "CM", "CAM", "LW", "RW", "ST"]
+    return Team(name, [Player(f"{name} {i}", base + (i * 3) % 9, pos) for i, pos in enumerate(positions)])
+
+def fake_match(home_score, away_score, home_goals=(), away_goals=()):
+    # Just what BatchResult.record reads: the score and per-player goals/assists
+    def side(score, goals):
+        players = [SimpleNamespace(goals=0, assists=0) for _ in range(3)]
+        for scorer, assister in goals:
+            players[scorer].goals += 1
+            if assister is not None:
+                players[assister].assists += 1
+        return SimpleNamespace(score=score, players=players)
+    return SimpleNamespace(home_team=side(home_score, home_goals), away_team=side(away_score, away_goals))
+
+def small_team(name):
+    # Duplicate names on purpose: stats are kept per roster slot
+    return Team(name, [Player("Nowak", 70, "GK"), Player("Nowak", 72, "ST"), Player("Kowalski", 71, "CM")])
+
+MATCHES = [
+    fake_match(2, 0, home_goals=[(1, 2), (1, None)]),
+    fake_match(1, 1, home_goals=[(2, 1)], away_goals=[(1, 0)]),
+    fake_match(0, 3, away_goals=[(1, 2), (2, 1), (1, None)]),
+    fake_match(2, 0, home_goals=[(1, 2), (2, None)]),
+]
+
+def test_aggregation():
+    result = BatchResult(small_team("A"), small_team("B"))
+    for match in MATCHES:
+        result.record(match)
+
+    assert (result.matches, result.home_wins, result.draws, result.away_wins) == (4, 2, 1, 1)
+    assert (result.home_win_rate, result.draw_rate, result.away_win_rate) == (0.5, 0.25, 0.25)
+    assert result.scoreline_distribution() == [((2, 0), 0.5), ((1, 1), 0.25), ((0, 3), 0.25)]
+    assert result.scoreline_distribution(top=1) == [((2, 0), 0.5)]
+
+    data = result.to_dict()
+    assert (data['avg_home_goals'], data['avg_away_goals']) == (1.25, 1.0)
+    home = [row for row in data['players'] if row['team'] == "A"]
+    assert [(row['name'], row['position']) for row in home] == [("Nowak", "GK"), ("Nowak", "ST"), ("Kowalski", "CM")]
+    assert [row['goals'] for row in home] == [0.0, 0.75, 0.5]
+    assert [row['assists'] for row in home] == [0.0, 0.25, 0.5]
+
+def test_merge_equals_one_run():
+    whole = BatchResult(small_team("A"), small_team("B"))
+    first, second = BatchResult(small_team("A"), small_team("B")), BatchResult(small_team("A"), small_team("B"))
+    for i, match in enumerate(MATCHES):
+        whole.record(match)
+        (first if i < 1 else second).record(match)
+    assert first.merge(second).to_dict() == whole.to_dict()
+    assert BatchResult(small_team("A"), small_team("B")).to_dict()['home_win'] == 0.0  # no division by zero
+
+def test_run_batch_totals():
+    home, away = make_team("Dom", 74), make_team("Wyjazd", 70)
+    before = (home.to_dict(), away.to_dict())
+    result = run_batch(home, away, 50, seed=3)
+    assert result.home_wins + result.draws + result.away_wins == 50
+    assert sum(result.scorelines.values()) == 50
+    assert sum(h * n for (h, _), n in result.scorelines.items()) == result.home_goals
+    assert (home.to_dict(), away.to_dict()) == before  # rosters are not touched
+    assert run_batch(home, away, 50, seed=3).to_dict() == result.to_dict()
+
+@pytest.mark.parametrize("n_matches", [0, 7, 45])
+def test_parallel_result_independent_of_workers(n_matches):
+    home, away = make_team("Dom", 74), make_team("Wyjazd", 70)
+    one = run_batch_parallel(home, away, n_matches, workers=1, seed=11, chunk_size=10)
+    two = run_batch_parallel(home, away, n_matches, workers=2, seed=11, chunk_size=10)
+    assert one.matches == n_matches
+    assert one.to_dict() == two.to_dict()
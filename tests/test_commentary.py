@@ -0,0 +1,35 @@
+import random
+
+from commentary import PACKS, RecentPicks, pick_from
+from config import COMMENTARY_PACK
+
+def test_pick_matches_filtered_choice():
+    # RecentPicks + pick_from must draw exactly what rng.choice on the filtered list would,
+    # including pools that share lines (goal pools all contain the generic goal lines)
+    bank = PACKS.get(COMMENTARY_PACK)
+    pools = list(bank.neutral.values()) + list(bank.goal.values()) + list(bank.pools.values())
+    order = random.Random(0).choices(pools, k=5000)
+
+    rng, history = random.Random(1), []
+    expected = []
+    for pool in order:
+        valid = [tid for tid in pool.ids if tid not in history]
+        if not valid:
+            valid = [tid for tid in pool.ids if tid not in history[-5:]] or pool.ids
+        tid = rng.choice(valid)
+        history = (history + [tid])[-15:]
+        expected.append(tid)
+
+    rng, recent = random.Random(1), RecentPicks(bank, 15)
+    picked = []
+    for pool in order:
+        blocked = recent.blocked(pool)
+        if len(blocked) == len(pool):
+            blocked = recent.blocked(pool, last=5)
+            if len(blocked) == len(pool):
+                blocked = ()
+        tid = pick_from(rng, pool, blocked)
+        recent.push(tid)
+        picked.append(tid)
+
+    assert picked == expected
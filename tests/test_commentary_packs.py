@@ -0,0 +1,90 @@
+import copy
+import json
+import os
+
+import pytest
+
+from commentary import CommentaryPacks, TemplateBank
+from config import COMMENTARY_PACK, COMMENTARY_PACK_DIR, EVENT_NOTHING
+
+with open(os.path.join(COMMENTARY_PACK_DIR, f"{COMMENTARY_PACK}.json"), encoding="utf-8") as f:
+    BASE_PACK = json.load(f)
+
+def edited(change):
+    pack = copy.deepcopy(BASE_PACK)
+    change(pack)
+    return pack
+
+def add_neutral(text):
+    return lambda pack: pack['templates'][EVENT_NOTHING]['early_neutral'].append(text)
+
+@pytest.fixture
+def packs(tmp_path):
+    return CommentaryPacks(str(tmp_path))
+
+def write_pack(packs, name, pack, mtime_ns):
+    # Explicit mtimes: two writes within the filesystem's timestamp resolution must still differ
+    path = packs.path(name)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(pack, f, ensure_ascii=False)
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+def test_shipped_pack_is_valid():
+    assert len(TemplateBank(BASE_PACK)) > 0
+
+@pytest.mark.parametrize("change, message", [
+    (add_neutral("{player} strzela do {stadium}"), "unknown placeholder {stadium}"),
+    (add_neutral("{player} strzela {"), "unbalanced braces"),
+    (add_neutral("{team}}"), "unbalanced braces"),
+    (lambda pack: pack['templates'][EVENT_NOTHING].pop('late_neutral'), "missing or empty lists: late_neutral"),
+    (lambda pack: pack['templates'][EVENT_NOTHING].__setitem__('high_chaos', []), "missing or empty lists: high_chaos"),
+    (lambda pack: pack['broadcast'].__setitem__('prefixes', []), "broadcast.prefixes"),
+    (lambda pack: pack['templates'].pop('meta'), "missing or empty lists: meta"),
+    (lambda pack: pack['templates'].__setitem__('shot', "nie lista"), "shot: expected a list of strings"),
+    (lambda pack: pack['templates']['foul'].append(7), "foul: expected a list of strings"),
+    (lambda pack: pack.pop('broadcast'), "'templates' and a 'broadcast'"),
+])
+def test_validation(change, message):
+    with pytest.raises(ValueError, match=message.replace("{", r"\{").replace("}", r"\}")):
+        TemplateBank(edited(change))
+
+def test_escaped_braces_are_allowed():
+    bank = TemplateBank(edited(add_neutral("{{kibice}} śpiewają dla {team}")))
+    assert "{{kibice}} śpiewają dla {team}" in bank.texts
+
+def test_hot_reload_on_mtime(packs):
+    write_pack(packs, "test", BASE_PACK, 1_000_000_000)
+    first = packs.get("test")
+    assert packs.get("test") is first  # unchanged file: cached bank
+    assert packs.available() == ["test"]
+
+    write_pack(packs, "test", edited(add_neutral("Nowa linia komentarza")), 2_000_000_000)
+    second = packs.get("test")
+    assert second is not first
+    assert "Nowa linia komentarza" in second.texts
+
+def test_invalid_edit_keeps_previous_bank(packs, capsys):
+    write_pack(packs, "test", BASE_PACK, 1_000_000_000)
+    good = packs.get("test")
+
+    write_pack(packs, "test", edited(add_neutral("{nieznane}")), 2_000_000_000)
+    assert packs.get("test") is good
+    assert "keeping the old one" in capsys.readouterr().out
+    with pytest.raises(ValueError, match="nieznane"):
+        packs.reload("test")
+    assert packs.get("test") is good
+
+    # Broken JSON is handled the same way, and a fixed file is picked up again
+    with open(packs.path("test"), 'w', encoding='utf-8') as f:
+        f.write("{")
+    os.utime(packs.path("test"), ns=(3_000_000_000, 3_000_000_000))
+    assert packs.get("test") is good
+    write_pack(packs, "test", edited(add_neutral("Naprawione")), 4_000_000_000)
+    assert "Naprawione" in packs.get("test").texts
+
+def test_missing_pack(packs):
+    with pytest.raises(OSError):
+        packs.get("brak")
+    write_pack(packs, "test", edited(add_neutral("{zle}")), 1_000_000_000)
+    with pytest.raises(ValueError, match="Commentary pack 'test'"):
+        packs.get("test")
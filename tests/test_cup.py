@@ -0,0 +1,135 @@
+import json
+
+import pytest
+
+from config import MATCH_LENGTH_MINUTES, EXTRA_TIME_MINUTES
+from models import Match, Player, Team
+from simulation import SimulationEngine, replay_match
+from tournament import Cup, bracket_order, bracket_slots, cup_odds
+
+def make_team(name, base):
+    positions = ["GK", "LB", "CB", "CB", "RB", "CDM", "CM", "CAM", "LW", "RW", "ST"]
+    return Team(name, [Player(f"{name} {i}", base + (i * 3) % 9, pos) for i, pos in enumerate(positions)])
+
+def make_teams(n):
+    return {f"K{i}": make_team(f"K{i}", 64 + i) for i in range(n)}
+
+def knockout(seed, home_base=72, away_base=72):
+    match = Match(make_team("Dom", home_base), make_team("Wyjazd", away_base), mode='live', seed=seed, knockout=True)
+    return SimulationEngine().simulate_match(match)
+
+def test_knockout_never_ends_level():
+    went_to_penalties = 0
+    for seed in range(60):
+        match = knockout(seed)
+        assert match.winner is not None
+        if match.length > MATCH_LENGTH_MINUTES:
+            assert match.length == MATCH_LENGTH_MINUTES + EXTRA_TIME_MINUTES
+        if match.penalties:
+            went_to_penalties += 1
+            assert match.home_team.score == match.away_team.score
+            assert match.penalties[0] != match.penalties[1]
+    assert went_to_penalties  # the seeds above do reach the shootout
+
+def test_knockout_flag_survives_replay():
+    seed = next(seed for seed in range(200) if knockout(seed).penalties)
+    match = knockout(seed)
+    snapshot = match.snapshot()
+    assert snapshot['knockout'] is True
+    replay = replay_match(snapshot['home'], snapshot['away'], snapshot['seed'], mode=snapshot['mode'],
+                          engine_version=snapshot['engine_version'], knockout=snapshot['knockout'])
+    assert replay.penalties == match.penalties
+    assert replay.logs == match.logs
+
+def shootout(monkeypatch, results, sent_off=()):
+    # Runs only the shootout, with every kick's outcome scripted as (home, away) per round
+    engine = SimulationEngine()
+    match = Match(make_team("Dom", 72), make_team("Wyjazd", 72), mode='headless', seed=1, knockout=True)
+    for i in sent_off:
+        match.home_team.players[i].is_sent_off = True
+    kicks = iter(result for pair in results for result in pair)
+    takers = []
+
+    def scripted(match, taker, keeper):
+        takers.append(taker)
+        return next(kicks)
+
+    monkeypatch.setattr(engine, "_penalty_kick", scripted)
+    engine._penalty_shootout(match)
+    return match, takers
+
+def test_shootout_stops_once_decided(monkeypatch):
+    # 3-0 after three rounds: the away side can't catch up with two kicks left
+    match, takers = shootout(monkeypatch, [(True, False)] * 5)
+    assert match.penalties == (3, 0)
+    assert len(takers) == 6
+
+def test_shootout_goes_to_sudden_death(monkeypatch):
+    match, takers = shootout(monkeypatch, [(True, True)] * 6 + [(True, False)])
+    assert match.penalties == (7, 6)
+    assert len(takers) == 14
+
+def test_sent_off_players_take_no_penalty(monkeypatch):
+    match, takers = shootout(monkeypatch, [(True, True)] * 12 + [(True, False)], sent_off=(4, 9, 10))
+    home_takers = {id(p) for p in takers[::2]}
+    assert len(home_takers) == 8  # the eight still on the pitch took turns, keeper included
+    assert not any(p.is_sent_off for p in takers)
+
+def test_bracket_seeding_and_byes():
+    assert bracket_order(2) == [0, 1]
+    assert bracket_order(4) == [0, 3, 1, 2]
+    assert bracket_order(8) == [0, 7, 3, 4, 1, 6, 2, 5]
+    for size in (2, 4, 8, 16, 32):
+        order = bracket_order(size)
+        assert sorted(order) == list(range(size))
+        # Each first-round pair adds up to size - 1: best against worst
+        assert all(order[i] + order[i + 1] == size - 1 for i in range(0, size, 2))
+
+    slots = bracket_slots(list("ABCDE"))
+    assert slots == ["A", None, "D", "E", "B", None, "C", None]
+    assert bracket_slots(list("ABCD")) == ["A", "D", "B", "C"]
+
+def test_cup_advancement():
+    teams = make_teams(5)
+    cup = Cup.draw("Puchar", list(teams), seed=11, shuffle=False)
+    assert cup.total_rounds == 3 and cup.round_name() == "Ćwierćfinał"
+    # Byes are decided at the draw
+    assert [tie.winner for tie in cup.current if tie.is_bye] == ["K0", "K1", "K2"]
+
+    ties = cup.play_round(SimulationEngine(), teams)
+    assert all(tie.winner in (tie.home, tie.away) for tie in ties)
+    assert cup.round == 1 and cup.round_name() == "Półfinał"
+    assert [key for tie in cup.current for key in (tie.home, tie.away)] == [tie.winner for tie in ties]
+
+    champion = cup.play(SimulationEngine(), teams)
+    assert cup.is_finished() and cup.champion == champion
+    assert len(cup.rounds) == 3
+
+def test_walkover_for_a_deleted_team():
+    teams = make_teams(4)
+    cup = Cup.draw("Puchar", list(teams), seed=5, shuffle=False)
+    del teams["K3"]  # drawn against K0
+    assert [i for i, _ in cup.matches(teams)] == [1]
+    assert cup.current[0].winner == "K0" and cup.current[0].score is None
+
+def test_cup_round_trip():
+    teams = make_teams(6)
+    cup = Cup.draw("Puchar", list(teams), seed=21)
+    cup.play_round(SimulationEngine(), teams)
+
+    restored = Cup.from_dict(json.loads(json.dumps(cup.to_dict())))
+    assert restored.to_dict() == cup.to_dict()
+    assert [tie.label() for tie in restored.rounds[0]] == [tie.label() for tie in cup.rounds[0]]
+
+    # Tie seeds come from the cup seed, so the restored cup finishes the same way
+    assert restored.play(SimulationEngine(), teams) == cup.play(SimulationEngine(), teams)
+    assert restored.to_dict() == cup.to_dict()
+
+def test_cup_odds_independent_of_workers():
+    teams = make_teams(6)
+    slots = bracket_slots(list(teams))
+    one = cup_odds(slots, teams, 40, workers=1, seed=9, chunk_size=7)
+    four = cup_odds(slots, teams, 40, workers=4, seed=9, chunk_size=7)
+    assert one.cups == 40
+    assert one.to_dict() == four.to_dict()
+    assert sum(win for _, _, win in one.ranking()) == pytest.approx(1.0)
@@ -0,0 +1,152 @@
+import asyncio
+
+import pytest
+
+import dispatch
+from dispatch import MessageDispatcher, TokenBucket
+from fakes import FakeChannel, FakeClock
+
+@pytest.fixture
+def clock(monkeypatch):
+    return FakeClock().install(monkeypatch, dispatch)
+
+def run(coro):
+    return asyncio.run(coro)
+
+def test_token_bucket(clock):
+    bucket = TokenBucket(rate=2.0, capacity=3)
+    for _ in range(3):
+        assert bucket.delay() == 0
+        bucket.take()
+    assert bucket.delay() == pytest.approx(0.5)
+    clock.now += 0.5
+    assert bucket.delay() == 0
+    clock.now += 10
+    bucket._refill()
+    assert bucket.tokens == 3  # never more than the burst
+
+def test_channel_pacing(clock):
+    # Messages too long to merge: the burst goes out at once, then one per 1/rate seconds
+    async def scenario():
+        dispatcher = MessageDispatcher(max_length=10)
+        channel = FakeChannel(clock)
+        for i in range(8):
+            dispatcher.send(channel, f"minuta {i}")
+        await clock.advance()
+        await dispatcher.drain(channel)
+        return dispatcher, channel
+
+    dispatcher, channel = run(scenario())
+    burst = dispatch.DISPATCH_CHANNEL_BURST
+    rate = dispatch.DISPATCH_CHANNEL_RATE
+    assert channel.texts == [f"minuta {i}" for i in range(8)]
+    assert channel.times[:burst] == [0.0] * burst
+    assert channel.times[burst:] == pytest.approx([(i + 1) / rate for i in range(8 - burst)])
+    assert dispatcher.stats.throttled > 0
+
+def test_global_bucket_paces_all_channels(clock):
+    async def scenario():
+        dispatcher = MessageDispatcher(max_length=10)
+        dispatcher.global_bucket = TokenBucket(rate=4.0, capacity=1)
+        channels = [FakeChannel(clock) for _ in range(4)]
+        for channel in channels:
+            dispatcher.send(channel, "gol!")
+        await clock.advance()
+        return channels
+
+    channels = run(scenario())
+    times = sorted(t for channel in channels for t in channel.times)
+    assert times == pytest.approx([0.0, 0.25, 0.5, 0.75])
+
+def test_waiting_minutes_are_merged(clock):
+    async def scenario():
+        dispatcher = MessageDispatcher(max_length=2000)
+        channel = FakeChannel(clock)
+        lines = [f"{minute}' " + "x" * 95 for minute in range(30)]
+        for line in lines:
+            dispatcher.send(channel, line)
+        await clock.advance()
+        return dispatcher, channel, lines
+
+    dispatcher, channel, lines = run(scenario())
+    assert all(len(text) <= 2000 for text in channel.texts)
+    assert "\n".join(channel.texts) == "\n".join(lines)
+    assert len(channel.texts) == 2
+    assert dispatcher.stats.merged == 28
+
+def test_long_text_is_split(clock):
+    async def scenario():
+        dispatcher = MessageDispatcher(max_length=100)
+        channel = FakeChannel(clock)
+        dispatcher.send(channel, "\n".join("linia %02d " % i + "y" * 40 for i in range(10)))
+        dispatcher.send(channel, "z" * 250)  # no line break to cut on
+        await clock.advance()
+        return channel
+
+    channel = run(scenario())
+    assert all(len(text) <= 100 for text in channel.texts)
+    assert channel.texts[-3:] == ["z" * 100, "z" * 100, "z" * 50]
+    joined = "".join(channel.texts)
+    assert joined.count("z") == 250 and joined.count("linia") == 10
+
+def test_rolling_updates_coalesce(clock):
+    async def scenario():
+        dispatcher = MessageDispatcher()
+        channel = FakeChannel(clock)
+        for i in range(5):
+            dispatcher.update("board", channel, content=f"stan {i}")
+        await clock.advance()
+        assert channel.texts == ["stan 4"]
+
+        # Edits held up on Discord: newer states pile up, only the newest goes out next
+        channel.gate = asyncio.Event()
+        dispatcher.update("board", channel, content="stan 5")
+        await clock.idle()
+        for i in range(6, 10):
+            dispatcher.update("board", channel, content=f"stan {i}")
+        channel.gate.set()
+        message = await dispatcher.close_rolling("board")
+        return dispatcher, channel, message
+
+    dispatcher, channel, message = run(scenario())
+    assert [payload for _, payload in message.edits] == [{'content': "stan 5"}, {'content': "stan 9"}]
+    assert channel.max_in_flight == 1
+    assert dispatcher.stats.coalesced == 4 + 3
+    assert dispatcher.stats.sent == 1 and dispatcher.stats.edited == 2
+    assert "board" not in dispatcher.rolling
+
+def test_stats(clock):
+    async def scenario():
+        dispatcher = MessageDispatcher(max_length=10)
+        channel = FakeChannel(clock)
+        for i in range(7):
+            dispatcher.send(channel, f"m{i}" + "." * 6)
+        depth = dispatcher.queue_depth(channel)
+        await clock.advance()
+        return dispatcher, depth
+
+    dispatcher, depth = run(scenario())
+    burst = dispatch.DISPATCH_CHANNEL_BURST
+    assert depth == 7 and dispatcher.stats.max_depth == 7
+    assert dispatcher.queue_depth() == 0
+    avg, p95, worst = dispatcher.stats.latency_summary()
+    assert worst == pytest.approx((7 - burst) / dispatch.DISPATCH_CHANNEL_RATE)
+    assert avg == pytest.approx(sum(range(1, 7 - burst + 1)) / 7)
+    assert MessageDispatcher().stats.latency_summary() == (0.0, 0.0, 0.0)
+
+def test_emptied_queue_takes_no_token(clock):
+    async def scenario():
+        dispatcher = MessageDispatcher(max_length=10)
+        channel = FakeChannel(clock)
+        queue = dispatcher._queue(channel)
+        queue.bucket.tokens = 0
+        dispatcher.send(channel, "gol!")
+        await clock.idle()  # worker is now waiting for a token
+        queue.pending.clear()
+        await clock.advance()
+        return dispatcher, queue, channel
+
+    dispatcher, queue, channel = run(scenario())
+    assert channel.sent == []
+    assert dispatcher.global_bucket.tokens == dispatch.DISPATCH_GLOBAL_BURST
+    assert queue.bucket.delay() == 0  # the refilled token is still there
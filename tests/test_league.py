@@ -0,0 +1,29 @@
+from collections import Counter
+
+import pytest
+
+from league import League, double_round_robin
+
+def longest_run(rounds, key):
+    # Most consecutive rounds at the same venue; a bye ends the run
+    best = run = 0
+    last = None
+    for pairs in rounds:
+        venue = next(('H' if home == key else 'A' for home, away in pairs if key in (home, away)), None)
+        run = run + 1 if venue is not None and venue == last else int(venue is not None)
+        last = venue
+        best = max(best, run)
+    return best
+
+@pytest.mark.parametrize("n", range(2, 25))
+def test_double_round_robin(n):
+    rounds = double_round_robin(range(n))
+    assert Counter(pair for pairs in rounds for pair in pairs) == Counter((a, b) for a in range(n) for b in range(n) if a != b)
+    assert max(longest_run(rounds, key) for key in range(n)) <= 2
+
+def test_saved_season_keeps_its_schedule():
+    league = League("Liga", range(20), seed=1)
+    data = league.to_dict()
+    assert League.from_dict(data).fixtures == league.fixtures
+    del data['schedule']  # saved before schedules were versioned
+    assert League.from_dict(data).fixtures == double_round_robin(league.keys, schedule=1)
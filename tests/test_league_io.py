@@ -0,0 +1,85 @@
+import json
+
+import pytest
+
+from league_io import export_league, lossy_txt_players, parse_league_file
+from models import Team, Player
+from storage import JsonTeamStore
+
+def make_league():
+    # Names with commas, quotes, digits and diacritics - the json/csv formats must keep them as they are
+    return [
+        ("Lech", Team("Lech Poznań", [Player("Bednarek", 80, "GK"), Player('Ishak, "Mikael"', 78, "ST"), Player("Żółć 2", 64, "CAM")], "ofensywny")),
+        ("Legia", Team("Legia", [Player("Tobiasz", 74, "GK"), Player("Kapustka", 7, "CM")])),
+    ]
+
+def dump(items):
+    return [(key, team.to_dict()) for key, team in items]
+
+@pytest.mark.parametrize("fmt", ["json", "csv"])
+def test_lossless_round_trip(fmt):
+    league = make_league()
+    teams, errors = parse_league_file(f"liga.{fmt}", export_league(league, fmt))
+    assert errors == []
+    if fmt == "csv":
+        # CSV has no column for the display name; the key stands in for it
+        league[0][1].name = "Lech"
+    assert dump(teams) == dump(league)
+
+def test_txt_round_trip_warns_about_lossy_names():
+    league = make_league()
+    league[1][1].players.append(Player("Kowalski_12", 70, "ST"))
+    assert lossy_txt_players(league) == [("Legia", "Kowalski_12")]
+
+    teams, errors = parse_league_file("liga.txt", export_league(league, "txt"))
+    assert errors == []
+    # Everything but the flagged player (and the styles, which txt has no place for) survives
+    assert [p.name for p in teams[0][1].players] == [p.name for p in league[0][1].players]
+    kowalski = teams[1][1].players[-1]
+    assert (kowalski.name, kowalski.ovr) == ("Kowalski_", 12)
+
+def test_json_errors_are_numbered():
+    data = [
+        {"name": "Dobra", "players": [{"name": "A", "ovr": 70, "position": "GK"}]},
+        {"name": "Zła lista", "players": "GK A 70"},
+        {"name": "Zły skład", "squad": ["GK A 70"]},
+        "nie drużyna",
+        {"name": "Zła pozycja", "players": [{"name": "B", "ovr": 70, "position": "QQ"}, {"name": "C", "ovr": 71}]},
+        {"name": "Zły zawodnik", "players": [{"name": "D", "ovr": 101}, 5, {"ovr": 60}]},
+    ]
+    teams, errors = parse_league_file("liga.json", json.dumps(data))
+    assert [key for key, _ in teams] == ["Dobra", "Zła pozycja"]
+    assert [p.name for p in teams[1][1].players] == ["C"]
+    assert [number for number, _ in errors] == [2, 3, 4, 5, 6, 6, 6, 6]
+    assert "'players' musi być listą" in errors[0][1]
+    assert "'squad' musi być tekstem" in errors[1][1]
+    assert "nieznana pozycja 'QQ'" in errors[3][1]
+    assert "poza zakresem" in errors[4][1]
+
+def test_csv_errors_are_numbered():
+    text = "\n".join([
+        "team,position,name,ovr",
+        "Lech,GK,Bednarek,80",
+        "Lech,QQ,Nikt,70",
+        ",ST,Bez drużyny,70",
+        "Lech,ST,Ishak,abc",
+        "Lech,ST,,70",
+        "Lech,,Bez pozycji,65",
+        "Lech,napastnik,Ishak,78",
+    ])
+    teams, errors = parse_league_file("liga.csv", text)
+    assert [(p.name, p.position.name) for p in teams[0][1].players] == [("Bednarek", "GK"), ("Bez pozycji", "MD"), ("Ishak", "ST")]
+    assert [line for line, _ in errors] == [3, 4, 5, 6]
+    assert "nieznana pozycja 'QQ'" in errors[0][1]
+
+def test_import_is_one_journal_op(tmp_path):
+    store = JsonTeamStore(str(tmp_path / "teams.json"))
+    store.load()
+    teams, _ = parse_league_file("liga.json", export_league(make_league(), "json"))
+    with store.batch():
+        for key, team in teams:
+            store[key] = team
+    # Leaving the batch without an event loop flushes synchronously
+    with open(store.journal_path, encoding="utf-8") as f:
+        lines = f.read().splitlines()
+    assert len(lines) == 1 and json.loads(lines[0])["op"] == "batch"
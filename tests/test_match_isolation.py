@@ -0,0 +1,69 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+from models import Match, Team, Player
+from simulation import SimulationEngine
+
+N_MATCHES = 50
+
+def make_team(name, base):
+    positions = ["GK", "LB", "CB", "CB", "RB", "CDM", "CM", "CAM", "LW", "RW", "ST"]
+    return Team(name, [Player(f"{name} {i}", base + (i * 3) % 9, pos) for i, pos in enumerate(positions)])
+
+def outcome(match):
+    # Everything a match produces that could leak between matches sharing a roster
+    return (
+        match.home_team.score, match.away_team.score, match.penalties,
+        [(p.goals, p.assists, round(p.rating, 6), p.condition) for p in match.home_team.players],
+        [(p.goals, p.assists, round(p.rating, 6), p.condition) for p in match.away_team.players],
+        [(e.minute, e.type, e.side, e.cue) for e in match.events],
+    )
+
+def fixtures(club, rivals):
+    # The club plays all 50 matches, home and away, some of them knockout
+    return [
+        (club, rivals[i % len(rivals)]) if i % 2 else (rivals[i % len(rivals)], club)
+        for i in range(N_MATCHES)
+    ]
+
+def new_matches(pairs, mode):
+    return [Match(home, away, mode=mode, seed=1000 + i, knockout=i % 5 == 0) for i, (home, away) in enumerate(pairs)]
+
+def test_overlapping_matches_share_one_team():
+    club = make_team("Klub", 75)
+    rivals = [make_team(f"Rywal {i}", 68 + 2 * i) for i in range(5)]
+    before = json.dumps(club.to_dict())
+    engine = SimulationEngine()
+    pairs = fixtures(club, rivals)
+
+    # Reference: every match played on its own
+    alone = []
+    for match in new_matches(pairs, 'fast'):
+        engine.simulate_match(match)
+        alone.append(outcome(match))
+
+    # All 50 at once, one minute of each in turn (what the live scheduler does)
+    matches = new_matches(pairs, 'fast')
+    while not all(m.is_finished() for m in matches):
+        for match in matches:
+            if not match.is_finished():
+                engine.simulate_minute(match)
+
+    assert [outcome(m) for m in matches] == alone
+    # Commentary too: it has its own per-match stream
+    assert [m.logs for m in matches[:5]] == [engine.simulate_match(m).logs for m in new_matches(pairs[:5], 'fast')]
+    assert json.dumps(club.to_dict()) == before
+
+def test_matches_in_threads():
+    club = make_team("Klub", 75)
+    rivals = [make_team(f"Rywal {i}", 70) for i in range(3)]
+    before = json.dumps(club.to_dict())
+    engine = SimulationEngine()
+    pairs = fixtures(club, rivals)
+
+    alone = [outcome(engine.simulate_match(m)) for m in new_matches(pairs, 'headless')]
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        threaded = list(pool.map(lambda m: outcome(engine.simulate_match(m)), new_matches(pairs, 'headless')))
+
+    assert threaded == alone
+    assert json.dumps(club.to_dict()) == before
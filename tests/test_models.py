@@ -0,0 +1,30 @@
+import pytest
+
+from models import Match, MatchPlayer, MatchTeam, Player, Position, Team
+
+def test_team_round_trip():
+    data = {
+        'name': "Legia",
+        'style': "Attacking",
+        'players': [
+            {'name': "Stanek", 'ovr': 79, 'position': "GK"},
+            {'name': "Łukasz Żyro", 'ovr': 81, 'position': "CM"},
+        ],
+    }
+    assert Team.from_dict(data).to_dict() == data
+
+def test_raw_position_codes_are_canonical():
+    team = Team.from_dict({'name': "Legia", 'players': [{'name': "Stanek", 'ovr': 79, 'position': "BR"}]})
+    assert team.players[0].position is Position.GK
+    assert team.to_dict()['players'][0]['position'] == "GK"
+
+@pytest.mark.parametrize("obj", [
+    Player("Stanek", 79, "GK"),
+    Team("Legia", [Player("Stanek", 79, "GK")]),
+    MatchPlayer(Player("Stanek", 79, "GK")),
+    MatchTeam(Team("Legia", [Player("Stanek", 79, "GK")])),
+    Match(Team("A", [Player("a", 70)]), Team("B", [Player("b", 70)]), seed=1),
+])
+def test_models_have_no_instance_dict(obj):
+    # Thousands of rosters and matches are held at once; per-instance __dict__s add up
+    assert not hasattr(obj, '__dict__')
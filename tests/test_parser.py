@@ -0,0 +1,109 @@
+import random
+import re
+
+import pytest
+
+from models import Position, POSITION_ALIASES
+from utils import parse_squad_text, parse_squads
+
+def legacy_parse_squad_text(text):
+    # The parser before the single-pass scanner (one big lazy regex per call), kept as the reference
+    text = re.sub(r'<[^>]+>|https?://\S+', '', text)
+    positions = sorted(POSITION_ALIASES.keys(), key=len, reverse=True)
+    pos_pattern = r'(' + '|'.join(re.escape(p) for p in positions) + r')'
+    unit_regex = re.compile(
+        fr'\b(?P<pos>{pos_pattern})\b\s*[–\-\•:|]?\s*(?P<name>.*?)\s*(?P<ovr>(\d{{2}}))',
+        re.IGNORECASE | re.UNICODE
+    )
+    players = []
+    for m in unit_regex.finditer(text):
+        name = re.sub(r'[()\[\]–\-:;|•]', " ", m.group('name').strip())
+        name = " ".join(name.split()).strip()
+        if not name or len(name) < 2:
+            name = "Unknown Player"
+        players.append((name, int(m.group('ovr')), POSITION_ALIASES.get(m.group('pos').upper(), Position.MD)))
+    return players
+
+def as_tuples(players):
+    return [(p.name, p.ovr, p.position) for p in players]
+
+# Pieces of real pastes: positions in both languages and cases, Polish names, separators,
+# emoji and Discord markup. Always joined by whitespace (see the pinned differences below).
+POSITIONS = ["GK", "gk", "BR", "Bramkarz", "LO", "PO", "ŚO", "Lśo", "PŚP", "ŚPO", "SPD", "LS", "PS", "N", "ST", "CB", "CAM", "MD"]
+WORDS = ["Stanek", "Mauro", "Junior", "Copete", "Łukasz", "Żyro", "Kowalski", "Nowak", "da", "Silva", "Van", "Dijk", "Śląsk"]
+JUNK = ["-", "–", ":", "|", "•", "(", ")", "[c]", "⚽", "🔥", "<@123456>", "<:emoji:987>", "https://discord.gg/x", "7", "1"]
+
+def random_paste(rng):
+    parts = []
+    for _ in range(rng.randint(1, 30)):
+        roll = rng.random()
+        if roll < 0.25:
+            parts.append(rng.choice(POSITIONS))
+        elif roll < 0.6:
+            parts.append(rng.choice(WORDS))
+        elif roll < 0.8:
+            parts.append(str(rng.randint(10, 99)))
+        else:
+            parts.append(rng.choice(JUNK))
+        parts.append(rng.choice([" ", " ", "  ", "\n", " \n "]))
+    return "".join(parts)
+
+def test_matches_legacy_parser_on_random_pastes():
+    rng = random.Random(2024)
+    for _ in range(3000):
+        text = random_paste(rng)
+        assert as_tuples(parse_squad_text(text)) == legacy_parse_squad_text(text), text
+
+@pytest.mark.parametrize("text", [
+    "GK - Stanek 79 Lo - Mauro Junior 79 Lśo - Copete 75",
+    "GK Stanek 79\nCB Nowak 80\nST Kowalski 88",
+    "**GK:** Stanek (79)\n**ŚO:** Nowak (80)",
+    "BR\nStanek\n79",
+    "GK Jan\nNowak 79\nST Kowalski 80",
+    "MD Kowalski_12 67",
+    "PŚP Łukasz Żyro 7 81",
+    "MD Jan ST\nNowak 80",
+    "BR\n⚽\nŚO SPD 50",
+    "GK\n:\nStanek 79\nST Nowak\n:\n80",
+])
+def test_matches_legacy_parser_on_real_pastes(text):
+    assert as_tuples(parse_squad_text(text)) == legacy_parse_squad_text(text)
+
+# Deliberate differences from the legacy parser (documented in utils._scan_units)
+@pytest.mark.parametrize("text, legacy, now", [
+    ("GK Stanek 100 79", [("Stanek", 10, Position.GK)], [("Stanek 100", 79, Position.GK)]),
+    ("GK1 Stanek 79", [], [("1 Stanek", 79, Position.GK)]),
+    ("2GK Stanek 79", [], [("Stanek", 79, Position.GK)]),
+    ("GK Stanek <> 79", [("Stanek <>", 79, Position.GK)], [("Stanek", 79, Position.GK)]),
+    ("GK Stanek <a\nb> 79\nST Nowak 80", [("Stanek", 79, Position.GK), ("Nowak", 80, Position.ST)], [("Nowak", 80, Position.ST)]),
+])
+def test_pinned_differences(text, legacy, now):
+    assert legacy_parse_squad_text(text) == legacy
+    assert as_tuples(parse_squad_text(text)) == now
+
+def test_long_paste_is_linear():
+    # Used to backtrack on every position with no OVR after it; must stay fast and find the one unit
+    text = "GK " + "Stanek " * 20000 + "\nST Nowak 80"
+    assert as_tuples(parse_squad_text(text)) == [("Nowak", 80, Position.ST)]
+
+def test_parse_squads_reports_errors_per_line():
+    text = "\n".join([
+        "GK Zbłąkany 70",
+        "[Legia Warszawa]",
+        "GK Stanek 79",
+        "cokolwiek",
+        "ST Nowak",
+        "# Wisła",
+        "Drużyna: Pusta",
+    ])
+    squads, errors = parse_squads(text)
+    assert [(name, as_tuples(players), line) for name, players, line in squads] == [
+        ("Legia Warszawa", [("Stanek", 79, Position.GK)], 2),
+    ]
+    assert errors == [
+        (1, "Zawodnicy przed nagłówkiem drużyny"),
+        (4, "Nie rozpoznano zawodnika: cokolwiek"),
+        (5, "Pozycja bez OVR"),
+        (6, "Drużyna 'Wisła' nie ma zawodników"),
+        (7, "Drużyna 'Pusta' nie ma zawodników"),
+    ]
@@ -0,0 +1,110 @@
+import asyncio
+import json
+
+import pytest
+
+import predictions
+from config import ENGINE_VERSION
+from models import Player, Team
+from predictions import PredictionCache, roster_fingerprint
+
+def make_team(name, ovr=75):
+    return Team(name, [Player(f"{name} GK", ovr, "GK"), Player(f"{name} ST", ovr, "ST")])
+
+def result(matches=100, home_win=0.5):
+    return {'matches': matches, 'home_win': home_win}
+
+@pytest.fixture
+def cache(tmp_path):
+    return PredictionCache(str(tmp_path / "predictions.json"), max_entries=3, flush_delay=0.01)
+
+def test_lru_eviction(cache):
+    teams = [make_team(f"T{i}") for i in range(5)]
+    keys = [cache.key(teams[0], team) for team in teams[1:]]
+    for key in keys[:3]:
+        cache.put(key, result())
+    cache.get(keys[0])  # now the most recently used
+    cache.put(keys[3], result())
+    assert len(cache) == 3
+    assert cache.get(keys[1]) is None
+    assert all(cache.get(key) for key in (keys[0], keys[2], keys[3]))
+
+def test_roster_change_is_a_miss(cache):
+    home, away = make_team("A"), make_team("B")
+    cache.put(cache.key(home, away), result())
+    for edit in (lambda t: setattr(t, 'style', "Attacking"),
+                 lambda t: t.players.append(Player("Nowy", 70, "CM")),
+                 lambda t: setattr(t.players[0], 'ovr', 76)):
+        changed = make_team("A")
+        edit(changed)
+        assert roster_fingerprint(changed) != roster_fingerprint(home)
+        assert cache.get(cache.key(changed, away)) is None
+    assert cache.get(cache.key(make_team("A"), away)) is not None
+
+def test_invalidate_drops_every_fixture_of_a_team(cache):
+    a, b, c = make_team("A"), make_team("B"), make_team("C")
+    cache.put(cache.key(a, b), result())
+    cache.put(cache.key(c, a), result())
+    cache.put(cache.key(b, c), result())
+    assert cache.invalidate(a) == 2
+    assert len(cache) == 1 and cache.get(cache.key(b, c))
+    assert cache.invalidate(a) == 0
+
+def test_needs_at_least_n_matches(cache):
+    key = cache.key(make_team("A"), make_team("B"))
+    cache.put(key, result(matches=1000))
+    assert cache.get(key, 1000) is not None
+    assert cache.get(key, 500) is not None
+    assert cache.get(key, 1001) is None
+    assert (cache.hits, cache.misses) == (2, 1)
+
+def test_disk_round_trip(cache):
+    teams = [make_team(f"T{i}") for i in range(4)]
+    keys = [cache.key(teams[0], team) for team in teams[1:]]
+    for i, key in enumerate(keys):
+        cache.put(key, result(home_win=i / 10))
+    cache.get(keys[0])
+    cache.save()
+
+    loaded = PredictionCache(cache.path, max_entries=3)
+    assert loaded.load() == 3
+    assert loaded.to_dict() == cache.to_dict()  # LRU order included
+    loaded.put(cache.key(teams[1], teams[2]), result())
+    assert loaded.get(keys[1]) is None  # still the oldest after the reload
+
+def test_other_engine_version_is_dropped(cache):
+    key = cache.key(make_team("A"), make_team("B"))
+    cache.put(key, result())
+    data = cache.to_dict()
+    data['entries'].append([ENGINE_VERSION - 1, "stary", "odcisk", result()])
+    with open(cache.path, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+
+    loaded = PredictionCache(cache.path)
+    assert loaded.load() == 1
+    assert loaded.get(key) is not None
+
+def test_saves_are_debounced(cache, monkeypatch):
+    writes = []
+    real_write = predictions.atomic_write_json
+    monkeypatch.setattr(predictions, "atomic_write_json", lambda path, *args, **kwargs: (writes.append(path), real_write(path, *args, **kwargs)))
+    teams = [make_team(f"T{i}") for i in range(4)]
+
+    async def import_league():
+        for team in teams[1:]:
+            cache.put(cache.key(teams[0], team), result())
+        # Like /import_league: every team is invalidated, one by one
+        for team in teams:
+            cache.invalidate(team)
+            cache.schedule_save()
+        await cache._save_task
+
+    asyncio.run(import_league())
+    assert writes == [cache.path]
+    assert PredictionCache(cache.path).load() == 0
+
+    cache.put(cache.key(teams[0], teams[1]), result())
+    cache.schedule_save()  # no running loop: written straight away
+    assert len(writes) == 2
+    cache.flush()
+    assert len(writes) == 2
@@ -0,0 +1,46 @@
+import pytest
+
+from config import ENGINE_VERSION
+from models import Match, Player, Team
+from simulation import SimulationEngine, replay_match
+
+def make_team(name, base):
+    positions = ["GK", "LB", "CB", "CB", "RB", "CDM", "CM", "CAM", "LW", "RW", "ST"]
+    return Team(name, [Player(f"{name} {i}", base + (i * 3) % 9, pos) for i, pos in enumerate(positions)])
+
+def played(home, away, seed, knockout=False):
+    return SimulationEngine().simulate_match(Match(home, away, mode='live', seed=seed, knockout=knockout))
+
+def replayed(snapshot):
+    return replay_match(snapshot['home'], snapshot['away'], snapshot['seed'], mode=snapshot['mode'],
+                        engine_version=snapshot['engine_version'], knockout=snapshot['knockout'])
+
+@pytest.mark.parametrize("seed", [1, 7, 42])
+def test_replay_is_identical(seed):
+    match = played(make_team("Legia", 76), make_team("Wisła", 72), seed)
+    replay = replayed(match.snapshot())
+    assert replay.logs == match.logs
+    assert [str(e) for e in replay.history] == [str(e) for e in match.history]
+    assert (replay.home_team.score, replay.away_team.score) == (match.home_team.score, match.away_team.score)
+
+def test_replay_after_roster_edit():
+    # /edit_team between the match and the dispute must not change what gets replayed
+    home, away = make_team("Legia", 76), make_team("Wisła", 72)
+    match = played(home, away, seed=3)
+    logs, history = match.logs, [str(e) for e in match.history]
+
+    home.players = home.players[:5]
+    home.style = "Attacking"
+    away.players = [Player("Ktoś Nowy", 99, "ST")] + away.players
+
+    snapshot = match.snapshot()
+    assert len(snapshot['home']['players']) == 11 and snapshot['home']['style'] != "Attacking"
+    replay = replayed(snapshot)
+    assert replay.logs == logs
+    assert [str(e) for e in replay.history] == history
+
+def test_replay_refuses_other_engine_version():
+    snapshot = played(make_team("Legia", 76), make_team("Wisła", 72), seed=1).snapshot()
+    snapshot['engine_version'] = ENGINE_VERSION - 1
+    with pytest.raises(ValueError):
+        replayed(snapshot)
@@ -0,0 +1,97 @@
+import random
+
+from resolver import TeamResolver, normalize_name
+
+KEYS = ["Śląsk Wrocław", "Wisła Kraków", "Wisła Płock", "Legia Warszawa", "Łódzki KS", "Lech Poznań", "Górnik Zabrze"]
+
+def make_resolver(keys=KEYS):
+    resolver = TeamResolver()
+    resolver.rebuild(keys)
+    return resolver
+
+def rebuilt_index(resolver):
+    # What the index would hold if built from scratch for the same keys and aliases
+    fresh = TeamResolver()
+    for key, names in resolver._names.items():
+        fresh.add(key, *names)
+    return fresh
+
+def index_state(resolver):
+    return (
+        {key: set(names) for key, names in resolver._names.items()},
+        {name: set(keys) for name, keys in resolver._by_name.items()},
+        dict(resolver._by_role),
+        {tri: set(keys) for tri, keys in resolver._by_trigram.items()},
+    )
+
+def test_normalization():
+    assert normalize_name("Śląsk  Wrocław!") == "slask wroclaw"
+    assert normalize_name("ŁÓDZKI ks") == "lodzki ks"
+    assert normalize_name("Ærø-Straße") == "aero strasse"
+    assert normalize_name("  ") == ""
+
+def test_diacritics_and_case_resolve():
+    resolver = make_resolver()
+    assert resolver.exact("slask wroclaw") == "Śląsk Wrocław"
+    assert resolver.exact("ŚLĄSK WROCŁAW") == "Śląsk Wrocław"
+    assert resolver.resolve("lodzki") == "Łódzki KS"
+    assert resolver.resolve("gornik") == "Górnik Zabrze"
+
+def test_role_mention_lookup():
+    resolver = make_resolver(KEYS + ["<@&123456>"])
+    assert resolver.resolve("<@&123456>") == "<@&123456>"
+    assert resolver.search("mecz z <@&123456> dziś") == [("<@&123456>", 1.0)]
+    assert resolver.resolve("<@&999>") is None
+
+    # A role's display name is searchable once added as an alias
+    resolver.add_alias("<@&123456>", "Pogoń Szczecin")
+    assert resolver.resolve("pogon") == "<@&123456>"
+    assert list(resolver.role_keys()) == ["<@&123456>"]
+
+def test_rank_order():
+    resolver = make_resolver(["Arka", "Arka Gdynia", "Stal Arka", "Arko"])
+    ranked = dict(resolver.search("arka"))
+    assert ranked["Arka"] == 1.0  # exact
+    assert ranked["Arka Gdynia"] == 0.9  # prefix
+    assert ranked["Stal Arka"] == 0.8  # substring
+    assert 0 < ranked["Arko"] < 0.8  # trigram similarity only
+    assert [key for key, _ in resolver.search("arka")] == ["Arka", "Arka Gdynia", "Stal Arka", "Arko"]
+    assert resolver.resolve("legia warszawa") is None
+
+def test_ambiguous_ties_are_refused():
+    resolver = make_resolver()
+    assert resolver.resolve("wisla") is None
+    assert set(resolver.candidates("wisla")) == {"Wisła Kraków", "Wisła Płock"}
+    assert resolver.resolve("wisla plock") == "Wisła Płock"
+
+    # Two keys with the same normalized name: exact() can't choose either
+    resolver.add("Wisla Krakow")
+    assert resolver.exact("wisla krakow") is None
+    assert resolver.exact("Wisla Krakow") == "Wisla Krakow"  # the key itself still works
+
+def test_incremental_updates_match_a_rebuild():
+    rng = random.Random(4)
+    resolver = make_resolver([])
+    pool = KEYS + ["Wisła II", "<@&42>", "Arka", "Arka Gdynia", "!!!"]
+    for _ in range(300):
+        key = rng.choice(pool)
+        if key in resolver and rng.random() < 0.5:
+            resolver.remove(key)
+        elif rng.random() < 0.2 and key in resolver:
+            resolver.add_alias(key, rng.choice(["Biała Gwiazda", "Kolejorz", "Wojskowi"]))
+        else:
+            resolver.add(key)
+        assert index_state(resolver) == index_state(rebuilt_index(resolver))
+
+    for key in list(resolver._names):
+        resolver.remove(key)
+    assert index_state(resolver) == ({}, {}, {}, {})
+
+def test_trigram_candidates_after_remove():
+    resolver = make_resolver()
+    resolver.remove("Lech Poznań")
+    assert "Lech Poznań" not in resolver
+    assert resolver.resolve("lech") is None
+    assert not any("Lech Poznań" in keys for keys in resolver._by_trigram.values())
+    resolver.add("Lech Poznań")
+    assert resolver.resolve("lech") == "Lech Poznań"
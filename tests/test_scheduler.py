@@ -0,0 +1,132 @@
+import asyncio
+
+import pytest
+
+import dispatch
+import scheduler
+from dispatch import MessageDispatcher
+from models import Match, Team, Player
+from scheduler import MatchScheduler
+from simulation import SimulationEngine
+from fakes import FakeChannel, FakeClock
+
+TICK = 1.0
+
+def make_team(name, base):
+    positions = ["GK", "LB", "CB", "CB", "RB", "CDM", "CM", "CAM", "LW", "RW", "ST"]
+    return Team(name, [Player(f"{name} {i}", base + (i * 3) % 9, pos) for i, pos in enumerate(positions)])
+
+@pytest.fixture
+def clock(monkeypatch):
+    return FakeClock().install(monkeypatch, dispatch, scheduler)
+
+def new_scheduler(max_matches=10):
+    return MatchScheduler(SimulationEngine(), MessageDispatcher(), tick_interval=TICK, max_matches=max_matches)
+
+def new_match(seed, mode='board'):
+    return Match(make_team("Gospodarze", 72), make_team("Goście", 70), mode=mode, seed=seed)
+
+def test_cap(clock):
+    async def scenario():
+        live = new_scheduler(max_matches=2)
+        started = [live.start(new_match(i), FakeChannel(clock), f"mecz {i}") for i in range(3)]
+        full = live.is_full()
+        live.cancel(started[0].id)
+        again = live.start(new_match(3), FakeChannel(clock), "mecz 3")
+        for match_id in list(live.matches):
+            live.cancel(match_id)
+        await clock.advance()
+        return started, full, again
+
+    started, full, again = asyncio.run(scenario())
+    assert started[0] and started[1] and started[2] is None
+    assert full
+    assert again is not None  # a cancelled match frees its slot
+
+def test_one_tick_advances_every_match(clock):
+    async def scenario():
+        live = new_scheduler()
+        matches = [new_match(i, mode) for i, mode in enumerate(['board', 'live', 'board'])]
+        channels = [FakeChannel(clock) for _ in matches]
+        for i, (match, channel) in enumerate(zip(matches, channels)):
+            live.start(match, channel, f"mecz {i}")
+        await clock.advance(4 * TICK)
+        minutes = [match.current_minute for match in matches]
+        for match_id in list(live.matches):
+            live.cancel(match_id)
+        await clock.advance()
+        return minutes, channels
+
+    minutes, channels = asyncio.run(scenario())
+    assert minutes == [5, 5, 5]  # ticks at 0, 1, 2, 3 and 4 seconds
+    assert all(channel.sent for channel in channels)
+
+def test_pause_and_resume(clock):
+    async def scenario():
+        live = new_scheduler()
+        paused, running = new_match(1), new_match(2)
+        first = live.start(paused, FakeChannel(clock), "pauza")
+        live.start(running, FakeChannel(clock), "gra")
+        await clock.advance(TICK / 2)
+
+        assert live.pause(first.id) and not live.pause(first.id)
+        assert first.status() == "⏸️ pauza"
+        await clock.advance(3 * TICK)
+        assert paused.current_minute == 1 and running.current_minute == 4
+
+        assert live.resume(first.id) and not live.resume(first.id)
+        await clock.advance(2 * TICK)
+        assert paused.current_minute == 3 and running.current_minute == 6
+        assert first.status() == "3'"
+        assert not live.pause(999) and not live.resume(999)
+
+        for match_id in list(live.matches):
+            live.cancel(match_id)
+        await clock.advance()
+
+    asyncio.run(scenario())
+
+def test_cancel(clock):
+    finished, aborted = [], []
+
+    async def on_finish(live_match):
+        finished.append(live_match.id)
+
+    async def on_abort(live_match):
+        aborted.append(live_match.id)
+
+    async def scenario():
+        live = new_scheduler()
+        match = new_match(1)
+        channel = FakeChannel(clock)
+        entry = live.start(match, channel, "mecz", on_finish=on_finish, on_abort=on_abort)
+        await clock.advance(2.5 * TICK)
+        minute = match.current_minute
+
+        assert live.cancel(entry.id) is entry and entry.cancelled
+        assert live.cancel(entry.id) is None
+        await clock.advance()
+        return live, match, minute
+
+    live, match, minute = asyncio.run(scenario())
+    assert match.current_minute == minute  # no tick after the cancel
+    assert live.matches == {} and live._task.done()
+    assert ('board', 1) not in live.dispatcher.rolling
+    assert aborted == [1] and finished == []
+
+def test_finished_matches_leave_the_loop(clock):
+    finished = []
+
+    async def on_finish(live_match):
+        finished.append((live_match.id, live_match.match.is_finished()))
+
+    async def scenario():
+        live = new_scheduler()
+        for i in range(3):
+            live.start(new_match(i, 'live'), FakeChannel(clock), f"mecz {i}", on_finish=on_finish)
+        await clock.advance()
+        return live
+
+    live = asyncio.run(scenario())
+    assert sorted(finished) == [(1, True), (2, True), (3, True)]
+    assert live.matches == {} and live._task.done()
@@ -0,0 +1,126 @@
+import asyncio
+import json
+import os
+import time
+
+import pytest
+
+import storage
+from models import Team, Player
+from storage import JsonTeamStore, SqliteTeamStore, atomic_write_json
+
+def make_team(name, ovr=75):
+    return Team(name, [Player(f"{name} GK", ovr, "GK"), Player(f"{name} ST", ovr, "ST")])
+
+def roster(store, key):
+    return store[key].to_dict()
+
+@pytest.fixture(params=["json", "sqlite"])
+def open_store(request, tmp_path):
+    # Opens (and loads) a store of the requested backend on the same files every time
+    def opener(**kwargs):
+        if request.param == "json":
+            store = JsonTeamStore(str(tmp_path / "teams.json"), **kwargs)
+        else:
+            store = SqliteTeamStore(str(tmp_path / "teams.db"), **kwargs)
+        store.load()
+        return store
+    return opener
+
+def test_round_trip(open_store):
+    store = open_store()
+    for i in range(20):
+        store[f"T{i}"] = make_team(f"T{i}", 60 + i)
+    del store["T3"]
+    store["T4"].players = [Player("Nowy", 90, "ST")]
+    store.save("T4")
+    store.flush()
+
+    reopened = open_store()
+    assert sorted(reopened) == sorted(f"T{i}" for i in range(20) if i != 3)
+    assert roster(reopened, "T4") == roster(store, "T4")
+    assert reopened.ranked_by_ovr()[0] == ("T4", 90)
+
+def test_edit_during_flush_is_kept(open_store, monkeypatch):
+    # A change recorded while the debounced write runs in its worker thread must still reach the disk
+    store = open_store(flush_delay=0.01)
+    slow_write = store._write
+    monkeypatch.setattr(store, "_write", lambda batch: (time.sleep(0.1), slow_write(batch)))
+
+    async def edit():
+        store["A"] = make_team("A", 70)
+        await asyncio.sleep(0.05)  # first flush is now writing
+        store["A"] = make_team("A", 80)
+        while store._flush_task is not None and not store._flush_task.done():
+            await asyncio.sleep(0.01)
+
+    asyncio.run(edit())
+    assert roster(open_store(), "A") == make_team("A", 80).to_dict()
+
+def test_torn_journal_tail_is_dropped(tmp_path):
+    path = str(tmp_path / "teams.json")
+    store = JsonTeamStore(path)
+    store.load()
+    store["A"] = make_team("A")
+    store["B"] = make_team("B")
+    with open(path + ".journal", "a", encoding="utf-8") as f:
+        f.write('{"op": "put", "key": "C", "te')  # crash halfway through an append
+
+    store = JsonTeamStore(path)
+    store.load()
+    assert sorted(store) == ["A", "B"]
+    store["D"] = make_team("D")  # must not be glued onto the torn line
+
+    store = JsonTeamStore(path)
+    store.load()
+    assert sorted(store) == ["A", "B", "D"]
+
+def test_journal_compaction(tmp_path):
+    path = str(tmp_path / "teams.json")
+    store = JsonTeamStore(path, compact_after=5)
+    store.load()
+    for i in range(12):
+        store[f"T{i}"] = make_team(f"T{i}")
+
+    with open(path, encoding="utf-8") as f:
+        assert len(json.load(f)) == 10  # snapshot rewritten at the 5th and 10th op
+    reopened = JsonTeamStore(path)
+    reopened.load()
+    assert sorted(reopened) == sorted(f"T{i}" for i in range(12))
+
+def test_atomic_write_keeps_old_file_on_failure(tmp_path, monkeypatch):
+    path = str(tmp_path / "data.json")
+    atomic_write_json(path, {"a": 1})
+
+    def broken_dump(*args, **kwargs):
+        raise OSError("disk full")
+    monkeypatch.setattr(storage.json, "dump", broken_dump)
+    with pytest.raises(OSError):
+        atomic_write_json(path, {"a": 2})
+
+    monkeypatch.undo()
+    with open(path, encoding="utf-8") as f:
+        assert json.load(f) == {"a": 1}
+    assert os.listdir(tmp_path) == ["data.json"]
+
+def test_legacy_positions_are_migrated_in_one_write(tmp_path):
+    path = tmp_path / "teams.json"
+    legacy = {
+        f"T{i}": {'name': f"T{i}", 'style': "Balanced", 'players': [{'name': "Bramkarz", 'ovr': 70, 'position': "BR"}, {'name': "Napastnik", 'ovr': 72, 'position': "N"}]}
+        for i in range(5)
+    }
+    legacy["Nowa"] = make_team("Nowa").to_dict()  # already canonical, not rewritten
+    path.write_text(json.dumps(legacy), encoding="utf-8")
+
+    store = JsonTeamStore(str(path))
+    store.load()
+    with open(store.journal_path, encoding="utf-8") as f:
+        lines = [json.loads(line) for line in f]
+    assert len(lines) == 1 and lines[0]["op"] == "batch"
+    assert sorted(op["key"] for op in lines[0]["ops"]) == [f"T{i}" for i in range(5)]
+
+    reopened = JsonTeamStore(str(path))
+    reopened.load()
+    assert [p.position.name for p in reopened["T0"].players] == ["GK", "ST"]
+    with open(store.journal_path, encoding="utf-8") as f:
+        assert len(f.readlines()) == 1  # nothing left to migrate on the second load
@@ -0,0 +1,54 @@
+import math
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from batch import run_batch
+from models import Team, Player
+from vector_engine import VectorizedEngine
+
+PYTHON_MATCHES = 1500
+VECTOR_MATCHES = 10000
+SIGMAS = 4  # a true mismatch in the rules shows up far beyond this; noise almost never does
+
+def make_team(name, base):
+    positions = ["GK", "LB", "CB", "CB", "RB", "CDM", "CM", "CAM", "LW", "RW", "ST"]
+    return Team(name, [Player(f"{name} {i}", base + (i * 3) % 9, pos) for i, pos in enumerate(positions)])
+
+def goal_variance(result, side):
+    mean = (result.home_goals if side == 0 else result.away_goals) / result.matches
+    return sum(count * (score[side] - mean) ** 2 for score, count in result.scorelines.items()) / result.matches
+
+def assert_close(a, b, se, label):
+    assert abs(a - b) <= SIGMAS * se, f"{label}: python {a:.4f} vs vector {b:.4f} (se {se:.4f})"
+
+@pytest.mark.parametrize("home_base, away_base", [(70, 70), (80, 66)])
+def test_matches_python_engine_statistically(home_base, away_base):
+    # Same fixture through both engines: outcome rates, goals and per-player scoring must agree
+    home, away = make_team("Home", home_base), make_team("Away", away_base)
+    py = run_batch(home, away, PYTHON_MATCHES, seed=1)
+    vec = VectorizedEngine(seed=1).run_batch(home, away, VECTOR_MATCHES)
+
+    for label, p, q in [
+        ("home win", py.home_win_rate, vec.home_win_rate),
+        ("draw", py.draw_rate, vec.draw_rate),
+        ("away win", py.away_win_rate, vec.away_win_rate),
+    ]:
+        pooled = (p * py.matches + q * vec.matches) / (py.matches + vec.matches)
+        se = math.sqrt(pooled * (1 - pooled) * (1 / py.matches + 1 / vec.matches))
+        assert_close(p, q, se, label)
+
+    for side, label in ((0, "home goals"), (1, "away goals")):
+        se = math.sqrt(goal_variance(py, side) / py.matches + goal_variance(vec, side) / vec.matches)
+        py_goals = (py.home_goals, py.away_goals)[side] / py.matches
+        vec_goals = (vec.home_goals, vec.away_goals)[side] / vec.matches
+        assert_close(py_goals, vec_goals, se, label)
+
+    py_players = py.player_averages()
+    vec_players = vec.player_averages()
+    for mine, theirs in zip(py_players, vec_players):
+        for stat in ("goals", "assists"):
+            # Poisson-ish counts: variance close to the mean
+            se = math.sqrt(max(mine[stat], theirs[stat], 0.01) * (1 / py.matches + 1 / vec.matches))
+            assert_close(mine[stat], theirs[stat], se, f"{mine['team']} {mine['name']} {stat}")
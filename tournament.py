@@ -0,0 +1,322 @@
+import os
+import random
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from config import *
+from models import Match
+from simulation import SimulationEngine
+
+def bracket_order(size):
+    # Standard seeding for a power-of-two bracket: [0, 3, 1, 2] for 4 puts seed 1 v 4 and 2 v 3,
+    # so the top seeds can only meet in the last rounds
+    order = [0]
+    while len(order) < size:
+        mirror = 2 * len(order) - 1
+        order = [slot for seed in order for slot in (seed, mirror - seed)]
+    return order
+
+def bracket_slots(keys):
+    """
+    First-round slots for keys listed by seed (best first), padded with None
+    byes up to the next power of two. Byes always face the top seeds.
+    """
+    size = 1
+    while size < len(keys):
+        size *= 2
+    return [keys[seed] if seed < len(keys) else None for seed in bracket_order(size)]
+
+class Tie:
+    # One knockout match of the bracket; a tie against a bye (None) is decided without playing
+    __slots__ = ('home', 'away', 'score', 'penalties', 'winner')
+
+    def __init__(self, home, away):
+        self.home = home
+        self.away = away
+        self.score = None  # (home, away) after extra time
+        self.penalties = None
+        self.winner = None
+        if home is None or away is None:
+            self.winner = home if away is None else away
+
+    @property
+    def is_bye(self):
+        return self.home is None or self.away is None
+
+    def label(self):
+        if self.is_bye:
+            return f"{self.winner} (wolny los)"
+        if self.score is None:
+            return f"{self.home} vs {self.away}"
+        line = f"{self.home} {self.score[0]}-{self.score[1]} {self.away}"
+        if self.penalties:
+            line += f" (k. {self.penalties[0]}-{self.penalties[1]})"
+        return line
+
+class Cup:
+    """
+    Single-elimination bracket. Every round's ties are independent, so a
+    round is handed out as a list of Matches that can all be played at once
+    (headless here, or concurrently on the live scheduler); once every tie
+    of the round has a winner the next round is paired up from the winners.
+
+    Match seeds are derived from the cup seed, so a cup replays exactly.
+    """
+    def __init__(self, name, slots, seed=None):
+        if seed is None:
+            seed = random.getrandbits(MATCH_SEED_BITS)
+        self.name = name
+        self.seed = seed
+        self.slots = list(slots)
+        self.rounds = [[Tie(self.slots[i], self.slots[i + 1]) for i in range(0, len(self.slots), 2)]]
+        self.pending = set()  # tie indexes of the current round being played live, not saved
+        self._advance()
+
+    @classmethod
+    def draw(cls, name, keys, seed=None, shuffle=True):
+        # keys in seeding order (best first); shuffle=True makes it an open draw instead
+        if seed is None:
+            seed = random.getrandbits(MATCH_SEED_BITS)
+        keys = list(keys)
+        if shuffle:
+            random.Random(f"{seed}:draw").shuffle(keys)
+        return cls(name, bracket_slots(keys), seed)
+
+    @property
+    def round(self):
+        return len(self.rounds) - 1
+
+    @property
+    def current(self):
+        return self.rounds[-1]
+
+    @property
+    def total_rounds(self):
+        return max(1, (len(self.slots) - 1).bit_length())
+
+    @property
+    def champion(self):
+        final = self.rounds[-1]
+        return final[0].winner if len(final) == 1 else None
+
+    def is_finished(self):
+        return self.champion is not None
+
+    def round_name(self, index=None):
+        if index is None:
+            index = self.round
+        left = self.total_rounds - index
+        return {1: "Finał", 2: "Półfinał", 3: "Ćwierćfinał"}.get(left, f"1/{2 ** (left - 1)} finału")
+
+    def tie_seed(self, round_index, index):
+        return random.Random(f"{self.seed}:{round_index}:{index}").getrandbits(MATCH_SEED_BITS)
+
+    def remaining_slots(self):
+        # Current round as first-round slots; decided ties become byes for their winner
+        slots = []
+        for tie in self.current:
+            slots.extend((tie.winner, None) if tie.winner is not None else (tie.home, tie.away))
+        return slots
+
+    def _advance(self):
+        # Pair up the winners once the whole round is decided
+        while len(self.current) > 1 and all(tie.winner is not None for tie in self.current):
+            winners = [tie.winner for tie in self.current]
+            self.rounds.append([Tie(winners[i], winners[i + 1]) for i in range(0, len(winners), 2)])
+            self.pending.clear()
+
+    def _walkover(self, tie, teams):
+        # A team deleted since the draw (or left without players) goes out without playing
+        home_ok = bool(teams.get(tie.home) and teams[tie.home].players)
+        away_ok = bool(teams.get(tie.away) and teams[tie.away].players)
+        if home_ok and away_ok:
+            return None
+        return tie.home if home_ok or not away_ok else tie.away
+
+    def matches(self, teams, mode='headless'):
+        """
+        Matches for every unplayed tie of the current round as [(index, Match)],
+        all knockout and independent of each other. Walkovers are settled here
+        and not returned. Non-headless matches are marked pending until record().
+        """
+        round_index = self.round
+        out = []
+        for i, tie in enumerate(self.current):
+            if tie.winner is not None or i in self.pending:
+                continue
+            walkover = self._walkover(tie, teams)
+            if walkover is not None:
+                tie.winner = walkover
+                continue
+            match = Match(teams[tie.home], teams[tie.away], mode=mode, seed=self.tie_seed(round_index, i), knockout=True)
+            if mode != 'headless':
+                self.pending.add(i)
+            out.append((i, match))
+        self._advance()
+        return out
+
+    def record(self, round_index, index, match):
+        # Result of a finished knockout match; ignored if the round has moved on or it's already in
+        if round_index != self.round:
+            return False
+        tie = self.current[index]
+        self.pending.discard(index)
+        if tie.winner is not None:
+            return False
+        tie.score = (match.home_team.score, match.away_team.score)
+        tie.penalties = match.penalties
+        tie.winner = tie.home if match.winner is match.home_team else tie.away
+        self._advance()
+        return True
+
+    def play_tie(self, engine, teams, round_index, index):
+        """
+        Plays one tie of the current round headless with its own seed and
+        records it; returns the Tie (None if the round has moved on). Also
+        settles a live tie that was cancelled or crashed: same seed, so it
+        ends exactly as the live match would have.
+        """
+        if round_index != self.round:
+            return None
+        tie = self.current[index]
+        self.pending.discard(index)
+        if tie.winner is None:
+            walkover = self._walkover(tie, teams)
+            if walkover is not None:
+                tie.winner = walkover
+                self._advance()
+            else:
+                match = Match(teams[tie.home], teams[tie.away], mode='headless', seed=self.tie_seed(round_index, index), knockout=True)
+                engine.simulate_match(match)
+                self.record(round_index, index, match)
+        return tie
+
+    def play_round(self, engine, teams):
+        # Plays the whole current round headless; returns the ties of that round
+        round_index = self.round
+        ties = self.current
+        for i, match in self.matches(teams):
+            engine.simulate_match(match)
+            self.record(round_index, i, match)
+        return ties
+
+    def play(self, engine, teams):
+        # Plays the rest of the cup headless and returns the champion's key
+        while not self.is_finished():
+            self.play_round(engine, teams)
+        return self.champion
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'seed': self.seed,
+            'slots': self.slots,
+            'results': [
+                [[tie.score, tie.penalties, tie.winner] for tie in ties]
+                for ties in self.rounds
+            ],
+            'engine_version': ENGINE_VERSION,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        cup = cls(data['name'], data['slots'], seed=data['seed'])
+        for round_index, ties in enumerate(data['results']):
+            if round_index != cup.round:
+                break
+            for tie, (score, penalties, winner) in zip(cup.current, ties):
+                if tie.winner is None and winner is not None:
+                    tie.score = tuple(score) if score else None
+                    tie.penalties = tuple(penalties) if penalties else None
+                    tie.winner = winner
+            cup._advance()
+        return cup
+
+class CupOdds:
+    """
+    Monte Carlo estimate of how far each team gets from a given bracket:
+    for every team, how often it reached each round and won the cup.
+    """
+    def __init__(self, slots):
+        self.slots = list(slots)
+        self.cups = 0
+        self.wins = Counter()
+        self.finals = Counter()
+
+    def record(self, cup):
+        self.cups += 1
+        self.wins[cup.champion] += 1
+        for tie in cup.rounds[-1]:
+            for key in (tie.home, tie.away):
+                if key is not None:
+                    self.finals[key] += 1
+
+    def merge(self, other):
+        self.cups += other.cups
+        self.wins.update(other.wins)
+        self.finals.update(other.finals)
+        return self
+
+    def _rate(self, count):
+        return count / self.cups if self.cups else 0.0
+
+    def ranking(self):
+        # [(key, P(final), P(win))] best chance first
+        keys = [key for key in self.slots if key is not None]
+        rows = [(key, self._rate(self.finals[key]), self._rate(self.wins[key])) for key in keys]
+        rows.sort(key=lambda row: (-row[2], -row[1], row[0]))
+        return rows
+
+    def to_dict(self):
+        return {
+            'cups': self.cups,
+            'teams': [{'team': key, 'final': final, 'win': win} for key, final, win in self.ranking()],
+        }
+
+def run_cups(slots, teams, n_cups, engine=None, seed=None):
+    # n_cups headless cups from the same bracket, each with fresh match seeds
+    engine = engine or SimulationEngine(rng=random.Random(seed))
+    result = CupOdds(slots)
+    for _ in range(n_cups):
+        cup = Cup("", slots, seed=engine.rng.getrandbits(MATCH_SEED_BITS))
+        cup.play(engine, teams)
+        result.record(cup)
+    return result
+
+def _run_chunk(slots, teams, n_cups, chunk_seed):
+    # Worker entry point: rosters arrive as pickled snapshots
+    return run_cups(slots, teams, n_cups, engine=SimulationEngine(rng=random.Random(chunk_seed)))
+
+def cup_odds(slots, teams, n_cups, workers=None, seed=None, chunk_size=CUP_ODDS_CHUNK_SIZE):
+    """
+    Probability of each team reaching the final / winning the cup from the
+    bracket `slots`, over n_cups simulated cups spread across a
+    ProcessPoolExecutor. `teams` only needs the keys in the bracket. Chunks
+    get seeds derived from `seed` and merge in order, so the result does not
+    depend on the number of workers (same scheme as batch.run_batch_parallel).
+    """
+    if seed is None:
+        seed = random.getrandbits(64)
+    teams = {key: teams[key] for key in slots if key is not None and key in teams}
+
+    chunks = []
+    remaining = n_cups
+    while remaining > 0:
+        size = min(chunk_size, remaining)
+        chunks.append(size)
+        remaining -= size
+
+    result = CupOdds(slots)
+    if not chunks:
+        return result
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        for i, size in enumerate(chunks):
+            result.merge(_run_chunk(slots, teams, size, f"{seed}:{i}"))
+        return result
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(chunks))) as pool:
+        futures = [pool.submit(_run_chunk, slots, teams, size, f"{seed}:{i}") for i, size in enumerate(chunks)]
+        for future in futures:
+            result.merge(future.result())
+    return result
@@ -1,6 +1,112 @@
 import re
 import random
-from models import Player
+from models import Player, POSITION_ALIASES
+
+# Compiled once at import. Every pattern here is a plain character-class run with no
+# nested or lazy quantifiers, so the scan is linear in the length of the paste.
+DISCORD_JUNK_RE = re.compile(r'<[^<>\n]*>|https?://\S+')
+TOKEN_RE = re.compile(r'(?P<num>\d+)|(?P<word>[^\W\d_]+)|(?P<nl>\n)')
+NAME_JUNK_RE = re.compile(r'[()\[\]–\-:;|•]')
+UNIT_SEPARATORS = ('–', '-', '•', ':', '|')
+# Matched against a stripped line: "[Legia Warszawa]", "# Legia Warszawa", "Drużyna: Legia Warszawa"
+SQUAD_HEADER_RE = re.compile(r'\[(?P<bracket>[^\[\]]+)\]|#+\s*(?P<hash>.+)|(?:drużyna|druzyna|team)\s*:\s*(?P<named>.+)', re.IGNORECASE)
+
+def _clean_name(raw):
+    name = NAME_JUNK_RE.sub(" ", raw)
+    name = " ".join(name.split())
+    if not name or len(name) < 2:
+        name = "Unknown Player"
+    return name
+
+def _plain_gap(gap):
+    # What the old regex allowed between a position and its OVR: whitespace, one separator,
+    # whitespace, then a name on a single line and nothing but whitespace after it
+    gap = gap.lstrip()
+    if gap[:1] in UNIT_SEPARATORS:
+        gap = gap[1:].lstrip()
+    return not gap.partition("\n")[2].strip()
+
+def _name_broken(gap):
+    # Whether a name already started before the last line of `gap` (text after a position),
+    # so it can't continue there; the second value says if the one separator was used up
+    separator = False
+    for segment in gap.split("\n")[:-1]:
+        segment = segment.strip()
+        if not segment:
+            continue
+        if segment in UNIT_SEPARATORS and not separator:
+            separator = True
+            continue
+        return True, separator
+    return False, separator
+
+def _scan_units(text, first_line=1):
+    """
+    Single pass over the tokens of `text`. Yields (first line, last line,
+    Player) for every [POSITION] [NAME] [OVR] unit, with Player None for a
+    position that never got its OVR. A unit may wrap onto the next line only
+    before its name starts or right before the OVR, like the old regex allowed.
+
+    Works on whole tokens, which differs from the old per-call regex in a few
+    inputs (pinned in tests/test_parser.py):
+    - a number of three or more digits is part of the name, never cut down to
+      an OVR: "GK Stanek 100 79" is ('Stanek 100', 79), was ('Stanek', 10);
+    - a position glued to digits or "_" still counts: "GK1 Stanek 79" and
+      "2GK Stanek 79" are goalkeepers, the old \\bGK\\b skipped them;
+    - Discord markup "<...>" is only stripped within one line (and "<>" too),
+      where the old pattern could eat everything up to a ">" lines later.
+    """
+    line = first_line
+    line_start = 0  # offset of the current line
+    pos = None  # pending unit: Position
+    pos_line = 0
+    name_start = 0  # offset where the pending unit's name begins
+    separator = False  # the pending unit used its one separator ("GK -" on a line of its own)
+    broken = False  # a line break came after the name started
+    retry = None  # (Position, line, name offset) of a position that is the last token so far in the pending name
+
+    for tok in TOKEN_RE.finditer(text):
+        kind = tok.lastgroup
+        if kind == 'nl':
+            if pos is not None and not broken:
+                segment = text[max(name_start, line_start):tok.start()].strip()
+                if segment in UNIT_SEPARATORS and not separator:
+                    separator = True
+                elif segment:
+                    broken = True
+            line += 1
+            line_start = tok.end()
+            continue
+
+        position = POSITION_ALIASES.get(tok.group().upper()) if kind == 'word' else None
+        is_ovr = kind == 'num' and len(tok.group()) == 2
+
+        while pos is not None and (not _plain_gap(text[name_start:tok.start()]) if is_ovr else broken):
+            # The name would span lines - drop the pending unit. Like the old regex, retry from a
+            # position that ended the line inside its name ("MD Jan ST" / "Nowak 80"), else this token starts over
+            yield pos_line, pos_line, None
+            pos = None
+            if retry is not None:
+                pos, pos_line, name_start = retry
+                broken, separator = _name_broken(text[name_start:tok.start()])
+                retry = None
+
+        if pos is not None:
+            if is_ovr:
+                yield pos_line, line, Player(_clean_name(text[name_start:tok.start()]), int(tok.group()), pos)
+                pos = None
+                continue
+            retry = (position, line, tok.end()) if position is not None else None
+            continue
+
+        if position is not None:
+            pos, pos_line = position, line
+            name_start = tok.end()
+            separator = broken = False
+            retry = None
+
+    if pos is not None:
+        yield pos_line, pos_line, None
 
 def parse_squad_text(text):
     """
@@ -8,59 +114,63 @@ def parse_squad_text(text):
     Supports line-by-line and horizontal/inline formats.
     Example: GK - Stanek 79 Lo - Mauro Junior 79 Lśo - Copete 75
     """
-    players = []
-    
     # 1. CLEANING: Remove Discord junk
-    text = re.sub(r'<[^>]+>|https?://\S+', '', text)
-    
-    # Position mapping (Extended Polish and English)
-    pos_map = {
-        'BR': 'GK', 'GK': 'GK',
-        'LO': 'LB', 'LB': 'LB',
-        'PO': 'RB', 'RB': 'RB',
-        'SO': 'CB', 'ŚO': 'CB', 'CB': 'CB', 'LSO': 'CB', 'LŚO': 'CB', 'PSO': 'CB', 'PŚO': 'CB',
-        'SP': 'CM', 'ŚP': 'CM', 'CM': 'CM', 'LSP': 'CM', 'LŚP': 'CM', 'PSP': 'CM', 'PŚP': 'CM',
-        'LP': 'LM', 'LM': 'LM',
-        'PP': 'RM', 'RM': 'RM',
-        'N': 'ST', 'NA': 'ST', 'ST': 'ST',
-        'DP': 'CDM', 'SPD': 'CDM', 'ŚPD': 'CDM', 'CDM': 'CDM',
-        'SPO': 'CAM', 'ŚPO': 'CAM', 'CAM': 'CAM',
-        'LS': 'LW', 'LW': 'LW',
-        'PS': 'RW', 'RW': 'RW'
-    }
-
-    # Define Position and OVR patterns
-    # Sorted by length to avoid partial matches (e.g. 'PŚP' before 'PŚ')
-    positions = sorted(pos_map.keys(), key=len, reverse=True)
-    pos_pattern = r'(' + '|'.join(re.escape(p) for p in positions) + r')'
-    ovr_pattern = r'(\d{2})'
+    text = DISCORD_JUNK_RE.sub('', text)
 
     # GLOBAL STRATEGY: Find all units of [POSITION] [TEXT] [OVR]
-    # Name can contain spaces and Polish chars.
-    # Pattern: Boundary + Position + Boundary + optional separator + Name + OVR
-    unit_regex = re.compile(
-        fr'\b(?P<pos>{pos_pattern})\b\s*[–\-\•:|]?\s*(?P<name>.*?)\s*(?P<ovr>{ovr_pattern})',
-        re.IGNORECASE | re.UNICODE
-    )
-
-    matches = list(unit_regex.finditer(text))
-    
-    for m in matches:
-        pos_code = m.group('pos').upper()
-        pos_str = pos_map.get(pos_code, "MD")
-        ovr = int(m.group('ovr'))
-        
-        # Clean name
-        name = m.group('name').strip()
-        name = re.sub(r'[()\[\]–\-:;|•]', " ", name)
-        name = " ".join(name.split()).strip()
-
-        if not name or len(name) < 2:
-            name = "Unknown Player"
-            
-        players.append(Player(name, ovr, pos_str))
-        
-    return players
+    # Name can contain spaces and Polish chars; OVR is the first two-digit number after it.
+    return [player for _, _, player in _scan_units(text) if player is not None]
+
+def parse_squads(text):
+    """
+    Bulk mode: many squads in one paste or file. Each squad starts with a
+    header line ("[Legia Warszawa]", "# Legia Warszawa" or "Drużyna: Legia
+    Warszawa") followed by its players in any format parse_squad_text accepts.
+
+    Returns (squads, errors): squads is a list of (name, [Player], header line)
+    in file order, errors a sorted list of (line, message) for everything that
+    couldn't be used. A squad is kept even if some of its lines failed.
+    """
+    lines = text.split("\n")
+    squads = []
+    errors = []
+
+    # Header line numbers split the file into blocks (headers may be role mentions, so they're
+    # read before the Discord junk is stripped from the player lines)
+    headers = []
+    for number, raw in enumerate(lines, 1):
+        m = SQUAD_HEADER_RE.fullmatch(raw.strip())
+        if m:
+            headers.append((number, (m.group('bracket') or m.group('hash') or m.group('named')).strip()))
+        else:
+            lines[number - 1] = DISCORD_JUNK_RE.sub('', raw)
+
+    bounds = [(0, None)] + headers + [(len(lines) + 1, None)]
+    for (start, name), (end, _) in zip(bounds, bounds[1:]):
+        body_first = start + 1
+        body = lines[body_first - 1:end - 1]
+        players = []
+        used = set()
+        for first, last, player in _scan_units("\n".join(body), body_first):
+            used.update(range(first, last + 1))
+            if player is None:
+                errors.append((first, "Pozycja bez OVR"))
+            else:
+                players.append(player)
+        for number, raw in enumerate(body, body_first):
+            if number not in used and TOKEN_RE.search(raw):
+                errors.append((number, f"Nie rozpoznano zawodnika: {raw.strip()[:60]}"))
+
+        if name is None:
+            if players:
+                errors.append((body_first, "Zawodnicy przed nagłówkiem drużyny"))
+        elif players:
+            squads.append((name, players, start))
+        else:
+            errors.append((start, f"Drużyna '{name}' nie ma zawodników"))
+
+    errors.sort()
+    return squads, errors
 
 
 def generate_random_squad(size=11):
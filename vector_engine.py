@@ -0,0 +1,292 @@
+try:
+    import numpy as np
+except ImportError:  # numpy is only needed for the vectorized batch path
+    np = None
+
+from config import *
+from batch import BatchResult
+
+class VectorizedEngine:
+    """
+    Simulates N independent matches of one fixture in lockstep.
+    Every piece of per-match state lives in a numpy array with a leading
+    match axis (and team/player axes where needed), and each minute is
+    advanced for all matches at once with vectorized draws. The probability
+    rules mirror SimulationEngine; commentary and logs are not produced.
+    """
+    def __init__(self, seed=None):
+        if np is None:
+            raise RuntimeError("VectorizedEngine requires numpy (pip install numpy)")
+        self.rng = np.random.default_rng(seed)
+
+    def _roster_arrays(self, home_team, away_team):
+        size = max(len(home_team.players), len(away_team.players))
+        shape = (2, size)
+
+        valid = np.zeros(shape, dtype=bool)
+        base_ovr = np.zeros(shape)
+        is_gk = np.zeros(shape, dtype=bool)
+        conf_locked = np.zeros(shape, dtype=bool)
+        attack_w = np.zeros(shape)
+        assist_w = np.zeros(shape)
+        gk_index = np.zeros(2, dtype=np.int64)
+        team_len = np.zeros(2)
+
+        for t, team in enumerate([home_team, away_team]):
+            team_len[t] = len(team.players)
+            gk_index[t] = team.goalkeeper_index
+            for i, p in enumerate(team.players):
+                # Same tables as MatchTeam's selection tables (Position attributes)
+                pos = p.position
+                valid[t, i] = True
+                base_ovr[t, i] = p.ovr
+                is_gk[t, i] = pos.is_gk
+                conf_locked[t, i] = pos.is_gk
+                attack_w[t, i] = pos.attack_weight
+                assist_w[t, i] = pos.assist_weight
+
+        return valid, base_ovr, is_gk, conf_locked, attack_w, assist_w, gk_index, team_len
+
+    def _pick(self, weights, u):
+        # Row-wise weighted choice (same bisect rule as random.choices)
+        cum = np.cumsum(weights, axis=1)
+        total = cum[:, -1]
+        r = u * total
+        idx = (cum <= r[:, None]).sum(axis=1)
+        return np.minimum(idx, weights.shape[1] - 1), total > 0
+
+    def simulate(self, home_team, away_team, n_matches, minutes=MATCH_LENGTH_MINUTES):
+        """
+        Runs n_matches in lockstep and returns the final state arrays:
+        scores (N, 2), goals/assists (N, 2, P), shots (N, 2), on_target (N, 2).
+        """
+        rng = self.rng
+        n = n_matches
+        (valid, base_ovr, is_gk, conf_locked,
+         attack_w, assist_w, gk_index, team_len) = self._roster_arrays(home_team, away_team)
+        size = valid.shape[1]
+        rows = np.arange(n)
+
+        score = np.zeros((n, 2), dtype=np.int64)
+        momentum = np.full((n, 2), float(STARTING_MOMENTUM))
+        chaos = np.zeros(n)
+        streak = np.zeros(n, dtype=np.int64)
+        possession = np.full(n, -1, dtype=np.int64)  # -1 = nobody yet
+        shots = np.zeros((n, 2), dtype=np.int64)
+        on_target = np.zeros((n, 2), dtype=np.int64)
+
+        condition = np.full((n, 2, size), 100.0)
+        confidence = np.zeros((n, 2, size))
+        goals = np.zeros((n, 2, size), dtype=np.int64)
+        assists = np.zeros((n, 2, size), dtype=np.int64)
+        sent_off = np.zeros((n, 2, size), dtype=bool)
+
+        def bump_momentum(team_idx, amount, mask):
+            change = max(-MAX_MOMENTUM_CHANGE, min(MAX_MOMENTUM_CHANGE, amount))
+            r = rows[mask]
+            t = team_idx[mask]
+            momentum[r, t] = np.clip(momentum[r, t] + change, 0, 100)
+
+        def bump_confidence(team_idx, player_idx, amount, mask):
+            r = rows[mask]
+            t = team_idx[mask]
+            i = player_idx[mask]
+            locked = conf_locked[t, i]
+            r, t, i = r[~locked], t[~locked], i[~locked]
+            confidence[r, t, i] = np.clip(confidence[r, t, i] + amount, -3, 3)
+
+        for minute in range(1, minutes + 1):
+            # 1. UPDATE STATE
+            condition -= rng.uniform(0.05, 0.15, size=condition.shape)
+            np.maximum(condition, 0, out=condition)
+
+            diff_abs = np.abs(score[:, 0] - score[:, 1])
+            if minute > 80:
+                chaos = np.minimum(MAX_CHAOS_LEVEL, chaos + 0.05)
+            chaos = np.where(diff_abs == 0, np.minimum(MAX_CHAOS_LEVEL, chaos + 0.01), chaos)
+
+            # 2. DECISION LAYER
+            base_neutral = 0.88
+            if minute > 30: base_neutral -= 0.05
+            if minute > 70: base_neutral -= 0.05
+            neutral = np.full(n, base_neutral)
+            neutral -= np.where(diff_abs <= 1, 0.05, 0.0)
+            neutral -= np.where(streak > 0, 0.1, 0.0)
+            neutral -= np.where(np.abs(momentum[:, 0] - momentum[:, 1]) > 20, 0.1, 0.0)
+            neutral -= np.where(chaos > 0.5, 0.1, 0.0)
+            neutral = np.clip(neutral, 0.55, 0.95)
+
+            active = rng.random(n) >= neutral
+            if not active.any():
+                continue
+
+            # 3. DETERMINE POSSESSION
+            keep = active & (possession >= 0) & (rng.random(n) < 0.6)
+            toss = active & ~keep
+
+            ovr_now = np.where(sent_off, 0.0, base_ovr)
+            avg_ovr = ovr_now.sum(axis=2) / np.maximum(team_len, 1)
+            avg_ovr = np.where(team_len > 0, avg_ovr, 0.0)
+            home_adv = (avg_ovr[:, 0] - avg_ovr[:, 1]) + (momentum[:, 0] - momentum[:, 1]) / 10
+            score_diff = score[:, 0] - score[:, 1]
+            home_adv = np.where(score_diff >= 2, home_adv - 5 * score_diff, home_adv)
+            home_adv = np.where(score_diff <= -2, home_adv + 5 * np.abs(score_diff), home_adv)
+            home_prob = np.clip(0.5 + home_adv / 100, 0.2, 0.8)
+            tossed = np.where(rng.random(n) < home_prob, 0, 1)
+
+            streak = np.where(keep, streak + 1, np.where(toss, 0, streak))
+            possession = np.where(toss, tossed, possession)
+            att = np.where(active, possession, 0)
+            dfn = 1 - att
+
+            # 4. OUTCOME RESOLUTION
+            att_off = sent_off[rows, att]
+            outfield = valid[att] & ~is_gk[att] & ~att_off
+            fallback = valid[att] & ~att_off
+            no_outfield = ~outfield.any(axis=1)
+            eligible = np.where(no_outfield[:, None], fallback, outfield)
+
+            att_goals = goals[rows, att]
+            weights = np.where(eligible, attack_w[att], 0.0)
+            weights = np.where(att_goals > 0, weights / (1 + att_goals * 3), weights)
+            attacker, has_attacker = self._pick(weights, rng.random(n))
+            active &= has_attacker
+
+            gk = gk_index[dfn]
+
+            def effective_ovr(team_idx, player_idx):
+                ovr = np.where(sent_off[rows, team_idx, player_idx], 0.0, base_ovr[team_idx, player_idx])
+                fatigue_penalty = (100 - condition[rows, team_idx, player_idx]) * 0.1
+                return ovr + confidence[rows, team_idx, player_idx] * 1.5 - fatigue_penalty
+
+            att_score = effective_ovr(att, attacker) + rng.integers(-15, 16, size=n)
+            def_score = effective_ovr(dfn, gk) + rng.integers(-5, 6, size=n) + 2
+
+            att_score = att_score + (momentum[rows, att] - momentum[rows, dfn]) / 5
+
+            att_diff = score[rows, att] - score[rows, dfn]
+            att_score = np.where(att_diff >= 2, att_score - 5, att_score)
+            att_score = np.where(att_diff >= 4, att_score - 15, att_score)
+            att_score = np.where(att_diff <= -2, att_score + 5, att_score)
+
+            chaos_hit = rng.random(n) < chaos
+            att_score = np.where(chaos_hit, att_score + rng.integers(-15, 16, size=n), att_score)
+
+            threshold = 5 + score[rows, att] * 3
+            foul_roll = rng.random(n)
+            foul_zone = foul_roll < (0.05 + chaos * 0.1)
+
+            is_goal = att_score > def_score + threshold
+            is_save = ~is_goal & (att_score > def_score + 5)
+            is_shot = ~is_goal & ~is_save & (att_score > def_score - 1)
+            rest = ~(is_goal | is_save | is_shot)
+            is_red = rest & foul_zone & (foul_roll < 0.005)
+            is_yellow = rest & foul_zone & ~is_red & (foul_roll < 0.02)
+            is_foul = rest & foul_zone & ~is_red & ~is_yellow
+            is_attack = rest & ~foul_zone
+
+            is_goal &= active
+            is_save &= active
+            is_shot &= active
+            is_red &= active
+            is_yellow &= active
+            is_foul &= active
+            is_attack &= active
+
+            # 5. APPLY OUTCOME
+            # Assist draw happens against the pre-goal state, like _apply_outcome
+            assist_u = rng.random(n)
+            assist_pick_u = rng.random(n)
+
+            if is_goal.any():
+                r = rows[is_goal]
+                t = att[is_goal]
+                i = attacker[is_goal]
+                score[r, t] += 1
+                goals[r, t, i] += 1
+                shots[r, t] += 1
+                on_target[r, t] += 1
+                chaos = np.where(is_goal, chaos + 0.05, chaos)
+                bump_momentum(att, 10, is_goal)
+                bump_confidence(att, attacker, 2, is_goal)
+
+                mates = valid[att] & ~is_gk[att] & ~sent_off[rows, att]
+                mates[rows, attacker] = False
+                has_mates = mates.any(axis=1)
+                gives_assist = is_goal & has_mates & (assist_u < 0.8)
+                if gives_assist.any():
+                    a_weights = np.where(mates, assist_w[att], 0.0)
+                    assister, _ = self._pick(a_weights, assist_pick_u)
+                    assists[rows[gives_assist], att[gives_assist], assister[gives_assist]] += 1
+
+            if is_save.any():
+                r = rows[is_save]
+                t = att[is_save]
+                shots[r, t] += 1
+                on_target[r, t] += 1
+                bump_momentum(dfn, 10, is_save)
+
+            if is_shot.any():
+                shots[rows[is_shot], att[is_shot]] += 1
+                bump_confidence(att, attacker, 1, is_shot)
+
+            if is_red.any():
+                sent_off[rows[is_red], att[is_red], attacker[is_red]] = True
+                chaos = np.where(is_red, chaos + 0.3, chaos)
+
+            if is_yellow.any():
+                bump_confidence(att, attacker, -1, is_yellow)
+                chaos = np.where(is_yellow, chaos + 0.02, chaos)
+
+            if is_foul.any():
+                chaos = np.where(is_foul, chaos + 0.01, chaos)
+
+            if is_attack.any():
+                bump_momentum(att, 3, is_attack)
+
+        return {
+            'score': score,
+            'goals': goals,
+            'assists': assists,
+            'shots': shots,
+            'on_target': on_target,
+        }
+
+    def run_batch(self, home_team, away_team, n_matches, block_size=VECTOR_BLOCK_SIZE):
+        """
+        Drop-in counterpart of batch.run_batch. Matches are simulated in blocks
+        of block_size to bound memory use.
+        """
+        result = BatchResult(home_team, away_team)
+        n_home = len(home_team.players)
+        n_away = len(away_team.players)
+
+        remaining = n_matches
+        while remaining > 0:
+            block = min(block_size, remaining)
+            remaining -= block
+            state = self.simulate(home_team, away_team, block)
+
+            home_scores = state['score'][:, 0]
+            away_scores = state['score'][:, 1]
+            result.matches += block
+            result.home_wins += int((home_scores > away_scores).sum())
+            result.away_wins += int((home_scores < away_scores).sum())
+            result.draws += int((home_scores == away_scores).sum())
+            result.home_goals += int(home_scores.sum())
+            result.away_goals += int(away_scores.sum())
+
+            pairs, counts = np.unique(state['score'], axis=0, return_counts=True)
+            for (h, a), c in zip(pairs.tolist(), counts.tolist()):
+                result.scorelines[(h, a)] += c
+
+            goal_totals = state['goals'].sum(axis=0).tolist()
+            assist_totals = state['assists'].sum(axis=0).tolist()
+            for i in range(n_home):
+                result.home_player_goals[i] += goal_totals[0][i]
+                result.home_player_assists[i] += assist_totals[0][i]
+            for i in range(n_away):
+                result.away_player_goals[i] += goal_totals[1][i]
+                result.away_player_assists[i] += assist_totals[1][i]
+
+        return result